@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+from collections import OrderedDict
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from js2c.driver import generate
+from js2c.schema import load_schema
+from js2c.settings import Settings
+
+HELP = """
+Benchmark the generator on synthetic schemas of increasing width, depth, enum cardinality and $ref reuse.
+Measures generation time and peak memory, generated line counts, and gcc -O2 compile time and object size,
+and compares them to a stored baseline.
+
+Run it from the repository root: python3 -m benchmarks.run_benchmarks
+""".strip()
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Allowed growth compared to the baseline, per metric. Timings are noisy and machine dependent, sizes are not.
+TOLERANCES = OrderedDict([
+    ("generation_seconds", 0.5),
+    ("generation_peak_kib", 0.2),
+    ("c_lines", 0.02),
+    ("h_lines", 0.02),
+    ("compile_seconds", 0.5),
+    ("object_bytes", 0.05),
+])
+
+
+def object_schema(properties, required=None):
+    return OrderedDict([
+        ("type", "object"),
+        ("additionalProperties", False),
+        ("required", list(properties) if required is None else required),
+        ("properties", properties),
+    ])
+
+
+def field_schema(i):
+    """ A mix of the most common field types """
+    kind = i % 4
+    if kind == 0:
+        return OrderedDict([("type", "integer"), ("minimum", 0), ("maximum", 1000)])
+    if kind == 1:
+        return OrderedDict([("type", "string"), ("maxLength", 16)])
+    if kind == 2:
+        return OrderedDict([("type", "number")])
+    return OrderedDict([("type", "array"), ("maxItems", 4), ("items", {"type": "integer"})])
+
+
+def width_schema(n):
+    return object_schema(OrderedDict(("field_{}".format(i), field_schema(i)) for i in range(n)))
+
+
+def depth_schema(n):
+    schema = object_schema(OrderedDict([("leaf", field_schema(0))]))
+    for i in range(n):
+        schema = object_schema(OrderedDict([("value_{}".format(i), field_schema(i)), ("child", schema)]))
+    return schema
+
+
+def enum_schema(n):
+    return object_schema(OrderedDict([
+        ("value", OrderedDict([("type", "string"), ("enum", ["label_{}".format(i) for i in range(n)])])),
+    ]))
+
+
+def ref_schema(n):
+    """ n fields referencing a handful of shared definitions """
+    schema = object_schema(OrderedDict(
+        ("field_{}".format(i), {"$ref": "#/definitions/shared_{}".format(i % 4)}) for i in range(n)
+    ))
+    schema["definitions"] = OrderedDict(
+        ("shared_{}".format(i), width_schema(8)) for i in range(4)
+    )
+    return schema
+
+
+FAMILIES = OrderedDict([
+    ("width", (width_schema, (10, 100, 1000))),
+    ("depth", (depth_schema, (2, 8, 32))),
+    ("enum", (enum_schema, (10, 100, 1000))),
+    ("ref", (ref_schema, (10, 100, 1000))),
+])
+
+
+def count_lines(text):
+    return text.count("\n")
+
+
+def measure_generation(schema_text, settings_args, repeat):
+    best_seconds = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        schema = load_schema(io.StringIO(schema_text))
+        c_contents, h_contents = generate(schema, Settings(settings_args, {}), "benchmark.parser.h")
+        elapsed = time.perf_counter() - start
+        best_seconds = elapsed if best_seconds is None else min(best_seconds, elapsed)
+
+    tracemalloc.start()
+    schema = load_schema(io.StringIO(schema_text))
+    generate(schema, Settings(settings_args, {}), "benchmark.parser.h")
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best_seconds, peak_memory, c_contents, h_contents
+
+
+def measure_compilation(c_contents, h_contents, compiler):
+    with tempfile.TemporaryDirectory() as build_dir:
+        with open(os.path.join(build_dir, "benchmark.parser.c"), "w") as c_file:
+            c_file.write(c_contents)
+        with open(os.path.join(build_dir, "benchmark.parser.h"), "w") as h_file:
+            h_file.write(h_contents)
+        object_file_name = os.path.join(build_dir, "benchmark.parser.o")
+        start = time.perf_counter()
+        subprocess.run(
+            [compiler, "-O2", "-c", os.path.join(build_dir, "benchmark.parser.c"), "-o", object_file_name],
+            check=True,
+        )
+        elapsed = time.perf_counter() - start
+        return elapsed, os.path.getsize(object_file_name)
+
+
+def run_case(family, size, args):
+    schema_builder, _ = FAMILIES[family]
+    schema = schema_builder(size)
+    schema["$id"] = "benchmark"
+    settings_args = {"table_driven_parser": args.table_driven_parser}
+    generation_seconds, peak_memory, c_contents, h_contents = measure_generation(
+        json.dumps(schema), settings_args, args.repeat
+    )
+    result = OrderedDict([
+        ("generation_seconds", round(generation_seconds, 4)),
+        ("generation_peak_kib", round(peak_memory / 1024, 1)),
+        ("c_lines", count_lines(c_contents)),
+        ("h_lines", count_lines(h_contents)),
+    ])
+    if not args.no_compile:
+        compile_seconds, object_bytes = measure_compilation(c_contents, h_contents, args.compiler)
+        result["compile_seconds"] = round(compile_seconds, 3)
+        result["object_bytes"] = object_bytes
+    return result
+
+
+def find_regressions(results, baseline):
+    regressions = []
+    for case_name, metrics in results.items():
+        for metric, value in metrics.items():
+            baseline_value = baseline.get(case_name, {}).get(metric)
+            if baseline_value is None:
+                continue
+            if value > baseline_value * (1 + TOLERANCES[metric]):
+                regressions.append(
+                    "{}: {} grew from {} to {} (more than {:.0%})"
+                    .format(case_name, metric, baseline_value, value, TOLERANCES[metric])
+                )
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=HELP, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument(
+        "--baseline",
+        default=DEFAULT_BASELINE,
+        help="Baseline JSON file to compare to. Default: %(default)s",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store the results as the new baseline instead of comparing to it.",
+    )
+    parser.add_argument(
+        "--output",
+        metavar="file",
+        help="Also write the results to this JSON file.",
+    )
+    parser.add_argument(
+        "--family",
+        choices=list(FAMILIES),
+        action="append",
+        help="Only run these benchmark families. Can be specified multiple times.",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Generation is timed this many times, the best counts.")
+    parser.add_argument("--compiler", default=os.environ.get("CC", "gcc"), help="Default: $CC or gcc")
+    parser.add_argument("--no-compile", action="store_true", help="Skip the compile time and object size measurements.")
+    parser.add_argument("--table-driven-parser", action="store_true", help="Benchmark the table-driven parser mode.")
+    return parser.parse_args()
+
+
+def main(args):
+    results = OrderedDict()
+    for family in args.family or FAMILIES:
+        for size in FAMILIES[family][1]:
+            case_name = "{}{}_{}".format("table_" if args.table_driven_parser else "", family, size)
+            results[case_name] = run_case(family, size, args)
+            print("{:<24}{}".format(case_name, ", ".join("{}={}".format(k, v) for k, v in results[case_name].items())))
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=4)
+
+    if args.update_baseline:
+        baseline = OrderedDict()
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as baseline_file:
+                baseline = json.load(baseline_file, object_pairs_hook=OrderedDict)
+        baseline.update(results)
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(baseline, baseline_file, indent=4)
+            baseline_file.write("\n")
+        print("Baseline updated: {}".format(args.baseline))
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found at {}, run with --update-baseline to create one.".format(args.baseline))
+        return 0
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    regressions = find_regressions(results, baseline)
+    for regression in regressions:
+        print("REGRESSION: {}".format(regression))
+    if regressions:
+        return 1
+    print("No regressions compared to {}".format(args.baseline))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+from collections import OrderedDict
+import copy
+import io
+import json
+import sys
+import time
+
+from js2c.schema import load_schema
+from js2c.validator import compile_validator
+
+from .run_benchmarks import FAMILIES
+
+HELP = """
+Compare the validators compiled from the generator tree (js2c.validator) to a validator interpreting the schema
+dict for every document, on documents of the synthetic benchmark schemas. Also checks that both agree on valid
+and invalid documents.
+
+Run it from the repository root: python3 -m benchmarks.validator_benchmark
+""".strip()
+
+
+def interpret(schema, value):
+    """ Generic validation, walking the schema for every value. Supports the keywords of the benchmark schemas. """
+    schema_type = schema.get("type")
+    if schema_type == "object":
+        if not isinstance(value, dict):
+            raise ValueError("Invalid object")
+        properties = schema["properties"]
+        for key, item in value.items():
+            if key not in properties:
+                raise ValueError("Unknown field: {}".format(key))
+            interpret(properties[key], item)
+        for key in schema.get("required", ()):
+            if key not in value:
+                raise ValueError("Missing required field: {}".format(key))
+    elif schema_type == "array":
+        if not isinstance(value, list) or not schema.get("minItems", 0) <= len(value) <= schema["maxItems"]:
+            raise ValueError("Invalid array")
+        for item in value:
+            interpret(schema["items"], item)
+    elif schema_type == "string":
+        if not isinstance(value, str):
+            raise ValueError("Invalid string")
+        if "enum" in schema:
+            if value not in schema["enum"]:
+                raise ValueError("Unknown enum value")
+        elif not schema.get("minLength", 0) <= len(value.encode()) <= schema["maxLength"]:
+            raise ValueError("Invalid string length")
+    elif schema_type in ("integer", "number"):
+        if isinstance(value, bool) or not isinstance(value, int if schema_type == "integer" else (int, float)):
+            raise ValueError("Invalid number")
+        if "minimum" in schema and value < schema["minimum"]:
+            raise ValueError("Number out of range")
+        if "maximum" in schema and value > schema["maximum"]:
+            raise ValueError("Number out of range")
+    else:
+        raise ValueError("Unsupported schema: {}".format(schema))
+
+
+def sample_document(schema):
+    """ A valid document, with every field and the most array items """
+    schema_type = schema.get("type")
+    if schema_type == "object":
+        return OrderedDict((key, sample_document(field)) for key, field in schema["properties"].items())
+    if schema_type == "array":
+        return [sample_document(schema["items"]) for _ in range(schema["maxItems"])]
+    if schema_type == "string":
+        return schema["enum"][-1] if "enum" in schema else "x" * schema["maxLength"]
+    if schema_type == "integer":
+        return schema.get("maximum", 12345)
+    return 1.5
+
+
+def invalid_documents(document):
+    """ The document with a single value made invalid, at several depths """
+    result = []
+    path = []
+    node = document
+    while isinstance(node, (dict, list)) and node:
+        key = next(iter(node)) if isinstance(node, dict) else len(node) - 1
+        path.append(key)
+        node = node[key]
+        invalid = copy.deepcopy(document)
+        target = invalid
+        for step in path[:-1]:
+            target = target[step]
+        target[path[-1]] = {"unexpected": True}
+        result.append(invalid)
+    return result
+
+
+def measure(validate, document, repeat):
+    best_seconds = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        validate(document)
+        elapsed = time.perf_counter() - start
+        best_seconds = elapsed if best_seconds is None else min(best_seconds, elapsed)
+    return best_seconds
+
+
+def accepts(validate, document):
+    try:
+        validate(document)
+    except ValueError:
+        return False
+    return True
+
+
+def run_case(family, size, repeat):
+    schema_builder, _ = FAMILIES[family]
+    raw_schema = schema_builder(size)
+    raw_schema["$id"] = "benchmark"
+    schema = load_schema(io.StringIO(json.dumps(raw_schema)))
+
+    start = time.perf_counter()
+    compiled = compile_validator(schema)
+    build_seconds = time.perf_counter() - start
+
+    def interpreted(document):
+        interpret(schema, document)
+
+    document = sample_document(schema)
+    for candidate in [document] + invalid_documents(document):
+        if accepts(compiled, candidate) != accepts(interpreted, candidate):
+            raise AssertionError("{}_{}: the validators disagree on {}".format(family, size, json.dumps(candidate)))
+
+    compiled_seconds = measure(compiled, document, repeat)
+    interpreted_seconds = measure(interpreted, document, repeat)
+    return OrderedDict([
+        ("build_ms", round(build_seconds * 1000, 2)),
+        ("compiled_us", round(compiled_seconds * 1e6, 1)),
+        ("interpreted_us", round(interpreted_seconds * 1e6, 1)),
+        ("speedup", round(interpreted_seconds / compiled_seconds, 2)),
+    ])
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=HELP, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument(
+        "--family",
+        choices=list(FAMILIES),
+        action="append",
+        help="Only run these benchmark families. Can be specified multiple times.",
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="Validation is timed this many times, the best counts.")
+    return parser.parse_args()
+
+
+def main(args):
+    for family in args.family or FAMILIES:
+        for size in FAMILIES[family][1]:
+            result = run_case(family, size, args.repeat)
+            print("{:<24}{}".format("{}_{}".format(family, size), ", ".join("{}={}".format(k, v) for k, v in result.items())))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+import hashlib
+import os
+import sys
+import tempfile
+
+from .codegen.generator_factory import schema_to_json
+from .settings import Settings
+
+DIR_OF_THIS_FILE = os.path.dirname(__file__)
+
+
+def file_mode(file_name):
+    """ The mode of an existing file, or the mode open() would create a new file with """
+    try:
+        return os.stat(file_name).st_mode & 0o7777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def write_if_changed(file_name, contents):
+    """ Atomically replace the file with the new contents, but only if they differ.
+
+    Unchanged files keep their modification time, so nothing depending on them gets rebuilt.
+    The replaced file keeps its mode; new files get the usual mode allowed by the umask.
+    "-" writes to the standard output instead.
+    Returns True if the file was written.
+    """
+    if file_name == '-':
+        sys.stdout.write(contents)
+        return True
+
+    try:
+        with open(file_name, encoding="utf-8") as existing_file:
+            if existing_file.read() == contents:
+                return False
+    except FileNotFoundError:
+        pass
+
+    mode = file_mode(file_name)
+    directory = os.path.dirname(os.path.abspath(file_name))
+    fd, temp_name = tempfile.mkstemp(dir=directory, prefix=".js2c-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding="utf-8") as temp_file:
+            temp_file.write(contents)
+        os.chmod(temp_name, mode)
+        os.replace(temp_name, file_name)
+    except BaseException:
+        os.unlink(temp_name)
+        raise
+    return True
+
+
+def schema_fingerprint(schema):
+    """ A stable representation of the resolved schema, with every shared definition written out only once """
+    return schema_to_json(schema)
+
+
+def generator_version():
+    """ Hash of the generator sources, including the builtins and JSMN that are pasted into the outputs """
+    version_hash = hashlib.sha256()
+    for directory in (DIR_OF_THIS_FILE, os.path.join(DIR_OF_THIS_FILE, 'codegen')):
+        for file_name in sorted(os.listdir(directory)):
+            if not file_name.endswith(('.py', '.h')):
+                continue
+            with open(os.path.join(directory, file_name), 'rb') as source_file:
+                version_hash.update(file_name.encode())
+                version_hash.update(source_file.read())
+    return version_hash.hexdigest()
+
+
+class GenerationCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @classmethod
+    def key(cls, schema, settings, h_file_name, extra_roots=()):
+        key_hash = hashlib.sha256()
+        key_hash.update(generator_version().encode())
+        for root_schema, root_settings in [(schema, settings)] + list(extra_roots):
+            key_hash.update(schema_fingerprint(root_schema).encode())
+            for field in Settings.FIELDS:
+                value = getattr(root_settings, field.name)
+                if hasattr(value, 'read'):
+                    # Files given in the settings are pasted into the output, so their contents matter, not their names
+                    contents = value.read()
+                    value.seek(0)
+                    value = contents
+                key_hash.update("{}={!r}\n".format(field.name, value).encode())
+        key_hash.update(os.path.basename(h_file_name).encode())
+        return key_hash.hexdigest()
+
+    def path_for(self, key, extension):
+        return os.path.join(self.cache_dir, key + extension)
+
+    def load(self, key, file_num):
+        try:
+            contents = []
+            for file_index in range(file_num):
+                with open(self.path_for(key, '.{}'.format(file_index)), encoding="utf-8") as cached_file:
+                    contents.append(cached_file.read())
+            return contents
+        except FileNotFoundError:
+            return None
+
+    def store(self, key, contents):
+        """ contents are the generated files, in the order of driver.output_file_names() """
+        for file_index, file_contents in enumerate(contents):
+            write_if_changed(self.path_for(key, '.{}'.format(file_index)), file_contents)
@@ -22,10 +22,13 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 #
-from .base import Generator
+from .base import Generator, emit_once
+from .object import ObjectGenerator
+from .string import StringGenerator
 
 
 class ArrayGenerator(Generator):
+    # pylint: disable=too-many-public-methods
     JSON_FIELDS = Generator.JSON_FIELDS + (
         "minItems",
         "maxItems",
@@ -38,12 +41,11 @@ class ArrayGenerator(Generator):
         if self.maxItems is None:
             raise ValueError("Arrays must have maxItems")
 
-        self.item_generator = generator_factory.get_generator_for(
-            schema["items"],
-            "{}_item".format(name),
-            settings
-        )
         self.c_type = "{}_t".format(self.name)
+        self.item_generator = self.create_item_generator(schema["items"], "{}_item".format(name), generator_factory)
+
+    def create_item_generator(self, item_schema, item_name, generator_factory):
+        return generator_factory.get_generator_for(item_schema, item_name, self.settings)
 
     @classmethod
     def can_parse_schema(cls, schema):
@@ -57,6 +59,7 @@ class ArrayGenerator(Generator):
         with out_file.code_block():
             out_file.print("return true;")
 
+    @emit_once
     def generate_type_declaration(self, out_file, *, force=False):
         _ = force  # basically (void)force
 
@@ -86,10 +89,43 @@ class ArrayGenerator(Generator):
                     out_file
                 )
 
+    def generate_bulk_loop(self, out_file):
+        """ Parse primitive items straight from the (contiguous) tokens into the output array.
+
+        The loop stops at the first item it cannot handle, and leaves it and the rest to the generic loop,
+        which reports the error.
+        """
+        out_file.print("const jsmntok_t *const item_tokens = &CURRENT_TOKEN(parse_state);")
+        out_file.print("{} *const items = out->items;".format(self.item_generator.c_type))
+        out_file.print("int i = 0;")
+        out_file.print("for (; i < n; ++i)")
+        with out_file.code_block():
+            out_file.print("const jsmntok_t *const token = &item_tokens[i];")
+            self.item_generator.generate_bulk_conversion("token", "items[i]", out_file)
+        out_file.print("parse_state->current_token += i;")
+
+    def generate_items_parser(self, out_file):
+        if self.item_generator.supports_bulk_parsing:
+            self.generate_bulk_loop(out_file)
+            out_file.print("for (; i < n; ++i)")
+        else:
+            out_file.print("for (int i = 0; i < n; ++i)")
+        with out_file.code_block():
+            self.item_generator.generate_parser_call(
+                "&out->items[i]",
+                out_file
+            )
+
+    def parser_subtrees(self):
+        return [self.item_generator]
+
+    @emit_once
     def generate_parser_bodies(self, out_file):
         self.item_generator.generate_parser_bodies(out_file)
 
-        out_file.print("static bool parse_{}(parse_state_t *parse_state, {} *out)".format(self.name, self.c_type))
+        out_file.print_function_definition(
+            "bool parse_{}(parse_state_t *parse_state, {} *out)".format(self.name, self.c_type)
+        )
         with out_file.code_block():
             out_file.print("if (check_type(parse_state, JSMN_ARRAY))")
             with out_file.code_block():
@@ -98,15 +134,115 @@ class ArrayGenerator(Generator):
             self.generate_range_checks(out_file)
             out_file.print("out->n = n;")
             out_file.print("parse_state->current_token += 1;")
-            out_file.print("for (int i = 0; i < n; ++i)")
+            self.generate_items_parser(out_file)
+            out_file.print("return false;")
+        out_file.print("")
+
+    @emit_once
+    def generate_table_descriptor(self, out_file):
+        self.item_generator.generate_table_descriptor(out_file)
+        self.generate_table_descriptor_struct(
+            "JS2C_KIND_ARRAY",
+            out_file,
+            item="&{}".format(self.item_generator.table_descriptor_name),
+            items_offset="offsetof({}, items)".format(self.c_type),
+            min_items=self.minItems,
+            max_items=self.maxItems,
+        )
+
+    def generate_encoder_call(self, in_var_name, out_file):
+        self.generate_builtin_codec_call("encode_{}(encoder, {})".format(self.name, in_var_name), out_file)
+
+    def generate_decoder_call(self, out_var_name, out_file):
+        self.generate_builtin_codec_call("decode_{}(decoder, {})".format(self.name, out_var_name), out_file)
+
+    def generate_items_encoder(self, out_file):
+        out_file.print("for (uint64_t i = 0; i < in->n; ++i)")
+        with out_file.code_block():
+            self.item_generator.generate_encoder_call("&in->items[i]", out_file)
+
+    def generate_items_decoder(self, out_file):
+        out_file.print("for (uint64_t i = 0; i < n; ++i)")
+        with out_file.code_block():
+            self.item_generator.generate_decoder_call("&out->items[i]", out_file)
+
+    @emit_once
+    def generate_codec_bodies(self, out_file):
+        self.item_generator.generate_codec_bodies(out_file)
+
+        out_file.print("static bool encode_{}(js2c_encoder_t *encoder, const {} *in)".format(self.name, self.c_type))
+        with out_file.code_block():
+            out_file.print("if (in->n > {} || builtin_encode_unsigned(encoder, in->n))".format(self.maxItems))
             with out_file.code_block():
-                self.item_generator.generate_parser_call(
-                    "&out->items[i]",
-                    out_file
-                )
+                out_file.print("return true;")
+            self.generate_items_encoder(out_file)
             out_file.print("return false;")
         out_file.print("")
 
+        out_file.print("static bool decode_{}(js2c_decoder_t *decoder, {} *out)".format(self.name, self.c_type))
+        with out_file.code_block():
+            out_file.print("uint64_t n;")
+            self.generate_builtin_codec_call(
+                "builtin_decode_length(decoder, {}, {}, &n)".format(self.minItems, self.maxItems), out_file
+            )
+            out_file.print("out->n = n;")
+            self.generate_items_decoder(out_file)
+            out_file.print("return false;")
+        out_file.print("")
+
+    def wire_signature(self):
+        return "[{}]".format(self.item_generator.wire_signature())
+
+    def max_encoded_size(self):
+        return self.varint_size(self.maxItems) + self.maxItems * self.item_generator.max_encoded_size()
+
+    def python_value(self, in_var_name):
+        return "to_python_{}({})".format(self.name, in_var_name)
+
+    def python_item_value(self):
+        """ The Python object of the i-th item of 'in' """
+        return self.item_generator.python_value("&in->items[i]")
+
+    @emit_once
+    def generate_python_bodies(self, out_file):
+        self.item_generator.generate_python_bodies(out_file)
+
+        out_file.print("static PyObject *to_python_{}(const {} *in)".format(self.name, self.c_type))
+        with out_file.code_block():
+            out_file.print("PyObject *out = PyList_New(in->n);")
+            out_file.print("if (out == NULL)")
+            with out_file.code_block():
+                out_file.print("return NULL;")
+            out_file.print("for (uint64_t i = 0; i < in->n; ++i)")
+            with out_file.code_block():
+                out_file.print("PyObject *item = {};".format(self.python_item_value()))
+                out_file.print("if (item == NULL)")
+                with out_file.code_block():
+                    out_file.print("Py_DECREF(out);")
+                    out_file.print("return NULL;")
+                out_file.print("PyList_SET_ITEM(out, i, item);")
+            out_file.print("return out;")
+        out_file.print("")
+
+    def build_python_validator(self):
+        validate_item = self.item_generator.build_python_validator()
+        min_items = self.minItems
+        max_items = self.maxItems
+
+        def validate_array(value, context):
+            if not isinstance(value, list):
+                raise ValueError("Invalid array: {!r}".format(value))
+            if len(value) > max_items:
+                raise ValueError("Array too large. Length: {}. Maximum length: {}.".format(len(value), max_items))
+            if len(value) < min_items:
+                raise ValueError("Array too small. Length: {}. Minimum length: {}.".format(len(value), min_items))
+            for index, item in enumerate(value):
+                try:
+                    validate_item(item, context)
+                except ValueError as error:
+                    raise ValueError("item {}: {}".format(index, error)) from None
+        return validate_array
+
     def has_default_value(self):
         return super().has_default_value() or self.minItems == 0
 
@@ -117,3 +253,253 @@ class ArrayGenerator(Generator):
 
     def max_token_num(self):
         return self.maxItems * self.item_generator.max_token_num() + 1
+
+    def estimated_layout(self):
+        item_size, item_alignment = self.item_generator.estimated_layout()
+        return self.struct_layout([(8, 8), (item_size * self.maxItems, item_alignment)])
+
+    def memory_children(self):
+        return [("[]", self.item_generator, self.maxItems)]
+
+
+class PooledStringArrayGenerator(ArrayGenerator):
+    """ Array of strings, stored back to back in a character pool of js2cPoolSize bytes.
+
+    Instead of maxItems * (maxLength + 1) bytes, only the pool and an offset per item are reserved.
+    The items are accessed with the generated <NAME>_ITEM(array, i) macro.
+    """
+    JSON_FIELDS = ArrayGenerator.JSON_FIELDS + (
+        "js2cPoolSize",
+    )
+    js2cPoolSize = None
+
+    def __init__(self, schema, name, settings, generator_factory):
+        super().__init__(schema, name, settings, generator_factory)
+        if not isinstance(self.item_generator, StringGenerator) or self.item_generator.js2cType is not None:
+            raise ValueError("js2cPoolSize can only be used on arrays of plain strings ({})".format(self.name))
+        if not isinstance(self.js2cPoolSize, int) or self.js2cPoolSize < 1:
+            raise ValueError("js2cPoolSize must be a positive integer ({})".format(self.name))
+        self.offset_type = "uint16_t" if self.js2cPoolSize <= 0xFFFF else "uint32_t"
+
+    @classmethod
+    def can_parse_schema(cls, schema):
+        return schema.get('type') == 'array' and 'js2cPoolSize' in schema
+
+    @property
+    def item_macro_name(self):
+        return "{}_ITEM".format(self.SANITIZE_RE.sub("_", self.name).upper())
+
+    @emit_once
+    def generate_type_declaration(self, out_file, *, force=False):
+        _ = force  # basically (void)force
+
+        out_file.print("typedef struct {}_s ".format(self.name) + "{")
+        with out_file.indent():
+            out_file.print_with_docstring("uint64_t n;", "The number of elements in the array")
+            out_file.print_with_docstring(
+                "{} offsets[{}];".format(self.offset_type, self.maxItems),
+                "Position of every item in the pool"
+            )
+            out_file.print_with_docstring(
+                "char pool[{}];".format(self.js2cPoolSize),
+                "The items as NUL-terminated strings, back to back"
+            )
+        out_file.print("}} {};".format(self.c_type))
+        out_file.print("/* The i-th item of a {} */".format(self.c_type))
+        out_file.print(
+            "#define {}(array, i) ((const char *)(array).pool + (array).offsets[(i)])".format(self.item_macro_name)
+        )
+        out_file.print("")
+
+    def parser_subtrees(self):
+        return []
+
+    def estimated_layout(self):
+        offset_size = 2 if self.offset_type == "uint16_t" else 4
+        return self.struct_layout([(8, 8), (offset_size * self.maxItems, offset_size), (self.js2cPoolSize, 1)])
+
+    def memory_children(self):
+        return []
+
+    @emit_once
+    def generate_parser_bodies(self, out_file):
+        out_file.print_function_definition(
+            "bool parse_{}(parse_state_t *parse_state, {} *out)".format(self.name, self.c_type)
+        )
+        with out_file.code_block():
+            out_file.print("if (check_type(parse_state, JSMN_ARRAY))")
+            with out_file.code_block():
+                out_file.print("return true;")
+            out_file.print("const int n = parse_state->tokens[parse_state->current_token].size;")
+            self.generate_range_checks(out_file)
+            out_file.print("out->n = n;")
+            out_file.print("parse_state->current_token += 1;")
+            out_file.print("uint64_t pool_used = 0;")
+            out_file.print("for (int i = 0; i < n; ++i)")
+            with out_file.code_block():
+                out_file.print("out->offsets[i] = pool_used;")
+                out_file.print(
+                    "if (builtin_parse_pooled_string(parse_state, out->pool, {}, &pool_used, {}, {}))"
+                    .format(self.js2cPoolSize, self.item_generator.minLength, self.item_generator.maxLength)
+                )
+                with out_file.code_block():
+                    out_file.print("return true;")
+            out_file.print("return false;")
+        out_file.print("")
+
+    def generate_items_encoder(self, out_file):
+        out_file.print("for (uint64_t i = 0; i < in->n; ++i)")
+        with out_file.code_block():
+            self.generate_builtin_codec_call(
+                "builtin_encode_string(encoder, {}(*in, i))".format(self.item_macro_name), out_file
+            )
+
+    def generate_items_decoder(self, out_file):
+        out_file.print("uint64_t pool_used = 0;")
+        out_file.print("for (uint64_t i = 0; i < n; ++i)")
+        with out_file.code_block():
+            out_file.print("out->offsets[i] = pool_used;")
+            self.generate_builtin_codec_call(
+                "builtin_decode_pooled_string(decoder, out->pool, {}, &pool_used, {}, {})"
+                .format(self.js2cPoolSize, self.item_generator.minLength, self.item_generator.maxLength),
+                out_file
+            )
+
+    def python_item_value(self):
+        return "PyUnicode_FromString({}(*in, i))".format(self.item_macro_name)
+
+    def build_python_validator(self):
+        validate_array = super().build_python_validator()
+        pool_size = self.js2cPoolSize
+
+        def validate_pooled_array(value, context):
+            validate_array(value, context)
+            pool_used = sum(len(item.encode()) + 1 for item in value)
+            if pool_used > pool_size:
+                raise ValueError("String pool is full. Pool size: {}.".format(pool_size))
+        return validate_pooled_array
+
+    def max_encoded_size(self):
+        item_generator = self.item_generator
+        return (
+            self.varint_size(self.maxItems)
+            + self.maxItems * self.varint_size(item_generator.maxLength)
+            + min(self.js2cPoolSize, self.maxItems * item_generator.maxLength)
+        )
+
+    @emit_once
+    def generate_table_descriptor(self, out_file):
+        self.generate_table_descriptor_for_parser_bodies(out_file)
+
+
+class ColumnarItemGenerator(ObjectGenerator):
+    """ The items of a columnar array. Every field is parsed into its own column of the array struct. """
+
+    def __init__(self, schema, name, settings, generator_factory, array_c_type):
+        super().__init__(schema, name, settings, generator_factory)
+        self.array_c_type = array_c_type
+
+    @classmethod
+    def field_out_var_name(cls, field_name, struct_var_name="out"):
+        return "{}->{}[item_index]".format(struct_var_name, field_name)
+
+    def parser_declaration(self):
+        return "bool parse_{}(parse_state_t *parse_state, {} *out, int item_index)".format(self.name, self.array_c_type)
+
+    def encoder_declaration(self):
+        return "static bool encode_{}(js2c_encoder_t *encoder, const {} *in, uint64_t item_index)".format(
+            self.name, self.array_c_type
+        )
+
+    def decoder_declaration(self):
+        return "static bool decode_{}(js2c_decoder_t *decoder, {} *out, uint64_t item_index)".format(
+            self.name, self.array_c_type
+        )
+
+    def python_converter_declaration(self):
+        return "static PyObject *to_python_{}(const {} *in, uint64_t item_index)".format(self.name, self.array_c_type)
+
+    @emit_once
+    def generate_type_declaration(self, out_file, *, force=False):
+        _ = force  # basically (void)force
+        # There is no item struct, only the types of the columns
+        for field_generator in self.fields.values():
+            field_generator.generate_type_declaration(out_file)
+
+
+class ColumnarArrayGenerator(ArrayGenerator):
+    """ Array of objects with js2cLayout: "columnar", stored as a struct of arrays.
+
+    Every field of the item object gets a contiguous column (e.g. out->x[i] instead of out->items[i].x),
+    so scanning a single field across the array is cache friendly.
+    """
+    JSON_FIELDS = ArrayGenerator.JSON_FIELDS + (
+        "js2cLayout",
+    )
+    js2cLayout = None
+
+    def create_item_generator(self, item_schema, item_name, generator_factory):
+        if item_schema.get('type') != 'object' or 'properties' not in item_schema:
+            raise ValueError("js2cLayout: columnar can only be used on arrays of objects ({})".format(self.name))
+        if 'n' in item_schema['properties']:
+            # The column would clash with the element count of the array struct
+            raise ValueError("js2cLayout: columnar items can not have a property named 'n' ({})".format(self.name))
+        # Without $id, so a shared definition's own type and parser keep their name
+        item_schema = {key: value for key, value in item_schema.items() if key != '$id'}
+        return ColumnarItemGenerator(item_schema, item_name, self.settings, generator_factory, self.c_type)
+
+    @classmethod
+    def can_parse_schema(cls, schema):
+        return schema.get('type') == 'array' and schema.get('js2cLayout') == 'columnar'
+
+    @emit_once
+    def generate_type_declaration(self, out_file, *, force=False):
+        _ = force  # basically (void)force
+
+        self.item_generator.generate_type_declaration(out_file)
+
+        out_file.print("typedef struct {}_s ".format(self.name) + "{")
+        with out_file.indent():
+            out_file.print_with_docstring("uint64_t n;", "The number of elements in the array")
+            for field_name, field_generator in self.item_generator.fields.items():
+                field_generator.generate_field_declaration("{}[{}]".format(field_name, self.maxItems), out_file)
+        out_file.print("}} {};".format(self.c_type))
+        out_file.print("")
+
+    def generate_items_parser(self, out_file):
+        out_file.print("for (int i = 0; i < n; ++i)")
+        with out_file.code_block():
+            out_file.print("if (parse_{}(parse_state, out, i))".format(self.item_generator.name))
+            with out_file.code_block():
+                out_file.print("return true;")
+
+    def generate_items_encoder(self, out_file):
+        # Item by item, so the wire format is the same as that of the row layout
+        out_file.print("for (uint64_t i = 0; i < in->n; ++i)")
+        with out_file.code_block():
+            self.generate_builtin_codec_call("encode_{}(encoder, in, i)".format(self.item_generator.name), out_file)
+
+    def generate_items_decoder(self, out_file):
+        out_file.print("for (uint64_t i = 0; i < n; ++i)")
+        with out_file.code_block():
+            self.generate_builtin_codec_call("decode_{}(decoder, out, i)".format(self.item_generator.name), out_file)
+
+    def python_item_value(self):
+        return "to_python_{}(in, i)".format(self.item_generator.name)
+
+    def estimated_layout(self):
+        columns = []
+        for field_generator in self.item_generator.fields.values():
+            field_size, field_alignment = field_generator.estimated_layout()
+            columns.append((field_size * self.maxItems, field_alignment))
+        return self.struct_layout([(8, 8)] + columns)
+
+    def memory_children(self):
+        return [
+            ("[].{}".format(field_name), field_generator, self.maxItems)
+            for field_name, field_generator in self.item_generator.fields.items()
+        ]
+
+    @emit_once
+    def generate_table_descriptor(self, out_file):
+        self.generate_table_descriptor_for_parser_bodies(out_file)
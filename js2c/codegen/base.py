@@ -23,13 +23,47 @@
 # SOFTWARE.
 #
 from abc import ABC, abstractmethod
+import functools
+from operator import ge, gt, le, lt
+import re
 
 
 class NoDefaultValue(Exception):
     pass
 
 
+class ValidationContext:
+    """ State of the Python validators while validating a single document (see build_python_validator) """
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self):
+        # The current nesting depth and the number of nodes of recursive types, see RecursiveReferenceGenerator
+        self.recursion_depth = 0
+        self.recursive_node_num = 0
+
+
+def emit_once(method):
+    """ Decorator for methods that emit named C declarations or definitions.
+
+    Generators of shared schema definitions are reachable from several parents, but their code must only be
+    emitted once into every file (or once into all the files of a split parser, see CodeBlockPrinter.fork).
+    The key is the generator itself, not its name, so a name clash can not silently reuse the code of another type.
+    """
+    @functools.wraps(method)
+    def wrapper(self, out_file, *args, **kwargs):
+        key = (method.__qualname__, id(self))
+        if key in out_file.emitted:
+            return
+        out_file.emitted.add(key)
+        saved_generator_name = out_file.current_generator_name
+        out_file.current_generator_name = self.name
+        method(self, out_file, *args, **kwargs)
+        out_file.current_generator_name = saved_generator_name
+    return wrapper
+
+
 class Generator(ABC):
+    # pylint: disable=too-many-public-methods
     JSON_FIELDS = (
         "description",
         "js2cDefault",
@@ -38,19 +72,28 @@ class Generator(ABC):
     c_type = None
     description = None
     js2cDefault = None
+    # Whether generate_bulk_conversion is implemented, i.e. arrays of this type can be parsed in a tight loop
+    supports_bulk_parsing = False
+
+    SANITIZE_RE = re.compile("[^A-Za-z0-9_]")
 
     def __init__(self, schema, name, settings, generator_factory):
-        _ = generator_factory  # used only by subclasses
         self.settings = settings
-        self.name = name
-        if "$id" in schema:
-            self.name = schema["$id"]
-            if self.name[0] == '#':
-                self.name = self.name[1:]
+        self.name = self.choose_name(schema, name, generator_factory)
         for attr in self.JSON_FIELDS:
             if attr in schema:
                 setattr(self, attr, schema[attr])
 
+    @classmethod
+    def choose_name(cls, schema, name, generator_factory):
+        """ The name of the C type and functions: the $id of the schema, or name, made unique if needed """
+        if "$id" in schema:
+            name = schema["$id"]
+            if name[0] == '#':
+                name = name[1:]
+            return generator_factory.issue_name(name, exact=True)
+        return generator_factory.issue_name(name)
+
     @abstractmethod
     def generate_parser_call(self, out_var_name, out_file):
         pass
@@ -59,6 +102,32 @@ class Generator(ABC):
     def max_token_num(self):
         pass
 
+    @abstractmethod
+    def estimated_layout(self):
+        """ The estimated (size, alignment) of c_type in bytes, on the common 64 bit ABIs (see maxStructBytes) """
+
+    def memory_children(self):
+        """ (path suffix, generator, number of instances) of the values stored in c_type """
+        return []
+
+    @classmethod
+    def struct_layout(cls, members):
+        """ (size, alignment) of a struct of (size, alignment) members, padded the same way as C compilers do """
+        size = 0
+        alignment = 1
+        for member_size, member_alignment in members:
+            size = (size + member_alignment - 1) // member_alignment * member_alignment + member_size
+            alignment = max(alignment, member_alignment)
+        return (size + alignment - 1) // alignment * alignment, alignment
+
+    @abstractmethod
+    def build_python_validator(self):
+        """ A function checking a decoded JSON value (e.g. from json.loads) with the same rules as the C parser.
+
+        It is called as validate(value, context), with the ValidationContext of the document, and raises ValueError
+        for invalid values. The schema is only processed once, when building the function.
+        """
+
     @classmethod
     @abstractmethod
     def can_parse_schema(cls, schema):
@@ -77,6 +146,122 @@ class Generator(ABC):
     def generate_parser_bodies(self, out_file):
         pass
 
+    def generate_merge_patch_call(self, out_var_name, out_file):
+        """ Apply the JSON merge patch (RFC 7386) value of the current token to out_var_name (see mergePatch).
+
+        Everything but objects is replaced by the patch, with the same checks as parsing.
+        """
+        if self.settings.table_driven_parser:
+            out_file.print("if (builtin_table_parse(parse_state, &{}, {}))".format(self.table_descriptor_name, out_var_name))
+            with out_file.code_block():
+                out_file.print("return true;")
+        else:
+            self.generate_parser_call(out_var_name, out_file)
+
+    def generate_merge_patch_bodies(self, out_file):
+        pass
+
+    def parser_subtrees(self):
+        """ The generators whose parser bodies are generated by generate_parser_bodies (see split_parser_files) """
+        return []
+
+    def generate_bulk_conversion(self, token, out_var_name, out_file):
+        """ Convert the single token pointed to by 'token' into out_var_name, inside the bulk array parser loop.
+
+        Must not log errors, or modify parse_state: it should 'break' out of the loop on any invalid value, so that
+        the generic parser can report it.
+        """
+        _ = token, out_var_name, out_file  # used only by subclasses
+        assert self.supports_bulk_parsing, "Caller is responsible for checking this."
+
+    @classmethod
+    def generate_bulk_range_check(cls, checks, value, out_file):
+        conditions = ["({}) {} {}".format(value, operator, limit) for operator, limit in checks if limit is not None]
+        if not conditions:
+            return
+        out_file.print("if (!({}))".format(" && ".join(conditions)))
+        with out_file.code_block():
+            out_file.print("break;")
+
+    def unsupported_by_codec(self):
+        return ValueError("'{}' can not be stored in the binary wire format (binaryCodec)".format(self.name))
+
+    def generate_encoder_call(self, in_var_name, out_file):
+        """ Append the value pointed to by in_var_name to the binary record of 'encoder'. Return true on errors. """
+        _ = in_var_name, out_file  # used only by subclasses
+        raise self.unsupported_by_codec()
+
+    def generate_decoder_call(self, out_var_name, out_file):
+        """ Read the value from the binary record of 'decoder' into out_var_name. Return true on errors. """
+        _ = out_var_name, out_file  # used only by subclasses
+        raise self.unsupported_by_codec()
+
+    def generate_codec_bodies(self, out_file):
+        pass
+
+    def wire_signature(self):
+        """ Description of the binary wire format of this type, only changing if the format does """
+        raise self.unsupported_by_codec()
+
+    def max_encoded_size(self):
+        raise self.unsupported_by_codec()
+
+    @classmethod
+    def varint_size(cls, max_value):
+        return max(1, (max_value.bit_length() + 6) // 7)
+
+    @classmethod
+    def generate_builtin_codec_call(cls, call, out_file):
+        out_file.print("if ({})".format(call))
+        with out_file.code_block():
+            out_file.print("return true;")
+
+    def generate_decoder_range_check(self, checks, value, out_file):
+        conditions = ["({}) {} {}".format(value, operator, limit) for operator, limit in checks if limit is not None]
+        if not conditions:
+            return
+        out_file.print("if (!({}))".format(" && ".join(conditions)))
+        with out_file.code_block():
+            out_file.print("LOG_ERROR(decoder->position, \"Value of '{}' out of range in binary record\")".format(self.name))
+            out_file.print("return true;")
+
+    def python_value(self, in_var_name):
+        """ C expression creating the Python object of the value pointed to by in_var_name (see pythonModule).
+
+        It is a new reference, or NULL with a Python exception set.
+        """
+        _ = in_var_name  # used only by subclasses
+        raise ValueError("'{}' can not be converted to Python objects (pythonModule)".format(self.name))
+
+    def generate_python_bodies(self, out_file):
+        pass
+
+    PYTHON_OPERATORS = {
+        ">=": ge,
+        "<=": le,
+        ">": gt,
+        "<": lt,
+    }
+
+    @classmethod
+    def build_python_range_check(cls, checks, description):
+        """ A function raising ValueError if a number fails any of the (operator, limit) checks, or None """
+        checks = [
+            (cls.PYTHON_OPERATORS[check_operator], check_operator, limit)
+            for check_operator, limit in checks
+            if limit is not None
+        ]
+        if not checks:
+            return None
+
+        def check_range(value):
+            for check, check_operator, limit in checks:
+                if not check(value, limit):
+                    raise ValueError(
+                        "{} {} out of range. It must be {} {}.".format(description, value, check_operator, limit)
+                    )
+        return check_range
+
     def has_default_value(self):
         return self.js2cDefault is not None
 
@@ -87,8 +272,73 @@ class Generator(ABC):
         out_file.print("{} = {};".format(out_var_name, self.js2cDefault))
         return True
 
+    @property
+    def table_descriptor_name(self):
+        return "desc_{}".format(self.SANITIZE_RE.sub("_", self.name))
+
+    @emit_once
+    def generate_table_descriptor(self, out_file):
+        """ Generate the static descriptor used by the table-driven parser.
+
+        The default implementation wraps generate_parser_call into a function, and points the descriptor to it.
+        Generators that can be described with plain data override this.
+        """
+        parse_function = "parse_{}".format(self.SANITIZE_RE.sub("_", self.name))
+        out_file.print("static bool {}(parse_state_t *parse_state, void *out_ptr)".format(parse_function))
+        with out_file.code_block():
+            out_file.print("{} *out = out_ptr;".format(self.c_type))
+            self.generate_parser_call("out", out_file)
+            out_file.print("return false;")
+        out_file.print("")
+        self.generate_table_descriptor_struct("JS2C_KIND_CUSTOM", out_file, parse=parse_function)
+
+    def generate_table_descriptor_for_parser_bodies(self, out_file):
+        """ Hook the parse function of generate_parser_bodies into the table-driven parser.
+
+        For generators whose layout cannot be expressed with the descriptors.
+        """
+        self.generate_parser_bodies(out_file)
+        table_parse_function = "table_parse_{}".format(self.SANITIZE_RE.sub("_", self.name))
+        out_file.print("static bool {}(parse_state_t *parse_state, void *out_ptr)".format(table_parse_function))
+        with out_file.code_block():
+            out_file.print("return parse_{}(parse_state, out_ptr);".format(self.name))
+        out_file.print("")
+        self.generate_table_descriptor_struct("JS2C_KIND_CUSTOM", out_file, parse=table_parse_function)
+
+    def generate_table_descriptor_struct(self, kind, out_file, **fields):
+        out_file.print("static const js2c_type_desc_t {} = ".format(self.table_descriptor_name) + "{")
+        with out_file.indent():
+            out_file.print(".kind = {},".format(kind))
+            out_file.print(".size = sizeof({}),".format(self.c_type))
+            for field_name, value in fields.items():
+                out_file.print(".{} = {},".format(field_name, value))
+        out_file.print("};")
+        out_file.print("")
+
+    def generate_table_range_checks(self, checks, limit_field, limit_suffix, out_file):
+        """ Generate the range check array of a numeric descriptor.
+
+        Returns the descriptor fields referencing the array.
+        """
+        checks = [(operator, limit) for operator, limit in checks if limit is not None]
+        if not checks:
+            return {}
+        checks_name = "checks_{}".format(self.SANITIZE_RE.sub("_", self.name))
+        out_file.print("static const js2c_range_check_t {}[] = ".format(checks_name) + "{")
+        with out_file.indent():
+            for operator, limit in checks:
+                out_file.print(
+                    '{{"{op}", "{limit}", .{field} = {limit}{suffix}}},'
+                    .format(op=operator, limit=limit, field=limit_field, suffix=limit_suffix)
+                )
+        out_file.print("};")
+        return {"checks": checks_name, "check_count": len(checks)}
+
     @classmethod
     def generate_logged_error(cls, log_message, out_file):
+        message_format = log_message if isinstance(log_message, str) else log_message[0]
+        out_file.stats_error_sites.append("{}: {}".format(out_file.current_generator_name, message_format))
+        out_file.print("JS2C_STATS_ERROR_SITE(parse_state, {});".format(len(out_file.stats_error_sites) - 1))
         if isinstance(log_message, str):
             out_file.print("LOG_ERROR(CURRENT_TOKEN(parse_state).start, \"{}\", parse_state->current_key)".format(log_message))
         else:
@@ -22,7 +22,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 #
-from .base import Generator
+from .base import Generator, emit_once
 
 
 class BoolGenerator(Generator):
@@ -31,6 +31,7 @@ class BoolGenerator(Generator):
     )
     default = None
     c_type = "bool"
+    supports_bulk_parsing = True
 
     @classmethod
     def can_parse_schema(cls, schema):
@@ -44,6 +45,39 @@ class BoolGenerator(Generator):
         with out_file.code_block():
             out_file.print("return true;")
 
+    def generate_bulk_conversion(self, token, out_var_name, out_file):
+        out_file.print(
+            "if ({token}->type != JSMN_PRIMITIVE || builtin_token_to_bool(parse_state, {token}, &{out}))"
+            .format(token=token, out=out_var_name)
+        )
+        with out_file.code_block():
+            out_file.print("break;")
+
+    def generate_encoder_call(self, in_var_name, out_file):
+        self.generate_builtin_codec_call("builtin_encode_bool(encoder, *{})".format(in_var_name), out_file)
+
+    def generate_decoder_call(self, out_var_name, out_file):
+        self.generate_builtin_codec_call("builtin_decode_bool(decoder, {})".format(out_var_name), out_file)
+
+    def wire_signature(self):
+        return "b"
+
+    def max_encoded_size(self):
+        return 1
+
+    def python_value(self, in_var_name):
+        return "PyBool_FromLong(*{})".format(in_var_name)
+
+    def build_python_validator(self):
+        def validate_bool(value, _context):
+            if not isinstance(value, bool):
+                raise ValueError("Invalid boolean: {!r}".format(value))
+        return validate_bool
+
+    @emit_once
+    def generate_table_descriptor(self, out_file):
+        self.generate_table_descriptor_struct("JS2C_KIND_BOOL", out_file)
+
     def has_default_value(self):
         return super().has_default_value() or self.default is not None
 
@@ -59,3 +93,6 @@ class BoolGenerator(Generator):
 
     def max_token_num(self):
         return 1
+
+    def estimated_layout(self):
+        return 1, 1
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+import io
+import re
+
+from .code_block_printer import CodeBlockPrinter
+from .root import RootGenerator, NOTE_FOR_GENERATED_FILES
+
+
+class BuiltinsLibraryGenerator:
+    """ Generates the builtins and JSMN as a standalone library.
+
+    Parsers generated with include_external_builtins_file pointing to the library header only contain declarations,
+    so when many parsers are linked into one binary, the builtins are only compiled (and present) once.
+    """
+    FUNCTION_DEFINITION_RE = re.compile(r'^JS2C_API ([^;{]*?)\s*\{\n.*?^\}\n', re.MULTILINE | re.DOTALL)
+
+    def __init__(self, settings):
+        self.settings = settings
+
+    @classmethod
+    def builtins_source(cls):
+        builtins = io.StringIO()
+        builtins_printer = CodeBlockPrinter(builtins)
+        RootGenerator.manually_include_builtins(builtins_printer)
+        builtins_printer.flush()
+        return builtins.getvalue()
+
+    def generate_library_h(self, h_file):
+        h_file = CodeBlockPrinter(h_file)
+        h_file.write(NOTE_FOR_GENERATED_FILES)
+        h_file.print("#define JS2C_API")
+        h_file.print("#define JSMN_HEADER")
+        h_file.write(self.FUNCTION_DEFINITION_RE.sub(r'JS2C_API \1;\n', self.builtins_source()))
+        h_file.print("#undef JSMN_HEADER")
+        h_file.print("")
+        h_file.flush()
+
+    def generate_library_c(self, c_file):
+        c_file = CodeBlockPrinter(c_file)
+        c_file.write(NOTE_FOR_GENERATED_FILES)
+        if self.settings.c_prefix_file is not None:
+            c_file.print_separator("User-added prefix")
+            c_file.write(self.settings.c_prefix_file.read())
+        c_file.print("#define JS2C_API")
+        c_file.write(self.builtins_source())
+        c_file.flush()
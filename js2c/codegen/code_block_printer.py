@@ -22,6 +22,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 #
+import re
 
 
 class CodeBlockContextManager:
@@ -43,27 +44,81 @@ class CodeBlockContextManager:
 
 
 class CodeBlockPrinter:
+    """ Collects the generated code in memory, and writes it to the file with a single write on flush() """
+    # pylint: disable=too-many-instance-attributes
+    IDENTIFIER_RE = re.compile(r'[A-Za-z_]\w*')
+    BUILTIN_RE = re.compile(r'\bbuiltin_\w+')
+
     def __init__(self, file):
         self.file = file
-        self.indent_level = 0
+        self.fragments = []
+        self.line_prefix = "\n"
+        self._indent_level = 0
         self.last_was_else = False
+        self.emitted = set()
+        # Names of the counted fields and error sites, in the order of their JS2C_STATS counter indexes
+        self.stats_fields = []
+        self.stats_error_sites = []
+        self.current_generator_name = None
+        # Prototypes of the functions shared between the files of a split parser (see split_parser_files)
+        self.prototypes = None
+        # If not None, the builtin_* functions named in the printed lines are collected, to only include the
+        # used builtins
+        self.used_identifiers = None
+
+    def fork(self, file):
+        """ A printer for another file of the same parser.
+
+        It shares the emitted definitions, the JS2C_STATS sites and the prototypes with this printer,
+        so every definition is only emitted into one of the files.
+        """
+        printer = type(self)(file)
+        printer.emitted = self.emitted
+        printer.stats_fields = self.stats_fields
+        printer.stats_error_sites = self.stats_error_sites
+        printer.prototypes = self.prototypes
+        printer.used_identifiers = self.used_identifiers
+        return printer
+
+    @property
+    def indent_level(self):
+        return self._indent_level
+
+    @indent_level.setter
+    def indent_level(self, indent_level):
+        self._indent_level = indent_level
+        self.line_prefix = "\n" + " " * indent_level
 
     def print(self, line):
         """ Print an indented line """
+        if self.used_identifiers is not None and "builtin_" in line:
+            self.used_identifiers.update(self.BUILTIN_RE.findall(line))
         if line == "else":
-            self.file.write(" else ")
-        elif line == "{":
-            if self.last_was_else:
-                self.file.write("{")
-            else:
-                self.file.write(" {")
+            self.fragments.append(" else ")
+            self.last_was_else = True
+            return
+        if line == "{":
+            self.fragments.append("{" if self.last_was_else else " {")
         elif not line:
-            self.file.write("\n")
+            self.fragments.append("\n")
         elif self.last_was_else:
-            self.file.write(line)
+            self.fragments.append(line)
+        else:
+            self.fragments.append(self.line_prefix)
+            self.fragments.append(line)
+        self.last_was_else = False
+
+    def print_function_definition(self, declaration):
+        """ Print the first line of a function definition.
+
+        The function is static, unless the parser is split into several files. Then its prototype is collected
+        for the internal header instead.
+        """
+        if self.prototypes is None:
+            self.print("static " + declaration)
         else:
-            self.file.write("\n{}{}".format(" "*self.indent_level, line))
-        self.last_was_else = (line == "else")
+            self.prototypes.append(declaration + ";")
+            self.print(declaration)
 
     def print_with_docstring(self, line, docstring):
         if not docstring:
@@ -77,8 +132,23 @@ class CodeBlockPrinter:
 
     def write(self, data):
         """ Write raw data to the file """
-        self.file.write("\n")
-        self.file.write(data)
+        self.fragments.append("\n")
+        self.fragments.append(data)
+
+    def placeholder(self):
+        """ Reserve the place of code that is generated later (see fill_placeholder). Returns its position. """
+        self.fragments.append("")
+        return len(self.fragments) - 1
+
+    def fill_placeholder(self, position, printer):
+        """ Move the code collected by printer (e.g. a fork) to a place reserved by placeholder() """
+        self.fragments[position] = "".join(printer.fragments)
+        printer.fragments = []
+
+    def flush(self):
+        """ Write everything collected so far to the file """
+        self.file.write("".join(self.fragments))
+        self.fragments = []
 
     def code_block(self, indent_level=4):
         return CodeBlockContextManager(self, indent_level)
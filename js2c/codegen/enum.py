@@ -24,7 +24,7 @@
 #
 import re
 
-from .base import Generator
+from .base import Generator, emit_once
 
 
 class EnumGenerator(Generator):
@@ -70,6 +70,7 @@ class EnumGenerator(Generator):
         with out_file.code_block():
             out_file.print("return true;")
 
+    @emit_once
     def generate_type_declaration(self, out_file, *, force=False):
         _ = force  # This is python's way of saying (void)force
 
@@ -81,8 +82,11 @@ class EnumGenerator(Generator):
         out_file.print("}} {};".format(self.c_type))
         out_file.print("")
 
+    @emit_once
     def generate_parser_bodies(self, out_file):
-        out_file.print("static bool parse_{}(parse_state_t *parse_state, {} *out)".format(self.name, self.c_type))
+        out_file.print_function_definition(
+            "bool parse_{}(parse_state_t *parse_state, {} *out)".format(self.name, self.c_type)
+        )
         with out_file.code_block():
             out_file.print("if (check_type(parse_state, JSMN_STRING))")
             with out_file.code_block():
@@ -100,6 +104,60 @@ class EnumGenerator(Generator):
             out_file.print("return false;")
         out_file.print("")
 
+    def generate_encoder_call(self, in_var_name, out_file):
+        self.generate_builtin_codec_call("builtin_encode_unsigned(encoder, *{})".format(in_var_name), out_file)
+
+    def generate_decoder_call(self, out_var_name, out_file):
+        out_file.print("uint64_t enum_decode_tmp;")
+        self.generate_builtin_codec_call("builtin_decode_unsigned(decoder, &enum_decode_tmp)", out_file)
+        self.generate_decoder_range_check([("<", len(self.enum))], "enum_decode_tmp", out_file)
+        out_file.print("*{} = enum_decode_tmp;".format(out_var_name))
+
+    def wire_signature(self):
+        return "e({})".format(",".join(self.enum))
+
+    def max_encoded_size(self):
+        return self.varint_size(len(self.enum) - 1)
+
+    @property
+    def python_labels_name(self):
+        return "python_labels_{}".format(self.SANITIZE_RE.sub("_", self.name))
+
+    def python_value(self, in_var_name):
+        return "PyUnicode_FromString({}[*{}])".format(self.python_labels_name, in_var_name)
+
+    @emit_once
+    def generate_python_bodies(self, out_file):
+        out_file.print("static const char *const {}[] = ".format(self.python_labels_name) + "{")
+        with out_file.indent():
+            for enum_label in self.enum:
+                out_file.print('"{}",'.format(enum_label))
+        out_file.print("};")
+        out_file.print("")
+
+    def build_python_validator(self):
+        labels = frozenset(self.enum)
+
+        def validate_enum(value, _context):
+            if not isinstance(value, str) or value not in labels:
+                raise ValueError("Unknown enum value: {!r}".format(value))
+        return validate_enum
+
+    @emit_once
+    def generate_table_descriptor(self, out_file):
+        labels_name = "labels_{}".format(self.SANITIZE_RE.sub("_", self.name))
+        out_file.print("static const char *const {}[] = ".format(labels_name) + "{")
+        with out_file.indent():
+            for enum_label in self.enum:
+                out_file.print('"{}",'.format(enum_label))
+        out_file.print("};")
+        self.generate_table_descriptor_struct(
+            "JS2C_KIND_ENUM",
+            out_file,
+            labels=labels_name,
+            label_count=len(self.enum),
+        )
+
     def has_default_value(self):
         return super().has_default_value() or self.default is not None
 
@@ -110,3 +168,6 @@ class EnumGenerator(Generator):
 
     def max_token_num(self):
         return 1
+
+    def estimated_layout(self):
+        return 4, 4
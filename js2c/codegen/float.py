@@ -22,7 +22,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 #
-from .base import Generator
+from .base import Generator, emit_once
 
 
 class FloatGenerator(Generator):
@@ -39,6 +39,7 @@ class FloatGenerator(Generator):
     exclusiveMinimum = None
     exclusiveMaximum = None
     default = None
+    supports_bulk_parsing = True
 
     def __init__(self, schema, name, settings, generator_factory):
         super().__init__(schema, name, settings, generator_factory)
@@ -79,6 +80,82 @@ class FloatGenerator(Generator):
         self.generate_range_check(self.exclusiveMinimum, out_var_name, ">", out_file)
         self.generate_range_check(self.exclusiveMaximum, out_var_name, "<", out_file)
 
+    def generate_bulk_conversion(self, token, out_var_name, out_file):
+        out_file.print(
+            "if ({token}->type != JSMN_PRIMITIVE || builtin_token_to_double(parse_state, {token}, &{out}))"
+            .format(token=token, out=out_var_name)
+        )
+        with out_file.code_block():
+            out_file.print("break;")
+        self.generate_bulk_range_check(
+            [
+                (">=", self.minimum),
+                ("<=", self.maximum),
+                (">", self.exclusiveMinimum),
+                ("<", self.exclusiveMaximum),
+            ],
+            out_var_name,
+            out_file
+        )
+
+    def generate_encoder_call(self, in_var_name, out_file):
+        self.generate_builtin_codec_call("builtin_encode_double(encoder, *{})".format(in_var_name), out_file)
+
+    def generate_decoder_call(self, out_var_name, out_file):
+        self.generate_builtin_codec_call("builtin_decode_double(decoder, {})".format(out_var_name), out_file)
+        self.generate_decoder_range_check(
+            [
+                (">=", self.minimum),
+                ("<=", self.maximum),
+                (">", self.exclusiveMinimum),
+                ("<", self.exclusiveMaximum),
+            ],
+            "*{}".format(out_var_name),
+            out_file
+        )
+
+    def wire_signature(self):
+        return "d"
+
+    def max_encoded_size(self):
+        return 8
+
+    def python_value(self, in_var_name):
+        return "PyFloat_FromDouble(*{})".format(in_var_name)
+
+    def build_python_validator(self):
+        check_range = self.build_python_range_check(
+            [
+                (">=", self.minimum),
+                ("<=", self.maximum),
+                (">", self.exclusiveMinimum),
+                ("<", self.exclusiveMaximum),
+            ],
+            "Floating point value"
+        )
+
+        def validate_number(value, _context):
+            if value.__class__ is not float and value.__class__ is not int:
+                raise ValueError("Invalid floating point value: {!r}".format(value))
+            if check_range is not None:
+                check_range(value)
+        return validate_number
+
+    @emit_once
+    def generate_table_descriptor(self, out_file):
+        check_fields = self.generate_table_range_checks(
+            [
+                (">=", self.minimum),
+                ("<=", self.maximum),
+                (">", self.exclusiveMinimum),
+                ("<", self.exclusiveMaximum),
+            ],
+            "double_limit",
+            "",
+            out_file
+        )
+        self.generate_table_descriptor_struct("JS2C_KIND_DOUBLE", out_file, **check_fields)
+
     def has_default_value(self):
         return super().has_default_value() or self.default is not None
 
@@ -89,3 +166,6 @@ class FloatGenerator(Generator):
 
     def max_token_num(self):
         return 1
+
+    def estimated_layout(self):
+        return 8, 8
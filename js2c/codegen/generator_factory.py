@@ -22,13 +22,42 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 #
-from .array import ArrayGenerator
+from collections import OrderedDict
+import json
+
+from .array import ArrayGenerator, PooledStringArrayGenerator, ColumnarArrayGenerator
 from .integer import IntegerGenerator, NumericStringGenerator, IntegerStringAnyOfGenerator
 from .float import FloatGenerator
 from .bool import BoolGenerator
 from .object import ObjectGenerator
 from .string import StringGenerator
 from .enum import EnumGenerator
+from .union import UnionGenerator
+from .recursive import RecursiveReferenceGenerator
+
+
+def schema_to_json(schema, sort_keys=False):
+    """ JSON representation of a resolved schema.
+
+    Referenced definitions (which have a 'ref' attribute) are only written out at their first use, so this works
+    for recursive schemas too.
+    """
+    seen_refs = set()
+
+    def walk(node):
+        ref = getattr(node, "ref", None)
+        if ref is not None:
+            if ref in seen_refs:
+                return {"$ref": ref}
+            seen_refs.add(ref)
+            return {"$ref": ref, "definition": OrderedDict((k, walk(v)) for k, v in node.items())}
+        if isinstance(node, dict):
+            return OrderedDict((k, walk(v)) for k, v in node.items())
+        if isinstance(node, list):
+            return [walk(v) for v in node]
+        return node
+
+    return json.dumps(walk(schema), sort_keys=sort_keys)
 
 
 class GeneratorFactory:
@@ -37,17 +66,101 @@ class GeneratorFactory:
         EnumGenerator,
         NumericStringGenerator,
         IntegerStringAnyOfGenerator,
+        UnionGenerator,
         StringGenerator,
         IntegerGenerator,
         FloatGenerator,
         BoolGenerator,
         ObjectGenerator,
+        PooledStringArrayGenerator,
+        ColumnarArrayGenerator,
         ArrayGenerator,
     ]
+    DEFINITION_CONTAINERS = ("definitions", "$defs")
+    # Settings that change the generated code of the types (as opposed to only the root functions)
+    GENERATOR_SETTINGS = (
+        "allow_additional_properties",
+        "merge_patch",
+        "binary_codec",
+        "python_module",
+        "table_driven_parser",
+        "max_recursive_nodes",
+        "max_recursion_depth",
+    )
+
+    def __init__(self, root_name):
+        self.root_name = root_name
+        # id(definition) -> generator, and (ref, contents, settings) -> generator, for sharing among multiple root schemas
+        self.definition_generators = {}
+        self.shared_definition_generators = {}
+        # (generator, schema) pairs of every generator created, for profiling
+        self.created_generators = []
+        # id(definition) -> the reference to the definition from inside itself, while it is being constructed
+        self.definitions_in_construction = {}
+        # Names of the generated C types and functions
+        self.issued_names = set()
+
+    def definition_name(self, ref):
+        path = ref[2:].split('/')
+        if path[0] in self.DEFINITION_CONTAINERS:
+            path = path[1:]
+        return "_".join([self.root_name] + path)
+
+    def issue_name(self, name, exact=False):
+        """ Reserve a name for the types and functions of a generator.
+
+        Names derived from the schema path (e.g. a definition and a property of the root with the same name) get a
+        numeric suffix if they clash. exact names ($id) can not be changed, so they must be unique.
+        """
+        unique_name = name
+        suffix = 1
+        while unique_name in self.issued_names:
+            if exact:
+                raise ValueError("Multiple types are named '{}'. $id values must be unique.".format(name))
+            suffix += 1
+            unique_name = "{}_{}".format(name, suffix)
+        self.issued_names.add(unique_name)
+        return unique_name
+
+    def get_root_generator_for(self, schema, root_name, settings):
+        """ Definitions are named after the root schema that first uses them """
+        self.root_name = root_name
+        return self.get_generator_for(schema, root_name, settings)
+
+    def get_generator_for(self, schema, name, settings):
+        # Definitions referenced from multiple places get a single generator, and thus a single C type and parser.
+        ref = getattr(schema, "ref", None)
+        if ref is None:
+            return self.create_generator(schema, name, settings)
+        if id(schema) in self.definitions_in_construction:
+            # The definition references itself, so it can only be parsed through a pointer
+            if self.definitions_in_construction[id(schema)] is None:
+                self.definitions_in_construction[id(schema)] = RecursiveReferenceGenerator(
+                    schema, self.definition_name(ref), settings, self
+                )
+            return self.definitions_in_construction[id(schema)]
+        if id(schema) not in self.definition_generators:
+            # Root schemas generated into the same files share the generators of identical definitions, if their
+            # settings are the same too
+            key = (
+                ref,
+                schema_to_json(schema, sort_keys=True),
+                tuple(getattr(settings, setting) for setting in self.GENERATOR_SETTINGS),
+            )
+            if key not in self.shared_definition_generators:
+                self.definitions_in_construction[id(schema)] = None
+                generator = self.create_generator(schema, self.definition_name(ref), settings)
+                reference = self.definitions_in_construction.pop(id(schema))
+                if reference is not None:
+                    reference.set_target(generator)
+                self.shared_definition_generators[key] = generator
+            self.definition_generators[id(schema)] = self.shared_definition_generators[key]
+        return self.definition_generators[id(schema)]
 
-    @classmethod
-    def get_generator_for(cls, schema, name, settings):
-        for generator_class in cls.GENERATORS:
+    def create_generator(self, schema, name, settings):
+        for generator_class in self.GENERATORS:
             if generator_class.can_parse_schema(schema):
-                return generator_class(schema, name, settings, cls)
+                generator = generator_class(schema, name, settings, self)
+                self.created_generators.append((generator, schema))
+                return generator
         raise ValueError("Could not find any generators to parse schema: {}.".format(schema))
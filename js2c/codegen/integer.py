@@ -23,8 +23,10 @@
 # SOFTWARE.
 #
 from abc import abstractmethod
+import math
+import re
 
-from .base import Generator
+from .base import Generator, emit_once
 
 
 class IntegerGeneratorBase(Generator):
@@ -39,6 +41,12 @@ class IntegerGeneratorBase(Generator):
 
     SIGNED_TYPES = ["int64_t", "int32_t", "int16_t", "int8_t"]
     UNSIGNED_TYPES = ["uint64_t", "uint32_t", "uint16_t", "uint8_t"]
+    # The strings strtoll and strtoull convert completely, by radix
+    STRTOLL_SYNTAX = {
+        0: r"\s*[+-]?(0[xX][0-9a-fA-F]+|0[0-7]*|[1-9][0-9]*)",
+        10: r"\s*[+-]?[0-9]+",
+        16: r"\s*[+-]?(0[xX])?[0-9a-fA-F]+",
+    }
 
     minimum = None
     maximum = None
@@ -46,6 +54,7 @@ class IntegerGeneratorBase(Generator):
     exclusiveMaximum = None
     default = None
     js2cType = None
+    pattern = None
 
     def __init__(self, schema, name, settings, generator_factory):
         super().__init__(schema, name, settings, generator_factory)
@@ -59,12 +68,14 @@ class IntegerGeneratorBase(Generator):
 
         if self.c_type in self.UNSIGNED_TYPES:
             self.parser_fn = "builtin_parse_unsigned"
+            self.token_converter_fn = "builtin_token_to_unsigned"
             self.parsed_type = "uint64_t"
             self.default_suffix = "ULL"
             if self.minimum == 0:
                 self.minimum = None
         elif self.c_type in self.SIGNED_TYPES:
             self.parser_fn = "builtin_parse_signed"
+            self.token_converter_fn = "builtin_token_to_signed"
             self.parsed_type = "int64_t"
             self.default_suffix = "LL"
         else:
@@ -117,6 +128,137 @@ class IntegerGeneratorBase(Generator):
         self.generate_range_check(self.exclusiveMaximum, "int_parse_tmp", "<", out_file)
         out_file.print("*{} = int_parse_tmp;".format(out_var_name))
 
+    @property
+    def supports_bulk_parsing(self):
+        return self.number_allowed and not self.string_allowed
+
+    def generate_bulk_conversion(self, token, out_var_name, out_file):
+        out_file.print("{} value;".format(self.parsed_type))
+        out_file.print(
+            "if ({token}->type != JSMN_PRIMITIVE || {fn}(parse_state, {token}, &value))"
+            .format(token=token, fn=self.token_converter_fn)
+        )
+        with out_file.code_block():
+            out_file.print("break;")
+        self.generate_bulk_range_check(
+            [
+                (">=", self.minimum),
+                ("<=", self.maximum),
+                (">", self.exclusiveMinimum),
+                ("<", self.exclusiveMaximum),
+            ],
+            "value",
+            out_file
+        )
+        out_file.print("{} = value;".format(out_var_name))
+
+    def generate_encoder_call(self, in_var_name, out_file):
+        encoder_fn = "builtin_encode_signed" if self.parsed_type == "int64_t" else "builtin_encode_unsigned"
+        self.generate_builtin_codec_call("{}(encoder, *{})".format(encoder_fn, in_var_name), out_file)
+
+    def generate_decoder_call(self, out_var_name, out_file):
+        decoder_fn = "builtin_decode_signed" if self.parsed_type == "int64_t" else "builtin_decode_unsigned"
+        out_file.print("{} int_decode_tmp;".format(self.parsed_type))
+        self.generate_builtin_codec_call("{}(decoder, &int_decode_tmp)".format(decoder_fn), out_file)
+        checks = [
+            (">=", self.minimum),
+            ("<=", self.maximum),
+            (">", self.exclusiveMinimum),
+            ("<", self.exclusiveMaximum),
+        ]
+        if self.c_type != self.parsed_type:
+            checks.append(("==", "({})int_decode_tmp".format(self.c_type)))
+        self.generate_decoder_range_check(checks, "int_decode_tmp", out_file)
+        out_file.print("*{} = int_decode_tmp;".format(out_var_name))
+
+    def wire_signature(self):
+        return "i" if self.parsed_type == "int64_t" else "u"
+
+    def max_encoded_size(self):
+        bits = int(re.search("[0-9]+", self.c_type).group(0))
+        return self.varint_size((1 << bits) - 1)
+
+    def python_value(self, in_var_name):
+        if self.parsed_type == "int64_t":
+            return "PyLong_FromLongLong(*{})".format(in_var_name)
+        return "PyLong_FromUnsignedLongLong(*{})".format(in_var_name)
+
+    def python_parse_string(self, value):
+        """ The value of a numeric string, as strtoll/strtoull would parse it with the pattern's radix """
+        if self.radix == 0 and re.fullmatch(r"\s*[+-]?0[0-7]+", value):
+            return int(value, 8)
+        return int(value, self.radix)
+
+    def build_python_validator(self):
+        number_allowed = self.number_allowed
+        string_allowed = self.string_allowed
+        # The C parser does not match the pattern, it accepts every string strtoll/strtoull converts completely
+        pattern = re.compile(self.STRTOLL_SYNTAX[self.radix]) if string_allowed else None
+        if self.parsed_type == "int64_t":
+            low, high = -(1 << 63), (1 << 63) - 1
+        else:
+            low, high = 0, (1 << 64) - 1
+        check_range = self.build_python_range_check(
+            [
+                (">=", low),
+                ("<=", high),
+                (">=", self.minimum),
+                ("<=", self.maximum),
+                (">", self.exclusiveMinimum),
+                ("<", self.exclusiveMaximum),
+            ],
+            "Integer"
+        )
+        # All the checks folded into a single range, the checks themselves are only run to report errors
+        if self.minimum is not None:
+            low = max(low, math.ceil(self.minimum))
+        if self.exclusiveMinimum is not None:
+            low = max(low, math.floor(self.exclusiveMinimum) + 1)
+        if self.maximum is not None:
+            high = min(high, math.floor(self.maximum))
+        if self.exclusiveMaximum is not None:
+            high = min(high, math.ceil(self.exclusiveMaximum) - 1)
+
+        def validate_integer(value, _context):
+            # Exact type check, as bool is a subclass of int
+            if number_allowed and value.__class__ is int:
+                number = value
+            elif string_allowed and isinstance(value, str) and pattern.fullmatch(value):
+                number = self.python_parse_string(value)
+            else:
+                raise ValueError("Invalid integer: {!r}".format(value))
+            if not low <= number <= high:
+                check_range(number)
+                raise ValueError("Integer {} out of range.".format(number))
+        return validate_integer
+
+    @emit_once
+    def generate_table_descriptor(self, out_file):
+        checks = [
+            (">=", self.minimum),
+            ("<=", self.maximum),
+            (">", self.exclusiveMinimum),
+            ("<", self.exclusiveMaximum),
+        ]
+        for _, limit in checks:
+            if limit is not None and limit != int(limit):
+                raise ValueError("Integer limits must be integers in table-driven parsers: {}".format(limit))
+        if self.parsed_type == "int64_t":
+            kind = "JS2C_KIND_SIGNED"
+            limit_field = "signed_limit"
+        else:
+            kind = "JS2C_KIND_UNSIGNED"
+            limit_field = "unsigned_limit"
+        check_fields = self.generate_table_range_checks(checks, limit_field, self.default_suffix, out_file)
+        self.generate_table_descriptor_struct(
+            kind,
+            out_file,
+            number_allowed='true' if self.number_allowed else 'false',
+            string_allowed='true' if self.string_allowed else 'false',
+            radix=self.radix,
+            **check_fields
+        )
+
     def has_default_value(self):
         return super().has_default_value() or self.default is not None
 
@@ -128,6 +270,10 @@ class IntegerGeneratorBase(Generator):
     def max_token_num(self):
         return 1
 
+    def estimated_layout(self):
+        size = int(re.search("[0-9]+", self.c_type).group(0)) // 8
+        return size, size
+
 
 class IntegerGenerator(IntegerGeneratorBase):
     def __init__(self, schema, name, settings, generator_factory):
@@ -200,7 +346,8 @@ class NumericStringGenerator(IntegerGenerator):
 
 class IntegerStringAnyOfGenerator(NumericStringGenerator):
     def __init__(self, schema, name, settings, generator_factory):
-        combined_schema = schema['anyOf'][0]
+        # Copy, as the anyOf items might be definitions shared with other parts of the schema
+        combined_schema = dict(schema['anyOf'][0])
         combined_schema.update(schema['anyOf'][1])
         combined_schema['type'] = 'string'
         super().__init__(combined_schema, name, settings, generator_factory)
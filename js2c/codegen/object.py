@@ -24,10 +24,11 @@
 #
 import collections
 
-from .base import Generator
+from .base import Generator, emit_once
 
 
 class ObjectGenerator(Generator):
+    # pylint: disable=too-many-public-methods
     JSON_FIELDS = Generator.JSON_FIELDS + (
         "required",
         "additionalProperties",
@@ -63,6 +64,7 @@ class ObjectGenerator(Generator):
         with out_file.code_block():
             out_file.print("return true;")
 
+    @emit_once
     def generate_type_declaration(self, out_file, *, force=False):
         _ = force  # This is python's way of saying (void)force
 
@@ -79,10 +81,38 @@ class ObjectGenerator(Generator):
         out_file.print("}} {};".format(self.c_type))
         out_file.print("")
 
+    @classmethod
+    def field_out_var_name(cls, field_name, struct_var_name="out"):
+        """ The C expression the field is parsed into """
+        return "{}->{}".format(struct_var_name, field_name)
+
+    def parser_declaration(self):
+        return "bool parse_{}(parse_state_t *parse_state, {} *out)".format(self.name, self.c_type)
+
+    def encoder_declaration(self):
+        return "static bool encode_{}(js2c_encoder_t *encoder, const {} *in)".format(self.name, self.c_type)
+
+    def decoder_declaration(self):
+        return "static bool decode_{}(js2c_decoder_t *decoder, {} *out)".format(self.name, self.c_type)
+
+    def python_converter_declaration(self):
+        return "static PyObject *to_python_{}(const {} *in)".format(self.name, self.c_type)
+
     def generate_seen_flags(self, out_file):
         for field_name in self.fields:
             out_file.print("bool seen_{} = false;".format(field_name))
 
+    def generate_key_matcher_state(self, out_file):
+        """ Keys are matched in declaration order first, see builtin_match_key """
+        if not self.fields:
+            return
+        out_file.print("static const char *const field_names[] = {")
+        with out_file.indent():
+            for field_name in self.fields:
+                out_file.print('"{}",'.format(field_name))
+        out_file.print("};")
+        out_file.print("uint64_t expected_field = 0;")
+
     def generate_default_field_setting(self, out_file):
         for field_name, field_generator in self.fields.items():
             if not field_generator.has_default_value():
@@ -90,19 +120,22 @@ class ObjectGenerator(Generator):
             out_file.print("if (!seen_{})".format(field_name))
             with out_file.code_block():
                 field_generator.generate_set_default_value(
-                    "out->{}".format(field_name),
+                    self.field_out_var_name(field_name),
                     out_file
                 )
 
+    def check_field_is_required(self, field_name):
+        if field_name not in self.required:
+            raise ValueError(
+                "All fields must either be required or have a default value ({})"
+                .format(field_name)
+            )
+
     def generate_required_checks(self, out_file):
         for field_name, field_generator in self.fields.items():
             if field_generator.has_default_value():
                 continue
-            if field_name not in self.required:
-                raise ValueError(
-                    "All fields must either be required or have a default value ({})"
-                    .format(field_name)
-                )
+            self.check_field_is_required(field_name)
             out_file.print("if (!seen_{})".format(field_name))
             with out_file.code_block():
                 self.generate_logged_error("Missing required field in '%s': {}".format(field_name), out_file)
@@ -130,22 +163,55 @@ class ObjectGenerator(Generator):
                 out_file
             )
 
-    def generate_field_parsers(self, out_file):
+    def generate_special_key_parsers(self, out_file):
+        """ Hook for subclasses to handle keys that are not fields of the struct.
+
+        Every handler must be an 'if' followed by an 'else', as the field parsers are chained after them.
+        """
+
+    def generate_field_merge_patch(self, field_name, field_generator, out_file):
+        """ A null removes the field, i.e. resets it to its default value. Other values are merged into it. """
+        out_file.print("if (builtin_is_null(parse_state))")
+        with out_file.code_block():
+            if not field_generator.has_default_value():
+                self.generate_logged_error(
+                    "Field without default value can not be removed in '%s': {}".format(field_name), out_file
+                )
+            else:
+                field_generator.generate_set_default_value(self.field_out_var_name(field_name), out_file)
+                out_file.print("parse_state->current_token += 1;")
+        out_file.print("else")
+        with out_file.code_block():
+            field_generator.generate_merge_patch_call("&{}".format(self.field_out_var_name(field_name)), out_file)
+
+    def generate_field_parsers(self, out_file, merge_patch=False):
         self.generate_key_children_check(out_file)
-        for field_name, field_generator in self.fields.items():
-            out_file.print('if (current_string_is(parse_state, "{}"))'.format(field_name))
+        if self.fields:
+            out_file.print(
+                "const uint64_t field = builtin_match_key(parse_state, field_names, {}, &expected_field);"
+                .format(len(self.fields))
+            )
+        self.generate_special_key_parsers(out_file)
+        for field_index, (field_name, field_generator) in enumerate(self.fields.items()):
+            out_file.print("if (field == {}) /* {} */".format(field_index, field_name))
             with out_file.code_block():
                 out_file.print("if (seen_{})".format(field_name))
                 with out_file.code_block():
                     self.generate_logged_error("Duplicate field definition in '%s': {}".format(field_name), out_file)
                 out_file.print("seen_{} = true;".format(field_name))
+                if not merge_patch:
+                    out_file.stats_fields.append("{}.{}".format(self.name, field_name))
+                    out_file.print("JS2C_STATS_FIELD_HIT(parse_state, {});".format(len(out_file.stats_fields) - 1))
                 out_file.print("parse_state->current_token += 1;")
                 out_file.print("const char* saved_key = parse_state->current_key;")
                 out_file.print("parse_state->current_key = \"{}\";".format(field_name))
-                field_generator.generate_parser_call(
-                    "&out->{}".format(field_name),
-                    out_file
-                )
+                if merge_patch:
+                    self.generate_field_merge_patch(field_name, field_generator, out_file)
+                else:
+                    field_generator.generate_parser_call(
+                        "&{}".format(self.field_out_var_name(field_name)),
+                        out_file
+                    )
                 out_file.print("parse_state->current_key = saved_key;")
             out_file.print("else")
         with out_file.code_block():
@@ -155,17 +221,24 @@ class ObjectGenerator(Generator):
             else:
                 self.generate_logged_error(["Unknown field in '%s': %.*s", "parse_state->current_key", "CURRENT_STRING_FOR_ERROR(parse_state)"], out_file)
 
+    def parser_subtrees(self):
+        return list(self.fields.values())
+
+    @emit_once
     def generate_parser_bodies(self, out_file):
         for field_generator in self.fields.values():
             field_generator.generate_parser_bodies(out_file)
 
-        out_file.print("static bool parse_{}(parse_state_t *parse_state, {} *out)".format(self.name, self.c_type))
+        out_file.print_function_definition(self.parser_declaration())
         with out_file.code_block():
             out_file.print("if (check_type(parse_state, JSMN_OBJECT))")
             with out_file.code_block():
                 out_file.print("return true;")
 
+            if not self.fields:
+                out_file.print("(void)out;")
             self.generate_seen_flags(out_file)
+            self.generate_key_matcher_state(out_file)
 
             out_file.print("const uint64_t n = parse_state->tokens[parse_state->current_token].size;")
             out_file.print("parse_state->current_token += 1;")
@@ -178,6 +251,194 @@ class ObjectGenerator(Generator):
             out_file.print("return false;")
         out_file.print("")
 
+    def generate_merge_patch_call(self, out_var_name, out_file):
+        out_file.print("if (merge_patch_{}(parse_state, {}))".format(self.name, out_var_name))
+        with out_file.code_block():
+            out_file.print("return true;")
+
+    @emit_once
+    def generate_merge_patch_bodies(self, out_file):
+        """ Only the fields present in the patch are parsed, and the struct is not required to be complete """
+        for field_generator in self.fields.values():
+            field_generator.generate_merge_patch_bodies(out_file)
+
+        out_file.print("static bool merge_patch_{}(parse_state_t *parse_state, {} *out)".format(self.name, self.c_type))
+        with out_file.code_block():
+            out_file.print("if (check_type(parse_state, JSMN_OBJECT))")
+            with out_file.code_block():
+                out_file.print("return true;")
+
+            if not self.fields:
+                out_file.print("(void)out;")
+            self.generate_seen_flags(out_file)
+            self.generate_key_matcher_state(out_file)
+
+            out_file.print("const uint64_t n = parse_state->tokens[parse_state->current_token].size;")
+            out_file.print("parse_state->current_token += 1;")
+            out_file.print("for (uint64_t i = 0; i < n; ++i)")
+            with out_file.code_block():
+                self.generate_field_parsers(out_file, merge_patch=True)
+            out_file.print("return false;")
+        out_file.print("")
+
+    def generate_table_default_setter(self, field_name, field_generator, out_file):
+        setter_name = "default_{}_{}".format(self.SANITIZE_RE.sub("_", self.name), field_name)
+        out_file.print("static bool {}(parse_state_t *parse_state, void *out_ptr)".format(setter_name))
+        with out_file.code_block():
+            out_file.print("(void)parse_state;")
+            out_file.print("{} *out = out_ptr;".format(field_generator.c_type))
+            field_generator.generate_set_default_value("(*out)", out_file)
+            out_file.print("return false;")
+        out_file.print("")
+        return setter_name
+
+    @emit_once
+    def generate_table_descriptor(self, out_file):
+        for field_generator in self.fields.values():
+            field_generator.generate_table_descriptor(out_file)
+
+        field_descriptors = []
+        for field_name, field_generator in self.fields.items():
+            if field_generator.has_default_value():
+                default_setter = self.generate_table_default_setter(field_name, field_generator, out_file)
+            else:
+                self.check_field_is_required(field_name)
+                default_setter = "NULL"
+            out_file.stats_fields.append("{}.{}".format(self.name, field_name))
+            field_descriptors.append(
+                '{{"{name}", {length}, offsetof({c_type}, {name}), &{desc}, {default_setter}, {stats_index}}},'.format(
+                    name=field_name,
+                    length=len(field_name),
+                    c_type=self.c_type,
+                    desc=field_generator.table_descriptor_name,
+                    default_setter=default_setter,
+                    stats_index=len(out_file.stats_fields) - 1,
+                )
+            )
+
+        fields_name = "NULL"
+        if field_descriptors:
+            fields_name = "fields_{}".format(self.SANITIZE_RE.sub("_", self.name))
+            out_file.print("static const js2c_field_desc_t {}[] = ".format(fields_name) + "{")
+            with out_file.indent():
+                for field_descriptor in field_descriptors:
+                    out_file.print(field_descriptor)
+            out_file.print("};")
+        self.generate_table_descriptor_struct(
+            "JS2C_KIND_OBJECT",
+            out_file,
+            fields=fields_name,
+            field_count=len(field_descriptors),
+            allow_additional_properties='true' if self.settings.allow_additional_properties else 'false',
+        )
+
+    def generate_encoder_call(self, in_var_name, out_file):
+        self.generate_builtin_codec_call("encode_{}(encoder, {})".format(self.name, in_var_name), out_file)
+
+    def generate_decoder_call(self, out_var_name, out_file):
+        self.generate_builtin_codec_call("decode_{}(decoder, {})".format(self.name, out_var_name), out_file)
+
+    @emit_once
+    def generate_codec_bodies(self, out_file):
+        for field_generator in self.fields.values():
+            field_generator.generate_codec_bodies(out_file)
+
+        out_file.print(self.encoder_declaration())
+        with out_file.code_block():
+            if not self.fields:
+                out_file.print("(void)encoder;")
+                out_file.print("(void)in;")
+            for field_name, field_generator in self.fields.items():
+                field_generator.generate_encoder_call("&{}".format(self.field_out_var_name(field_name, "in")), out_file)
+            out_file.print("return false;")
+        out_file.print("")
+
+        out_file.print(self.decoder_declaration())
+        with out_file.code_block():
+            if not self.fields:
+                out_file.print("(void)decoder;")
+                out_file.print("(void)out;")
+            for field_name, field_generator in self.fields.items():
+                # In a block of its own, for the temporary variables of the field
+                out_file.print("/* {} */".format(field_name))
+                with out_file.code_block():
+                    field_generator.generate_decoder_call("&{}".format(self.field_out_var_name(field_name)), out_file)
+            out_file.print("return false;")
+        out_file.print("")
+
+    def wire_signature(self):
+        return "{{{}}}".format(
+            ",".join(
+                "{}:{}".format(field_name, field_generator.wire_signature())
+                for field_name, field_generator in self.fields.items()
+            )
+        )
+
+    def max_encoded_size(self):
+        return sum(field_generator.max_encoded_size() for field_generator in self.fields.values())
+
+    def python_value(self, in_var_name):
+        return "to_python_{}({})".format(self.name, in_var_name)
+
+    @emit_once
+    def generate_python_bodies(self, out_file):
+        for field_generator in self.fields.values():
+            field_generator.generate_python_bodies(out_file)
+
+        out_file.print(self.python_converter_declaration())
+        with out_file.code_block():
+            if not self.fields:
+                out_file.print("(void)in;")
+            out_file.print("PyObject *out = PyDict_New();")
+            out_file.print("if (out == NULL)")
+            with out_file.code_block():
+                out_file.print("return NULL;")
+            for field_name, field_generator in self.fields.items():
+                out_file.print(
+                    'if (python_set_item(out, "{}", {}))'
+                    .format(field_name, field_generator.python_value("&{}".format(self.field_out_var_name(field_name, "in"))))
+                )
+                with out_file.code_block():
+                    out_file.print("Py_DECREF(out);")
+                    out_file.print("return NULL;")
+            out_file.print("return out;")
+        out_file.print("")
+
+    def python_special_keys(self):
+        """ Keys that are not fields, but are handled by generate_special_key_parsers """
+        return frozenset()
+
+    def build_python_validator(self):
+        field_validators = {
+            field_name: field_generator.build_python_validator()
+            for field_name, field_generator in self.fields.items()
+        }
+        required_fields = []
+        for field_name, field_generator in self.fields.items():
+            if not field_generator.has_default_value():
+                self.check_field_is_required(field_name)
+                required_fields.append(field_name)
+        special_keys = self.python_special_keys()
+        allow_additional_properties = bool(self.settings.allow_additional_properties)
+
+        def validate_object(value, context):
+            if not isinstance(value, dict):
+                raise ValueError("Invalid object: {!r}".format(value))
+            for key, item in value.items():
+                field_validator = field_validators.get(key)
+                if field_validator is None:
+                    if key in special_keys or allow_additional_properties:
+                        continue
+                    raise ValueError("Unknown field: {}".format(key))
+                try:
+                    field_validator(item, context)
+                except ValueError as error:
+                    raise ValueError("{}: {}".format(key, error)) from None
+            for field_name in required_fields:
+                if field_name not in value:
+                    raise ValueError("Missing required field: {}".format(field_name))
+        return validate_object
+
     def has_default_value(self):
         if super().has_default_value():
             return True
@@ -194,3 +455,9 @@ class ObjectGenerator(Generator):
 
     def max_token_num(self):
         return sum(1 + field_generator.max_token_num() for field_generator in self.fields.values()) + 1
+
+    def estimated_layout(self):
+        return self.struct_layout(field_generator.estimated_layout() for field_generator in self.fields.values())
+
+    def memory_children(self):
+        return [(".{}".format(field_name), field_generator, 1) for field_name, field_generator in self.fields.items()]
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+from .base import Generator, emit_once
+from .object import ObjectGenerator
+from .union import UnionGenerator
+
+
+class RecursiveReferenceGenerator(Generator):
+    """ A reference to a definition from inside the definition itself, e.g. to the children of a tree node.
+
+    It is stored as a pointer to a node, allocated from the node pool given to the parser. The node is only parsed
+    after its parent is finished (see builtin_defer_parse), so deep documents do not use more C stack.
+    """
+
+    def __init__(self, schema, name, settings, generator_factory):
+        super().__init__(schema, name, settings, generator_factory)
+        self.target = None
+
+    def set_target(self, target):
+        """ Called once the referenced definition is constructed """
+        if not isinstance(target, (ObjectGenerator, UnionGenerator)):
+            raise ValueError("Recursive references must point to objects: {}".format(target.name))
+        self.target = target
+        self.name = target.name
+        self.c_type = "struct {}_s *".format(target.name)
+
+    @classmethod
+    def choose_name(cls, schema, name, generator_factory):
+        # The name of the target, see set_target
+        return name
+
+    @classmethod
+    def can_parse_schema(cls, schema):
+        return False
+
+    def generate_parser_call(self, out_var_name, out_file):
+        out_file.print(
+            "*{out} = builtin_defer_parse(parse_state, sizeof({name}_t), _Alignof({name}_t), deferred_parse_{name});"
+            .format(out=out_var_name, name=self.target.name)
+        )
+        out_file.print("if (*{} == NULL)".format(out_var_name))
+        with out_file.code_block():
+            out_file.print("return true;")
+
+    @emit_once
+    def generate_parser_bodies(self, out_file):
+        # The parse function of the target is being generated, so it is not declared yet. Split parsers declare
+        # it in their internal header.
+        if out_file.prototypes is None:
+            out_file.print(
+                "static bool parse_{name}(parse_state_t *parse_state, {name}_t *out);".format(name=self.target.name)
+            )
+        out_file.print_function_definition(
+            "bool deferred_parse_{}(parse_state_t *parse_state, void *out)".format(self.target.name)
+        )
+        with out_file.code_block():
+            out_file.print("return parse_{}(parse_state, out);".format(self.target.name))
+        out_file.print("")
+
+    def build_python_validator(self):
+        target = self.target
+        max_depth = self.settings.max_recursion_depth
+        max_node_num = self.settings.max_recursive_nodes
+        validate_target = None
+
+        def validate_reference(value, context):
+            nonlocal validate_target
+            if validate_target is None:
+                validate_target = target.build_python_validator()
+            # The depth and the nodes are counted for the whole document, see ValidationContext
+            if max_depth is not None and context.recursion_depth >= max_depth:
+                raise ValueError("Too deep nesting. Maximum depth: {}.".format(max_depth))
+            if context.recursive_node_num >= max_node_num:
+                raise ValueError("Too many nodes. Maximum: {}.".format(max_node_num))
+            context.recursive_node_num += 1
+            context.recursion_depth += 1
+            try:
+                validate_target(value, context)
+            finally:
+                context.recursion_depth -= 1
+        return validate_reference
+
+    def has_default_value(self):
+        return True
+
+    def generate_set_default_value(self, out_var_name, out_file):
+        out_file.print("{} = NULL;".format(out_var_name))
+
+    def max_token_num(self):
+        # The tokens of the nodes are counted separately, see maxRecursiveNodes
+        return 0
+
+    def estimated_layout(self):
+        return 8, 8
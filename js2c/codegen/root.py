@@ -22,16 +22,80 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 #
+import collections
+import functools
+import io
 import os
 import re
+import zlib
 
+from .base import ValidationContext
 from .code_block_printer import CodeBlockPrinter
 
 from .generator_factory import GeneratorFactory
+from .recursive import RecursiveReferenceGenerator
 
 
 DIR_OF_THIS_FILE = os.path.dirname(__file__)
 
+# Size of the header of binary wire format records (see builtin_encode_header)
+JS2C_WIRE_HEADER_SIZE = 8
+
+# Estimated sizes of jsmntok_t and js2c_binary_value_t, for the stack usage of the token buffers
+JSMNTOK_SIZE = 16
+JS2C_BINARY_VALUE_SIZE = 16
+# Estimated size of js2c_deferred_parse_t, for the stack usage of the pending nodes of recursive schemas
+JS2C_DEFERRED_PARSE_SIZE = 40
+
+# Definitions and forward declarations of functions in js2c_builtins.h. The name is the first group.
+# Definitions include the comment right before them.
+BUILTIN_DEFINITION_RE = re.compile(
+    r'(?:^/\*(?:(?!\*/).)*\*/\n)?^JS2C_API [^;{]*?\b(\w+)\([^;{]*\{\n.*?^\}\n\n?',
+    re.MULTILINE | re.DOTALL
+)
+BUILTIN_PROTOTYPE_RE = re.compile(r'^JS2C_API [^;{]*?\b(\w+)\([^;{]*\);\n\n?', re.MULTILINE)
+# Builtins named only in comments are not used
+C_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+
+
+@functools.lru_cache(maxsize=4)
+def parse_builtins(builtins_file_contents):
+    """ Split js2c_builtins.h into its functions and the rest, for remove_unused_builtins.
+
+    Returns (segments, callees, always_used): segments are the (function name or None, text) pairs of the file in
+    order, callees are the other builtins called by every function, and always_used are the identifiers in the rest
+    of the file (types and macros) and the functions not named builtin_*, which are always included.
+    """
+    spans = sorted(
+        (match.start(), match.end(), match.group(1))
+        for regex in (BUILTIN_DEFINITION_RE, BUILTIN_PROTOTYPE_RE)
+        for match in regex.finditer(builtins_file_contents)
+    )
+    segments = []
+    position = 0
+    for start, end, name in spans:
+        segments.append((None, builtins_file_contents[position:start]))
+        segments.append((name, builtins_file_contents[start:end]))
+        position = end
+    segments.append((None, builtins_file_contents[position:]))
+
+    def identifiers(text):
+        return set(CodeBlockPrinter.IDENTIFIER_RE.findall(C_COMMENT_RE.sub("", text)))
+
+    callees = collections.defaultdict(set)
+    for name, text in segments:
+        if name is not None:
+            callees[name].update(identifiers(text))
+    for name in callees:
+        callees[name] = {identifier for identifier in callees[name] if identifier in callees and identifier != name}
+    always_used = set()
+    for name, text in segments:
+        if name is None:
+            always_used.update(identifiers(text))
+    always_used.update(name for name in callees if not name.startswith("builtin_"))
+    return segments, dict(callees), frozenset(always_used)
+
+
 NOTE_FOR_GENERATED_FILES = """
 /* This file was generated by JSON Schema to C.
  * Any changes made to it will be lost on regeneration. */
@@ -39,16 +103,324 @@ NOTE_FOR_GENERATED_FILES = """
 
 
 class RootGenerator:
-    def __init__(self, schema, settings):
+    # pylint: disable=too-many-public-methods
+    printer_class = CodeBlockPrinter
+    # Binary input format -> builtin function converting it to tokens
+    BINARY_INPUT_FORMATS = collections.OrderedDict([
+        ("cbor", "builtin_parse_cbor"),
+        ("msgpack", "builtin_parse_msgpack"),
+    ])
+
+    def __init__(self, schema, settings, extra_roots=()):
+        """ extra_roots are (schema, settings) pairs of further root schemas, generated into the same files.
+
+        Types of identical definitions in the root schemas are only generated once.
+        """
         self.settings = settings
-        self.root_generator = GeneratorFactory.get_generator_for(schema, schema['$id'], settings)
+        self.generator_factory = GeneratorFactory(schema['$id'])
+        self.roots = collections.OrderedDict()
+        # Root name -> generators of the definitions referencing themselves
+        self.recursive_targets = {}
+        for root_schema, root_settings in [(schema, settings)] + list(extra_roots):
+            root_name = root_schema['$id']
+            if root_name in self.roots:
+                raise ValueError("Multiple root schemas have the same $id: {}".format(root_name))
+            for binary_format in self.binary_input_formats(root_settings):
+                if binary_format not in self.BINARY_INPUT_FORMATS:
+                    raise ValueError(
+                        "Unknown binary input format: {}. Valid formats are: {}"
+                        .format(binary_format, ", ".join(self.BINARY_INPUT_FORMATS))
+                    )
+            self.roots[root_name] = (
+                self.generator_factory.get_root_generator_for(root_schema, root_name, root_settings),
+                root_settings,
+            )
+            self.recursive_targets[root_name] = self.find_recursive_targets(self.roots[root_name][0])
+            if self.recursive_targets[root_name]:
+                self.check_recursive_root(root_name, root_settings)
+        if settings.python_module is not None and not re.fullmatch("[A-Za-z_][A-Za-z0-9_]*", settings.python_module):
+            raise ValueError("pythonModule must be a valid module name: {}".format(settings.python_module))
+        if self.split_parser_file_num(settings) < 1:
+            raise ValueError("splitParserFiles must be at least 1: {}".format(settings.split_parser_files))
+        if self.split_parser_file_num(settings) > 1 and settings.table_driven_parser:
+            raise ValueError("splitParserFiles can not be used with tableDrivenParser")
         self.name = schema['$id']
+        self.root_generator = self.roots[self.name][0]
+        self.stats_names = None
+        self.check_memory_budgets()
 
-    def generate_root_parser(self, out_file, max_token_num):
-        out_file.print("bool json_parse_{name}(const char *json_string, {name}_t *out)".format(name=self.name))
+    @classmethod
+    def binary_input_formats(cls, settings):
+        if not settings.binary_input_formats:
+            return []
+        return [
+            binary_format.strip() for binary_format in settings.binary_input_formats.split(",") if binary_format.strip()
+        ]
+
+    @classmethod
+    def split_parser_file_num(cls, settings):
+        if settings.split_parser_files is None:
+            return 1
+        return settings.split_parser_files
+
+    @classmethod
+    def internal_header_name(cls, h_file_name):
+        """ The header shared by the files of a split parser """
+        return os.path.splitext(h_file_name)[0] + "_internal.h"
+
+    @classmethod
+    def find_recursive_targets(cls, root_generator):
+        """ The generators of the definitions referenced from inside themselves """
+        targets = collections.OrderedDict()
+        seen_generators = set()
+        pending = [root_generator]
+        while pending:
+            generator = pending.pop()
+            if id(generator) in seen_generators:
+                continue
+            seen_generators.add(id(generator))
+            if isinstance(generator, RecursiveReferenceGenerator):
+                targets[generator.target.name] = generator.target
+            pending.extend(reversed([child_generator for _, child_generator, _ in generator.memory_children()]))
+        return list(targets.values())
+
+    @classmethod
+    def check_recursive_root(cls, name, root_settings):
+        if root_settings.max_recursive_nodes is None:
+            raise ValueError("maxRecursiveNodes must be set for recursive schemas: {}".format(name))
+        if root_settings.max_recursive_nodes < 1:
+            raise ValueError("maxRecursiveNodes must be at least 1: {}".format(root_settings.max_recursive_nodes))
+        if root_settings.max_recursion_depth is not None and root_settings.max_recursion_depth < 1:
+            raise ValueError("maxRecursionDepth must be at least 1: {}".format(root_settings.max_recursion_depth))
+        if root_settings.table_driven_parser:
+            raise ValueError("Recursive schemas can not be used with tableDrivenParser: {}".format(name))
+        if root_settings.merge_patch:
+            raise ValueError("Recursive schemas can not be used with mergePatch: {}".format(name))
+
+    def token_buffer_num(self, name):
+        root_generator, root_settings = self.roots[name]
+        max_token_num = root_generator.max_token_num()
+        if root_settings.allow_additional_properties is not None:
+            max_token_num += root_settings.allow_additional_properties
+        if self.recursive_targets[name]:
+            max_token_num += root_settings.max_recursive_nodes * max(
+                target.max_token_num() for target in self.recursive_targets[name]
+            )
+        return max_token_num
+
+    def deferred_buffer_num(self, name):
+        """ Size of the stack of the nodes still to be parsed, for recursive schemas """
+        if not self.recursive_targets[name]:
+            return 0
+        return self.roots[name][1].max_recursive_nodes
+
+    def node_pool_parameters(self, name):
+        """ The extra parameters of the parse functions of recursive schemas """
+        if not self.recursive_targets[name]:
+            return ""
+        return ", void *node_pool, size_t node_pool_size"
+
+    def node_pool_arguments(self, name):
+        if not self.recursive_targets[name]:
+            return ""
+        return ", node_pool, node_pool_size"
+
+    @classmethod
+    def node_pool_size_name(cls, name):
+        return "{}_NODE_POOL_SIZE".format(re.sub("[^A-Z0-9]", "_", name.upper()))
+
+    @classmethod
+    def token_buffer_bytes_per_token(cls, root_settings):
+        """ Stack space used per token by the largest document parser of the root """
+        if cls.binary_input_formats(root_settings):
+            return JSMNTOK_SIZE + JS2C_BINARY_VALUE_SIZE
+        return JSMNTOK_SIZE
+
+    @classmethod
+    def memory_contributors(cls, name, root_generator, metric):
+        """ (path, bytes) of every value in the root type, largest first.
+
+        metric(generator) is the number of bytes of a single instance, which is multiplied by the number of instances.
+        """
+        contributors = []
+
+        def walk(path, generator, instance_num):
+            contributors.append((path, instance_num * metric(generator)))
+            for path_suffix, child_generator, child_instance_num in generator.memory_children():
+                walk(path + path_suffix, child_generator, instance_num * child_instance_num)
+
+        walk(name, root_generator, 1)
+        return sorted(contributors[1:], key=lambda contributor: contributor[1], reverse=True)
+
+    @classmethod
+    def memory_budget_error(cls, description, estimate, setting_name, budget, contributors):
+        lines = ["{} is estimated to be {} bytes, more than {} ({}). The largest contributors:".format(
+            description, estimate, setting_name, budget
+        )]
+        for path, size in contributors[:8]:
+            lines.append("    {}: {} bytes".format(path, size))
+        return ValueError("\n".join(lines))
+
+    def build_python_validator(self):
+        """ The Python validator of the main root (see js2c.validator) """
+        validate_root = self.root_generator.build_python_validator()
+
+        def validate_document(value):
+            validate_root(value, ValidationContext())
+        return validate_document
+
+    def check_memory_budgets(self):
+        for name, (root_generator, root_settings) in self.roots.items():
+            self.check_memory_budget(name, root_generator, root_settings)
+
+    def check_memory_budget(self, name, root_generator, root_settings):
+        struct_bytes = root_generator.estimated_layout()[0]
+        if root_settings.max_struct_bytes is not None and struct_bytes > root_settings.max_struct_bytes:
+            raise self.memory_budget_error(
+                "{}_t".format(name), struct_bytes, "maxStructBytes", root_settings.max_struct_bytes,
+                self.memory_contributors(name, root_generator, lambda generator: generator.estimated_layout()[0])
+            )
+
+        bytes_per_token = self.token_buffer_bytes_per_token(root_settings)
+        token_num = self.token_buffer_num(name)
+        deferred_bytes = self.deferred_buffer_num(name) * JS2C_DEFERRED_PARSE_SIZE
+        stack_bytes = token_num * bytes_per_token + deferred_bytes
+        if root_settings.max_stack_bytes is not None and stack_bytes > root_settings.max_stack_bytes:
+            contributors = self.memory_contributors(
+                name, root_generator, lambda generator: generator.max_token_num() * bytes_per_token
+            )
+            if root_settings.allow_additional_properties:
+                contributors.append(
+                    ("allowAdditionalProperties", root_settings.allow_additional_properties * bytes_per_token)
+                )
+            if deferred_bytes:
+                contributors.append((
+                    "maxRecursiveNodes",
+                    (token_num - root_generator.max_token_num() - (root_settings.allow_additional_properties or 0))
+                    * bytes_per_token + deferred_bytes
+                ))
+            contributors.sort(key=lambda contributor: contributor[1], reverse=True)
+            raise self.memory_budget_error(
+                "The token buffer of {}".format(name), stack_bytes, "maxStackBytes", root_settings.max_stack_bytes,
+                contributors
+            )
+
+    def print_memory_report(self, out):
+        """ The estimated size of every generated type and the stack space of the token buffers """
+        types = collections.OrderedDict()
+
+        def walk(generator):
+            if generator.c_type == "{}_t".format(generator.name):
+                types[generator.c_type] = generator.estimated_layout()[0]
+            for _, child_generator, _ in generator.memory_children():
+                walk(child_generator)
+
+        print("Estimated memory usage (64 bit ABI):", file=out)
+        for name, (root_generator, root_settings) in self.roots.items():
+            token_num = self.token_buffer_num(name)
+            print(
+                "  Token buffer of {}: {} tokens, {} bytes of stack".format(
+                    name, token_num, token_num * self.token_buffer_bytes_per_token(root_settings)
+                ),
+                file=out
+            )
+            if self.recursive_targets[name]:
+                print(
+                    "  Pending nodes of {}: {} bytes of stack".format(
+                        name, self.deferred_buffer_num(name) * JS2C_DEFERRED_PARSE_SIZE
+                    ),
+                    file=out
+                )
+            walk(root_generator)
+        for c_type, size in sorted(types.items(), key=lambda c_type_and_size: c_type_and_size[1], reverse=True):
+            print("  sizeof({}): {} bytes".format(c_type, size), file=out)
+
+    def generate_memory_budget_asserts(self, name, root_settings, out_file):
+        if root_settings.max_struct_bytes is not None:
+            out_file.print(
+                '_Static_assert(sizeof({name}_t) <= {budget}, "{name}_t is larger than maxStructBytes");'
+                .format(name=name, budget=root_settings.max_struct_bytes)
+            )
+        if root_settings.max_stack_bytes is not None:
+            token_size = "sizeof(jsmntok_t)"
+            if self.binary_input_formats(root_settings):
+                token_size = "(sizeof(jsmntok_t) + sizeof(js2c_binary_value_t))"
+            deferred_size = ""
+            if self.deferred_buffer_num(name):
+                deferred_size = " + sizeof(js2c_deferred_parse_t) * {}".format(self.deferred_buffer_num(name))
+            out_file.print(
+                '_Static_assert({token_size} * {token_num}{deferred_size} <= {budget}, "The token buffer of {name} '
+                'is larger than maxStackBytes");'.format(
+                    token_size=token_size,
+                    token_num=self.token_buffer_num(name),
+                    deferred_size=deferred_size,
+                    budget=root_settings.max_stack_bytes,
+                    name=name,
+                )
+            )
+
+    def generate_parse_tokens(self, name, root_generator, out_file):
+        """ Parse the already tokenized document in parse_state into out
+
+        Nodes of recursive schemas are allocated from the node pool, and parsed from an explicit stack of pending
+        nodes after their parents, instead of recursing on the C stack.
+        """
+        deferred_buffer_num = self.deferred_buffer_num(name)
+        if deferred_buffer_num:
+            max_depth = self.roots[name][1].max_recursion_depth
+            out_file.print("js2c_deferred_parse_t deferred_buffer[{}];".format(deferred_buffer_num))
+            out_file.print(
+                "js2c_recursion_t recursion = {{node_pool, node_pool_size, 0, deferred_buffer, 0, 0, {}, 0, {}}};"
+                .format(deferred_buffer_num, max_depth if max_depth is not None else deferred_buffer_num)
+            )
+            out_file.print("parse_state->recursion = &recursion;")
+        if self.settings.table_driven_parser:
+            out_file.print(
+                "if (builtin_table_parse(parse_state, &{}, out))"
+                .format(root_generator.table_descriptor_name)
+            )
+            with out_file.code_block():
+                out_file.print("return true;")
+        else:
+            root_generator.generate_parser_call(
+                "out",
+                out_file,
+            )
+        if deferred_buffer_num:
+            out_file.print("if (builtin_parse_deferred(parse_state))")
+            with out_file.code_block():
+                out_file.print("return true;")
+
+    def generate_binary_root_parser(self, name, root_generator, binary_format, max_token_num, out_file):
+        out_file.print(
+            "bool {format}_parse_{name}(const uint8_t *data, size_t size, {name}_t *out{node_pool})"
+            .format(format=binary_format, name=name, node_pool=self.node_pool_parameters(name))
+        )
+        with out_file.code_block():
+            out_file.print("parse_state_t parse_state_buffer;")
+            out_file.print("parse_state_t *parse_state = &parse_state_buffer;")
+            out_file.print("JS2C_STATS_INIT(parse_state);")
+            out_file.print("jsmntok_t token_buffer[{}];".format(max_token_num))
+            out_file.print("js2c_binary_value_t value_buffer[{}];".format(max_token_num))
+            out_file.print(
+                "if ({}(parse_state, token_buffer, value_buffer, {}, data, size))"
+                .format(self.BINARY_INPUT_FORMATS[binary_format], max_token_num)
+            )
+            with out_file.code_block():
+                out_file.print("return true;")
+            self.generate_parse_tokens(name, root_generator, out_file)
+            out_file.print("return false;")
+        out_file.print("")
+
+    def generate_root_parser(self, name, root_generator, root_settings, out_file):
+        max_token_num = self.token_buffer_num(name)
+        self.generate_memory_budget_asserts(name, root_settings, out_file)
+
+        out_file.print(
+            "static bool parse_document_{name}(parse_state_t *parse_state, const char *json_string, {name}_t *out"
+            "{node_pool})".format(name=name, node_pool=self.node_pool_parameters(name))
+        )
         with out_file.code_block():
-            out_file.print("parse_state_t parse_state_var;")
-            out_file.print("parse_state_t *parse_state = &parse_state_var;")
             out_file.print("jsmntok_t token_buffer[{}];".format(max_token_num))
             out_file.print(
                 "if (builtin_parse_json_string(parse_state, token_buffer, {}, json_string))"
@@ -56,16 +428,350 @@ class RootGenerator:
             )
             with out_file.code_block():
                 out_file.print("return true;")
-            self.root_generator.generate_parser_call(
-                "out",
-                out_file,
+            self.generate_parse_tokens(name, root_generator, out_file)
+            out_file.print("return false;")
+        out_file.print("")
+
+        out_file.print(
+            "bool json_parse_{name}(const char *json_string, {name}_t *out{node_pool})"
+            .format(name=name, node_pool=self.node_pool_parameters(name))
+        )
+        with out_file.code_block():
+            out_file.print("parse_state_t parse_state;")
+            out_file.print("JS2C_STATS_INIT(&parse_state);")
+            out_file.print(
+                "return parse_document_{}(&parse_state, json_string, out{});".format(name, self.node_pool_arguments(name))
             )
+        out_file.print("")
+
+        for binary_format in self.binary_input_formats(root_settings):
+            self.generate_binary_root_parser(name, root_generator, binary_format, max_token_num, out_file)
+
+    def generate_root_merge_patch(self, name, root_generator, out_file):
+        max_token_num = self.token_buffer_num(name)
+        out_file.print(
+            "bool json_merge_patch_{name}({name}_t *inout, const char *patch, size_t len)".format(name=name)
+        )
+        with out_file.code_block():
+            out_file.print("parse_state_t parse_state_buffer;")
+            out_file.print("parse_state_t *parse_state = &parse_state_buffer;")
+            out_file.print("JS2C_STATS_INIT(parse_state);")
+            out_file.print("jsmntok_t token_buffer[{}];".format(max_token_num))
+            out_file.print("if (builtin_parse_json(parse_state, token_buffer, {}, patch, len))".format(max_token_num))
+            with out_file.code_block():
+                out_file.print("return true;")
+            root_generator.generate_merge_patch_call("inout", out_file)
             out_file.print("return false;")
         out_file.print("")
 
-    def generate_parser_h(self, h_file):
-        h_file_name = h_file.name
-        h_file = CodeBlockPrinter(h_file)
+    @classmethod
+    def encoded_max_size_name(cls, name):
+        return "{}_ENCODED_MAX_SIZE".format(re.sub("[^A-Z0-9]", "_", name.upper()))
+
+    @classmethod
+    def generate_root_codec(cls, name, root_generator, out_file):
+        """ The binary wire format functions. The header identifies the layout by a hash of its description. """
+        fingerprint = "0x{:08x}U".format(zlib.crc32(root_generator.wire_signature().encode()))
+
+        out_file.print(
+            "bool {name}_encode(const {name}_t *in, uint8_t *buffer, size_t size, size_t *encoded_size)"
+            .format(name=name)
+        )
+        with out_file.code_block():
+            out_file.print("js2c_encoder_t encoder_buffer = {buffer, size, 0};")
+            out_file.print("js2c_encoder_t *encoder = &encoder_buffer;")
+            root_generator.generate_builtin_codec_call("builtin_encode_header(encoder, {})".format(fingerprint), out_file)
+            root_generator.generate_encoder_call("in", out_file)
+            out_file.print("*encoded_size = encoder->position;")
+            out_file.print("return false;")
+        out_file.print("")
+
+        out_file.print("bool {name}_decode(const uint8_t *data, size_t size, {name}_t *out)".format(name=name))
+        with out_file.code_block():
+            out_file.print("js2c_decoder_t decoder_buffer = {data, size, 0};")
+            out_file.print("js2c_decoder_t *decoder = &decoder_buffer;")
+            root_generator.generate_builtin_codec_call("builtin_decode_header(decoder, {})".format(fingerprint), out_file)
+            root_generator.generate_decoder_call("out", out_file)
+            out_file.print("if (decoder->position != size)")
+            with out_file.code_block():
+                out_file.print('LOG_ERROR(decoder->position, "Trailing data after binary record")')
+                out_file.print("return true;")
+            out_file.print("return false;")
+        out_file.print("")
+
+    @classmethod
+    def generate_python_functions(cls, name, root_generator, out_file):
+        """ parse_<name> and validate_<name> of the Python module. The GIL is released while parsing. """
+        for function in ("parse", "validate"):
+            out_file.print(
+                "static PyObject *python_{}_{}(PyObject *self, PyObject *args)".format(function, name)
+            )
+            with out_file.code_block():
+                out_file.print("(void)self;")
+                out_file.print("const char *json_string;")
+                out_file.print('if (!PyArg_ParseTuple(args, "y:{}_{}", &json_string))'.format(function, name))
+                with out_file.code_block():
+                    out_file.print("return NULL;")
+                out_file.print("{name}_t *parsed = PyMem_Malloc(sizeof({name}_t));".format(name=name))
+                out_file.print("if (parsed == NULL)")
+                with out_file.code_block():
+                    out_file.print("return PyErr_NoMemory();")
+                out_file.print("bool error;")
+                out_file.print("Py_BEGIN_ALLOW_THREADS")
+                out_file.print("error = json_parse_{}(json_string, parsed);".format(name))
+                out_file.print("Py_END_ALLOW_THREADS")
+                if function == "validate":
+                    out_file.print("PyMem_Free(parsed);")
+                    out_file.print("return PyBool_FromLong(!error);")
+                else:
+                    out_file.print("PyObject *result = NULL;")
+                    out_file.print("if (error)")
+                    with out_file.code_block():
+                        out_file.print('PyErr_SetString(PyExc_ValueError, "Invalid {} document");'.format(name))
+                    out_file.print("else")
+                    with out_file.code_block():
+                        out_file.print("result = {};".format(root_generator.python_value("parsed")))
+                    out_file.print("PyMem_Free(parsed);")
+                    out_file.print("return result;")
+            out_file.print("")
+
+    def generate_python_module(self, out_file):
+        """ The CPython extension module of the pythonModule setting. Only compiled with JS2C_PYTHON_MODULE. """
+        out_file.print("#ifdef JS2C_PYTHON_MODULE")
+        out_file.print("/* Steals the reference of value, which may be NULL if its conversion failed */")
+        out_file.print("static bool python_set_item(PyObject *dict, const char *key, PyObject *value)")
+        with out_file.code_block():
+            out_file.print("if (value == NULL)")
+            with out_file.code_block():
+                out_file.print("return true;")
+            out_file.print("const int error = PyDict_SetItemString(dict, key, value);")
+            out_file.print("Py_DECREF(value);")
+            out_file.print("return error != 0;")
+        out_file.print("")
+
+        methods = []
+        for name, (root_generator, _) in self.roots.items():
+            root_generator.generate_python_bodies(out_file)
+            self.generate_python_functions(name, root_generator, out_file)
+            methods.append(("parse_" + name, "python_parse_" + name, "Parse a {} JSON document into a dict".format(name)))
+            methods.append(("validate_" + name, "python_validate_" + name, "Check a {} JSON document".format(name)))
+        # The first root schema is also available without a suffix
+        methods[0:0] = [
+            ("parse", "python_parse_" + self.name, "Parse a {} JSON document into a dict".format(self.name)),
+            ("validate", "python_validate_" + self.name, "Check a {} JSON document".format(self.name)),
+        ]
+
+        out_file.print("static PyMethodDef python_methods[] = {")
+        with out_file.indent():
+            for method_name, function_name, doc in methods:
+                out_file.print('{{"{}", {}, METH_VARARGS, "{}"}},'.format(method_name, function_name, doc))
+            out_file.print("{NULL, NULL, 0, NULL},")
+        out_file.print("};")
+        out_file.print("")
+        out_file.print("static struct PyModuleDef python_module = {")
+        with out_file.indent():
+            out_file.print(".m_base = PyModuleDef_HEAD_INIT,")
+            out_file.print('.m_name = "{}",'.format(self.settings.python_module))
+            out_file.print('.m_doc = "JSON parsers generated by JSON Schema to C",')
+            out_file.print(".m_size = -1,")
+            out_file.print(".m_methods = python_methods,")
+        out_file.print("};")
+        out_file.print("")
+        out_file.print("PyMODINIT_FUNC PyInit_{}(void)".format(self.settings.python_module))
+        with out_file.code_block():
+            out_file.print("return PyModule_Create(&python_module);")
+        out_file.print("#endif /* JS2C_PYTHON_MODULE */")
+        out_file.print("")
+
+    @classmethod
+    def generate_string_array(cls, array_name, strings, out_file):
+        out_file.print("static const char *const {}[] = ".format(array_name) + "{")
+        with out_file.indent():
+            for string in strings:
+                out_file.print('"{}",'.format(string))
+        out_file.print("};")
+
+    def generate_stats_structs(self, out_file):
+        field_num, error_site_num = self.stats_counter_nums()
+        out_file.print("#ifdef JS2C_STATS")
+        out_file.print("#include <stdio.h>")
+        for name in self.roots:
+            out_file.print("typedef struct {}_stats_s ".format(name) + "{")
+            with out_file.indent():
+                out_file.print("uint64_t parse_calls;")
+                out_file.print("uint64_t failed_parses;")
+                out_file.print("uint64_t syntax_errors;")
+                out_file.print("uint64_t tokens;")
+                out_file.print("uint64_t bytes;")
+                out_file.print("uint64_t tokenize_ns;")
+                out_file.print("uint64_t parse_ns;")
+                out_file.print_with_docstring(
+                    "uint64_t field_hits[{}];".format(max(field_num, 1)),
+                    "Number of times each object field was parsed",
+                )
+                out_file.print_with_docstring(
+                    "uint64_t error_sites[{}];".format(max(error_site_num, 1)),
+                    "Number of errors detected by each check in the generated code",
+                )
+            out_file.print("}} {}_stats_t;".format(name))
+            out_file.print(
+                "bool json_parse_{name}_with_stats(const char *json_string, {name}_t *out{node_pool}, "
+                "{name}_stats_t *stats);".format(name=name, node_pool=self.node_pool_parameters(name))
+            )
+            out_file.print("void json_print_stats_{name}(const {name}_stats_t *stats, FILE *out);".format(name=name))
+        out_file.print("#endif /* JS2C_STATS */")
+
+    def generate_stats_functions(self, out_file):
+        field_names, error_site_names = self.stats_names
+        out_file.print("#ifdef JS2C_STATS")
+        if field_names:
+            self.generate_string_array("stats_field_names", field_names, out_file)
+        if error_site_names:
+            self.generate_string_array("stats_error_site_names", error_site_names, out_file)
+        out_file.print("")
+
+        for name in self.roots:
+            self.generate_parse_with_stats(name, out_file)
+            self.generate_print_stats(name, field_names, error_site_names, out_file)
+        out_file.print("#endif /* JS2C_STATS */")
+        out_file.print("")
+
+    def generate_parse_with_stats(self, name, out_file):
+        out_file.print(
+            "bool json_parse_{name}_with_stats(const char *json_string, {name}_t *out{node_pool}, {name}_stats_t *stats)"
+            .format(name=name, node_pool=self.node_pool_parameters(name))
+        )
+        with out_file.code_block():
+            out_file.print("parse_state_t parse_state;")
+            out_file.print("parse_state.stats_field_hits = stats->field_hits;")
+            out_file.print("parse_state.stats_error_sites = stats->error_sites;")
+            out_file.print("parse_state.stats_token_num = 0;")
+            out_file.print("parse_state.stats_byte_num = 0;")
+            out_file.print("parse_state.stats_syntax_error = false;")
+            out_file.print("const uint64_t start_ns = builtin_stats_now_ns();")
+            out_file.print("parse_state.stats_tokenized_ns = start_ns;")
+            out_file.print(
+                "const bool result = parse_document_{}(&parse_state, json_string, out{});"
+                .format(name, self.node_pool_arguments(name))
+            )
+            out_file.print("const uint64_t end_ns = builtin_stats_now_ns();")
+            out_file.print("stats->parse_calls += 1;")
+            out_file.print("stats->failed_parses += result;")
+            out_file.print("stats->syntax_errors += parse_state.stats_syntax_error;")
+            out_file.print("stats->tokens += parse_state.stats_token_num;")
+            out_file.print("stats->bytes += parse_state.stats_byte_num;")
+            out_file.print("stats->tokenize_ns += parse_state.stats_tokenized_ns - start_ns;")
+            out_file.print("stats->parse_ns += end_ns - parse_state.stats_tokenized_ns;")
+            out_file.print("return result;")
+        out_file.print("")
+
+    @classmethod
+    def generate_print_stats(cls, name, field_names, error_site_names, out_file):
+        out_file.print("void json_print_stats_{name}(const {name}_stats_t *stats, FILE *out)".format(name=name))
+        with out_file.code_block():
+            out_file.print(
+                'fprintf(out, "Parse calls: %" PRIu64 ", failed: %" PRIu64 ", syntax errors: %" PRIu64 "\\n", '
+                'stats->parse_calls, stats->failed_parses, stats->syntax_errors);'
+            )
+            out_file.print(
+                'fprintf(out, "Tokens: %" PRIu64 ", bytes: %" PRIu64 "\\n", stats->tokens, stats->bytes);'
+            )
+            out_file.print(
+                'fprintf(out, "Tokenize time: %" PRIu64 " ns, parse time: %" PRIu64 " ns\\n", '
+                'stats->tokenize_ns, stats->parse_ns);'
+            )
+            out_file.print('fprintf(out, "Field hits:\\n");')
+            if field_names:
+                out_file.print("for (size_t i = 0; i < {}; ++i)".format(len(field_names)))
+                with out_file.code_block():
+                    out_file.print('fprintf(out, "  %s: %" PRIu64 "\\n", stats_field_names[i], stats->field_hits[i]);')
+            out_file.print("uint64_t other_errors = stats->failed_parses - stats->syntax_errors;")
+            out_file.print('fprintf(out, "Error sites:\\n");')
+            if error_site_names:
+                out_file.print("for (size_t i = 0; i < {}; ++i)".format(len(error_site_names)))
+                with out_file.code_block():
+                    out_file.print("if (stats->error_sites[i] > 0)")
+                    with out_file.code_block():
+                        out_file.print(
+                            'fprintf(out, "  %s: %" PRIu64 "\\n", stats_error_site_names[i], stats->error_sites[i]);'
+                        )
+                        out_file.print("other_errors -= stats->error_sites[i];")
+            out_file.print(
+                'fprintf(out, "  Errors detected by builtin parsers: %" PRIu64 "\\n", other_errors);'
+            )
+        out_file.print("")
+
+    def generate_parsers(self, c_file):
+        for root_generator, _ in self.roots.values():
+            if self.settings.table_driven_parser:
+                root_generator.generate_table_descriptor(c_file)
+            else:
+                root_generator.generate_parser_bodies(c_file)
+
+    def split_subtrees(self, file_num):
+        """ The generators whose parser bodies are generated separately when splitting the parser, parents first.
+
+        The generator tree is cut level by level, until there are a few times more subtrees than files,
+        so that they can be balanced between the files.
+        """
+        subtrees = []
+        seen_names = set()
+        level = [root_generator for root_generator, _ in self.roots.values()]
+        while level and len(subtrees) < file_num * 4:
+            next_level = []
+            for generator in level:
+                if generator.name in seen_names:
+                    continue
+                seen_names.add(generator.name)
+                subtrees.append(generator)
+                next_level.extend(generator.parser_subtrees())
+            level = next_level
+        return subtrees
+
+    def generate_split_parsers(self, c_file, part_files):
+        """ Distribute the parser bodies between the C file and the part files.
+
+        Every subtree is generated into its own chunk, children first, so a chunk only contains the parsers that
+        are not in an earlier chunk. The chunks are then assigned to the files largest first, always to the file
+        with the least code so far.
+        """
+        chunks = []
+        for subtree in reversed(self.split_subtrees(1 + len(part_files))):
+            chunk = c_file.fork(io.StringIO())
+            subtree.generate_parser_bodies(chunk)
+            chunk.flush()
+            if chunk.file.getvalue():
+                chunks.append(chunk.file.getvalue().lstrip("\n"))
+
+        files = [c_file] + part_files
+        file_sizes = [0] * len(files)
+        for chunk in sorted(chunks, key=len, reverse=True):
+            file_index = file_sizes.index(min(file_sizes))
+            files[file_index].write(chunk)
+            file_sizes[file_index] += len(chunk)
+
+    def stats_counter_nums(self):
+        """ Number of field hit and error site counters in the JS2C_STATS structs """
+        if self.stats_names is None:
+            # The parser code has not been generated yet, so do a dry run to find the counted sites.
+            dry_run = CodeBlockPrinter(io.StringIO())
+            self.generate_parsers(dry_run)
+            return len(dry_run.stats_fields), len(dry_run.stats_error_sites)
+        field_names, error_site_names = self.stats_names
+        return len(field_names), len(error_site_names)
+
+    def generate_node_pool_size(self, name, root_settings, h_file):
+        """ The node pool size needed for maxRecursiveNodes nodes of any of the recursive types, with padding """
+        node_size = " + ".join(
+            "sizeof({type}) + _Alignof({type}) - 1".format(type=target.c_type) for target in self.recursive_targets[name]
+        )
+        h_file.print("/* A node pool of this size is large enough for any {} document */".format(name))
+        h_file.print(
+            "#define {} ({} * ({}))".format(self.node_pool_size_name(name), root_settings.max_recursive_nodes, node_size)
+        )
+
+    def generate_parser_h(self, h_file, h_file_name):
+        h_file = self.printer_class(h_file)
 
         h_file.write(NOTE_FOR_GENERATED_FILES)
 
@@ -75,14 +781,46 @@ class RootGenerator:
 
         h_file.print("#include <stdint.h>")
         h_file.print("#include <stdbool.h>")
+        if any(
+            self.binary_input_formats(root_settings) or root_settings.binary_codec or root_settings.merge_patch
+            or self.recursive_targets[name]
+            for name, (_, root_settings) in self.roots.items()
+        ):
+            h_file.print("#include <stddef.h>")
 
         if self.settings.h_prefix_file is not None:
             h_file.print_separator("User-added prefix")
             h_file.write(self.settings.h_prefix_file.read())
 
         h_file.print_separator("Generated type declarations")
-        self.root_generator.generate_type_declaration(h_file, force=True)
-        h_file.print("bool json_parse_{name}(const char *json_string, {name}_t *out);".format(name=self.name))
+        for name, (root_generator, root_settings) in self.roots.items():
+            root_generator.generate_type_declaration(h_file, force=True)
+            if self.recursive_targets[name]:
+                self.generate_node_pool_size(name, root_settings, h_file)
+            h_file.print(
+                "bool json_parse_{name}(const char *json_string, {name}_t *out{node_pool});"
+                .format(name=name, node_pool=self.node_pool_parameters(name))
+            )
+            for binary_format in self.binary_input_formats(root_settings):
+                h_file.print(
+                    "bool {format}_parse_{name}(const uint8_t *data, size_t size, {name}_t *out{node_pool});"
+                    .format(format=binary_format, name=name, node_pool=self.node_pool_parameters(name))
+                )
+            if root_settings.binary_codec:
+                h_file.print(
+                    "#define {} {}"
+                    .format(self.encoded_max_size_name(name), JS2C_WIRE_HEADER_SIZE + root_generator.max_encoded_size())
+                )
+                h_file.print(
+                    "bool {name}_encode(const {name}_t *in, uint8_t *buffer, size_t size, size_t *encoded_size);"
+                    .format(name=name)
+                )
+                h_file.print("bool {name}_decode(const uint8_t *data, size_t size, {name}_t *out);".format(name=name))
+            if root_settings.merge_patch:
+                h_file.print(
+                    "bool json_merge_patch_{name}({name}_t *inout, const char *patch, size_t len);".format(name=name)
+                )
+        self.generate_stats_structs(h_file)
 
         if self.settings.h_postfix_file:
             h_file.print_separator("User-added postfix")
@@ -90,6 +828,7 @@ class RootGenerator:
 
         h_file.print("#endif /* {} */".format(header_guard_name))
         h_file.print("")
+        h_file.flush()
 
     @classmethod
     def manually_include_jsmn(cls, c_file):
@@ -101,10 +840,29 @@ class RootGenerator:
             c_file.print("")
 
     @classmethod
-    def manually_include_builtins(cls, c_file):
+    def remove_unused_builtins(cls, builtins_file_contents, used_identifiers):
+        """ Remove the builtin_* functions (and their comments) that are not called by the generated code,
+        not even indirectly through other builtins. Types, macros and the other functions are always kept.
+        """
+        segments, callees, always_used = parse_builtins(builtins_file_contents)
+        needed = set()
+        pending = [name for name in callees if name in used_identifiers or name in always_used]
+        while pending:
+            name = pending.pop()
+            if name in needed:
+                continue
+            needed.add(name)
+            pending.extend(callees[name] - needed)
+        return "".join(text for name, text in segments if name is None or name in needed)
+
+    @classmethod
+    def manually_include_builtins(cls, c_file, used_identifiers=None):
+        """ If used_identifiers is given, only the builtins used by code containing them are included """
         with open(os.path.join(DIR_OF_THIS_FILE, 'js2c_builtins.h')) as builtins_file:
             c_file.print_separator("js2c_builtins.h")
             builtins_file_contents = builtins_file.read()
+            if used_identifiers is not None:
+                builtins_file_contents = cls.remove_unused_builtins(builtins_file_contents, used_identifiers)
             jsmn_include_string = '#include "jsmn.h"\n'
             split_pos = builtins_file_contents.index(jsmn_include_string)
             if split_pos < 0:
@@ -116,29 +874,102 @@ class RootGenerator:
             c_file.print_separator("end of js2c_builtins.h")
             c_file.print("")
 
-    def generate_parser_c(self, c_file, h_file_name):
-        c_file = CodeBlockPrinter(c_file)
-
-        c_file.write(NOTE_FOR_GENERATED_FILES)
-        c_file.print('#include "{}"'.format(h_file_name))
-
+    def generate_c_prefix_and_builtins(self, c_file, used_identifiers):
+        """ used_identifiers are the identifiers of the generated code, see remove_unused_builtins """
         if self.settings.c_prefix_file is not None:
+            c_prefix = self.settings.c_prefix_file.read()
+            used_identifiers = used_identifiers.union(CodeBlockPrinter.IDENTIFIER_RE.findall(c_prefix))
             c_file.print_separator("User-added prefix")
-            c_file.write(self.settings.c_prefix_file.read())
+            c_file.write(c_prefix)
 
         if self.settings.include_external_builtins_file:
             c_file.print('#include "{}"'.format(self.settings.include_external_builtins_file))
         else:
-            self.manually_include_builtins(c_file)
+            self.manually_include_builtins(c_file, used_identifiers)
+
+    def generate_parser_internal_h(self, internal_h_file, h_file_name, prototypes, used_identifiers):
+        """ The header included by every file of a split parser, instead of the public header """
+        internal_h_file = self.printer_class(internal_h_file)
+
+        internal_h_file.write(NOTE_FOR_GENERATED_FILES)
+
+        internal_h_file_name = self.internal_header_name(h_file_name)
+        header_guard_name = re.sub("[^A-Z0-9]", "_", os.path.basename(internal_h_file_name).upper())
+        internal_h_file.print("#ifndef {}".format(header_guard_name))
+        internal_h_file.print("#define {}".format(header_guard_name))
+        internal_h_file.print('#include "{}"'.format(h_file_name))
+
+        self.generate_c_prefix_and_builtins(internal_h_file, used_identifiers)
+        internal_h_file.print_separator("Parsers shared between the files")
+        for prototype in prototypes:
+            internal_h_file.print(prototype)
+
+        internal_h_file.print("#endif /* {} */".format(header_guard_name))
+        internal_h_file.print("")
+        internal_h_file.flush()
+
+    def generate_root_functions(self, c_file):
+        """ The public functions of the parser """
+        for name, (root_generator, root_settings) in self.roots.items():
+            self.generate_root_parser(name, root_generator, root_settings, c_file)
+            if root_settings.merge_patch:
+                root_generator.generate_merge_patch_bodies(c_file)
+                self.generate_root_merge_patch(name, root_generator, c_file)
+            if root_settings.binary_codec:
+                root_generator.generate_codec_bodies(c_file)
+                self.generate_root_codec(name, root_generator, c_file)
+        self.generate_stats_functions(c_file)
+        if self.settings.python_module is not None:
+            self.generate_python_module(c_file)
+
+    def generate_parser_c(self, c_file, h_file_name, internal_h_file=None, part_files=()):
+        """ With splitParserFiles, the internal header and the rest of the parser files are generated too.
+
+        The builtins are only included after all parsers are generated, as only the ones they use are included.
+        """
+        c_file = self.printer_class(c_file)
+        c_file.used_identifiers = set()
+
+        c_file.write(NOTE_FOR_GENERATED_FILES)
+        if self.settings.python_module is not None:
+            # Python.h must be included before any standard header
+            c_file.print("#ifdef JS2C_PYTHON_MODULE")
+            c_file.print("#define PY_SSIZE_T_CLEAN")
+            c_file.print("#include <Python.h>")
+            c_file.print("#endif")
+        if part_files:
+            c_file.print('#include "{}"'.format(self.internal_header_name(h_file_name)))
+        else:
+            c_file.print('#include "{}"'.format(h_file_name))
+        # The builtins are only written once the parsers using them are generated
+        builtins_position = c_file.placeholder()
         c_file.print_separator("Generated parsers")
         c_file.print("")
-        self.root_generator.generate_parser_bodies(c_file)
-
-        max_token_num = self.root_generator.max_token_num()
-        if self.settings.allow_additional_properties is not None:
-            max_token_num += self.settings.allow_additional_properties
-        self.generate_root_parser(c_file, max_token_num)
+        if part_files:
+            c_file.prototypes = []
+            part_files = [c_file.fork(part_file) for part_file in part_files]
+            for part_file in part_files:
+                part_file.write(NOTE_FOR_GENERATED_FILES)
+                part_file.print('#include "{}"'.format(self.internal_header_name(h_file_name)))
+                part_file.print_separator("Generated parsers")
+            self.generate_split_parsers(c_file, part_files)
+            for part_file in part_files:
+                part_file.flush()
+        else:
+            self.generate_parsers(c_file)
 
+        self.stats_names = (c_file.stats_fields, c_file.stats_error_sites)
+        self.generate_root_functions(c_file)
         if self.settings.c_postfix_file:
+            c_postfix = self.settings.c_postfix_file.read()
+            c_file.used_identifiers.update(CodeBlockPrinter.IDENTIFIER_RE.findall(c_postfix))
             c_file.print_separator("User-added postfix")
-            c_file.write(self.settings.c_postfix_file.read())
+            c_file.write(c_postfix)
+
+        if part_files:
+            self.generate_parser_internal_h(internal_h_file, h_file_name, c_file.prototypes, c_file.used_identifiers)
+        else:
+            builtins_file = c_file.fork(None)
+            self.generate_c_prefix_and_builtins(builtins_file, c_file.used_identifiers)
+            c_file.fill_placeholder(builtins_position, builtins_file)
+        c_file.flush()
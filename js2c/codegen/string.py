@@ -22,7 +22,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 #
-from .base import Generator
+from .base import Generator, emit_once
 
 
 class StringGenerator(Generator):
@@ -104,6 +104,58 @@ class StringGenerator(Generator):
             with out_file.code_block():
                 out_file.print("return true;")
 
+    def generate_encoder_call(self, in_var_name, out_file):
+        if self.js2cParseFunction is not None:
+            raise self.unsupported_by_codec()
+        self.generate_builtin_codec_call("builtin_encode_string(encoder, {}[0])".format(in_var_name), out_file)
+
+    def generate_decoder_call(self, out_var_name, out_file):
+        if self.js2cParseFunction is not None:
+            raise self.unsupported_by_codec()
+        self.generate_builtin_codec_call(
+            "builtin_decode_string(decoder, {}[0], {}, {})".format(out_var_name, self.minLength, self.maxLength),
+            out_file
+        )
+
+    def wire_signature(self):
+        return "s"
+
+    def max_encoded_size(self):
+        return self.varint_size(self.maxLength) + self.maxLength
+
+    def python_value(self, in_var_name):
+        if self.js2cParseFunction is not None:
+            return super().python_value(in_var_name)
+        return "PyUnicode_FromString({}[0])".format(in_var_name)
+
+    def build_python_validator(self):
+        min_length = self.minLength
+        max_length = self.maxLength
+
+        def validate_string(value, _context):
+            if not isinstance(value, str):
+                raise ValueError("Invalid string: {!r}".format(value))
+            # The C parser counts UTF-8 bytes
+            length = len(value) if value.isascii() else len(value.encode())
+            if length > max_length:
+                raise ValueError("String too large. Length: {}. Maximum length: {}.".format(length, max_length))
+            if length < min_length:
+                raise ValueError("String too short. Length: {}. Minimum length: {}.".format(length, min_length))
+        return validate_string
+
+    @emit_once
+    def generate_table_descriptor(self, out_file):
+        if self.js2cParseFunction is not None:
+            super().generate_table_descriptor(out_file)
+            return
+        self.generate_table_descriptor_struct(
+            "JS2C_KIND_STRING",
+            out_file,
+            min_length=self.minLength,
+            max_length=self.maxLength,
+        )
+
+    @emit_once
     def generate_type_declaration(self, out_file, *, force=False):
         _ = force  # basically (void)force
 
@@ -146,3 +198,31 @@ class StringGenerator(Generator):
 
     def max_token_num(self):
         return 1
+
+    # (size, alignment) of the common scalar types, for js2cType
+    C_TYPE_LAYOUTS = {
+        "bool": (1, 1),
+        "char": (1, 1),
+        "int": (4, 4),
+        "unsigned": (4, 4),
+        "float": (4, 4),
+        "long": (8, 8),
+        "double": (8, 8),
+        "size_t": (8, 8),
+        "int8_t": (1, 1),
+        "uint8_t": (1, 1),
+        "int16_t": (2, 2),
+        "uint16_t": (2, 2),
+        "int32_t": (4, 4),
+        "uint32_t": (4, 4),
+        "int64_t": (8, 8),
+        "uint64_t": (8, 8),
+    }
+
+    def estimated_layout(self):
+        if self.js2cType is None:
+            return self.maxLength + 1, 1
+        if self.js2cType.endswith("*"):
+            return 8, 8
+        # Other custom types are unknown to the generator, only the static_assert of maxStructBytes checks them.
+        return self.C_TYPE_LAYOUTS.get(self.js2cType, (0, 1))
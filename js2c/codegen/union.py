@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+import collections
+
+from .base import Generator, emit_once
+from .enum import EnumGenerator
+from .object import ObjectGenerator
+
+
+class UnionVariantGenerator(ObjectGenerator):
+    """ An object variant of a union, with the discriminator removed from its fields.
+
+    The discriminator was already checked by the union parser, so it is only skipped here.
+    """
+
+    def __init__(self, schema, name, settings, generator_factory, discriminator):
+        super().__init__(schema, name, settings, generator_factory)
+        self.discriminator = discriminator
+
+    def python_special_keys(self):
+        return frozenset((self.discriminator,))
+
+    def generate_seen_flags(self, out_file):
+        out_file.print("bool seen_discriminator = false;")
+        super().generate_seen_flags(out_file)
+
+    def generate_special_key_parsers(self, out_file):
+        out_file.print('if (current_string_is(parse_state, "{}"))'.format(self.discriminator))
+        with out_file.code_block():
+            out_file.print("if (seen_discriminator)")
+            with out_file.code_block():
+                self.generate_logged_error("Duplicate field definition in '%s': {}".format(self.discriminator), out_file)
+            out_file.print("seen_discriminator = true;")
+            out_file.print("parse_state->current_token += 1;")
+            out_file.print("builtin_skip(parse_state);")
+        out_file.print("else")
+
+
+class UnionGenerator(Generator):
+    # pylint: disable=too-many-public-methods
+    """ oneOf (or anyOf) of object variants, generated as a tagged union.
+
+    The variants are told apart by a discriminator property, which has a different const value in every variant,
+    e.g. {"kind": {"const": "circle"}}. It does not have to be the first key in the JSON: the parser looks it up
+    first, then parses the matching variant only.
+    """
+
+    def __init__(self, schema, name, settings, generator_factory):
+        super().__init__(schema, name, settings, generator_factory)
+        self.c_type = "{}_t".format(self.name)
+        if 'properties' in schema:
+            raise ValueError(
+                "Properties next to oneOf or anyOf are not supported, put them into every variant ({})"
+                .format(self.name)
+            )
+        variants = schema['oneOf'] if 'oneOf' in schema else schema['anyOf']
+        self.discriminator = self.find_discriminator(variants)
+        if self.discriminator is None:
+            raise ValueError(
+                "The variants of '{}' must all be objects with a common discriminator property, which has a "
+                "different const value in each of them".format(self.name)
+            )
+        self.tag_name = self.SANITIZE_RE.sub("_", self.discriminator)
+
+        # discriminator value -> (union member name, variant generator)
+        self.variants = collections.OrderedDict()
+        for variant in variants:
+            value = self.discriminator_value(variant['properties'][self.discriminator])
+            member_name = self.SANITIZE_RE.sub("_", value)
+            if any(member_name == other_member_name for other_member_name, _ in self.variants.values()):
+                raise ValueError("Discriminator values of '{}' clash in C: {}".format(self.name, value))
+            variant_schema = dict(variant)
+            variant_schema['properties'] = collections.OrderedDict(
+                (field_name, field_schema)
+                for field_name, field_schema in variant['properties'].items()
+                if field_name != self.discriminator
+            )
+            variant_schema['required'] = [
+                field_name for field_name in variant.get('required', ()) if field_name != self.discriminator
+            ]
+            self.variants[value] = (
+                member_name,
+                UnionVariantGenerator(
+                    variant_schema,
+                    "{}_{}".format(self.name, member_name),
+                    settings,
+                    generator_factory,
+                    self.discriminator,
+                ),
+            )
+
+        self.tag_generator = EnumGenerator(
+            {"type": "string", "enum": list(self.variants)},
+            "{}_{}".format(self.name, self.tag_name),
+            settings,
+            generator_factory,
+        )
+
+    @classmethod
+    def can_parse_schema(cls, schema):
+        return 'oneOf' in schema or 'anyOf' in schema
+
+    @classmethod
+    def discriminator_value(cls, property_schema):
+        if 'const' in property_schema:
+            value = property_schema['const']
+        elif len(property_schema.get('enum', ())) == 1:
+            value = property_schema['enum'][0]
+        else:
+            return None
+        return value if isinstance(value, str) else None
+
+    @classmethod
+    def find_discriminator(cls, variants):
+        if not variants or not all(variant.get('type') == 'object' and 'properties' in variant for variant in variants):
+            return None
+        for candidate in variants[0]['properties']:
+            values = [
+                cls.discriminator_value(variant['properties'][candidate])
+                for variant in variants
+                if candidate in variant['properties']
+            ]
+            if len(values) == len(variants) and None not in values and len(set(values)) == len(values):
+                return candidate
+        return None
+
+    def generate_parser_call(self, out_var_name, out_file):
+        out_file.print(
+            "if (parse_{}(parse_state, {}))"
+            .format(self.name, out_var_name)
+        )
+        with out_file.code_block():
+            out_file.print("return true;")
+
+    @emit_once
+    def generate_type_declaration(self, out_file, *, force=False):
+        _ = force  # This is python's way of saying (void)force
+
+        self.tag_generator.generate_type_declaration(out_file)
+        for _, variant_generator in self.variants.values():
+            variant_generator.generate_type_declaration(out_file)
+
+        out_file.print("typedef struct {}_s ".format(self.name) + "{")
+        with out_file.indent():
+            self.tag_generator.generate_field_declaration(self.tag_name, out_file)
+            out_file.print("union {")
+            with out_file.indent():
+                for member_name, variant_generator in self.variants.values():
+                    variant_generator.generate_field_declaration(member_name, out_file)
+            out_file.print("};")
+        out_file.print("}} {};".format(self.c_type))
+        out_file.print("")
+
+    def generate_discriminator_lookup(self, out_file):
+        """ Find the discriminator value among the keys, wherever it is in the object """
+        out_file.print("const uint64_t object_token = parse_state->current_token;")
+        out_file.print("const uint64_t n = CURRENT_TOKEN(parse_state).size;")
+        out_file.print("uint64_t i = 0;")
+        out_file.print("parse_state->current_token += 1;")
+        out_file.print("for (; i < n; ++i)")
+        with out_file.code_block():
+            out_file.print(
+                'if (CURRENT_TOKEN(parse_state).size == 1 && current_string_is(parse_state, "{}"))'
+                .format(self.discriminator)
+            )
+            with out_file.code_block():
+                out_file.print("break;")
+            out_file.print("builtin_skip(parse_state);")
+        out_file.print("if (i == n)")
+        with out_file.code_block():
+            out_file.print("parse_state->current_token = object_token;")
+            self.generate_logged_error("Missing discriminator field in '%s': {}".format(self.discriminator), out_file)
+        out_file.print("parse_state->current_token += 1;")
+        out_file.print("if (check_type(parse_state, JSMN_STRING))")
+        with out_file.code_block():
+            out_file.print("return true;")
+
+    def generate_variant_parser(self, value, out_file):
+        member_name, variant_generator = self.variants[value]
+        out_file.print('if (current_string_is(parse_state, "{}"))'.format(value))
+        with out_file.code_block():
+            out_file.print("out->{} = {};".format(self.tag_name, self.tag_generator.convert_enum_label(value)))
+            out_file.print("parse_state->current_token = object_token;")
+            variant_generator.generate_parser_call("&out->{}".format(member_name), out_file)
+            out_file.print("return false;")
+
+    @classmethod
+    def distinguishing_index(cls, values):
+        """ A character position in which all the (same length) values differ, or None """
+        if not all(value.isascii() for value in values):
+            return None
+        for index in range(len(values[0])):
+            if len(set(value[index] for value in values)) == len(values):
+                return index
+        return None
+
+    @classmethod
+    def char_literal(cls, char):
+        if char.isalnum() or char in "_-. ":
+            return "'{}'".format(char)
+        return str(ord(char))
+
+    def generate_variant_dispatch(self, out_file):
+        """ Select the variant with a switch on the length (and maybe one character) of the discriminator value """
+        values_by_length = collections.OrderedDict()
+        for value in self.variants:
+            values_by_length.setdefault(len(value.encode()), []).append(value)
+
+        out_file.print("switch (CURRENT_STRING_LENGTH(parse_state))")
+        with out_file.code_block():
+            for length, values in values_by_length.items():
+                out_file.print("case {}:".format(length))
+                with out_file.indent():
+                    index = self.distinguishing_index(values) if len(values) > 1 else None
+                    if index is None:
+                        for value in values:
+                            self.generate_variant_parser(value, out_file)
+                    else:
+                        out_file.print("switch (CURRENT_STRING(parse_state)[{}])".format(index))
+                        with out_file.code_block():
+                            for value in values:
+                                out_file.print("case {}:".format(self.char_literal(value[index])))
+                                with out_file.indent():
+                                    self.generate_variant_parser(value, out_file)
+                                    out_file.print("break;")
+                            out_file.print("default:")
+                            with out_file.indent():
+                                out_file.print("break;")
+                    out_file.print("break;")
+            out_file.print("default:")
+            with out_file.indent():
+                out_file.print("break;")
+        self.generate_logged_error(
+            [
+                "Unknown discriminator value in '%s': %.*s",
+                "parse_state->current_key",
+                "CURRENT_STRING_FOR_ERROR(parse_state)"
+            ],
+            out_file
+        )
+
+    def parser_subtrees(self):
+        return [variant_generator for _, variant_generator in self.variants.values()]
+
+    @emit_once
+    def generate_parser_bodies(self, out_file):
+        for _, variant_generator in self.variants.values():
+            variant_generator.generate_parser_bodies(out_file)
+
+        out_file.print_function_definition(
+            "bool parse_{}(parse_state_t *parse_state, {} *out)".format(self.name, self.c_type)
+        )
+        with out_file.code_block():
+            out_file.print("if (check_type(parse_state, JSMN_OBJECT))")
+            with out_file.code_block():
+                out_file.print("return true;")
+            self.generate_discriminator_lookup(out_file)
+            self.generate_variant_dispatch(out_file)
+        out_file.print("")
+
+    @emit_once
+    def generate_table_descriptor(self, out_file):
+        # The variants skip the discriminator key, which the object descriptors cannot express,
+        # so unions are always parsed by generated code.
+        self.generate_table_descriptor_for_parser_bodies(out_file)
+
+    def generate_encoder_call(self, in_var_name, out_file):
+        self.generate_builtin_codec_call("encode_{}(encoder, {})".format(self.name, in_var_name), out_file)
+
+    def generate_decoder_call(self, out_var_name, out_file):
+        self.generate_builtin_codec_call("decode_{}(decoder, {})".format(self.name, out_var_name), out_file)
+
+    def generate_variant_switch(self, struct_var_name, generate_variant_call, out_file):
+        out_file.print("switch ({}->{})".format(struct_var_name, self.tag_name))
+        with out_file.code_block():
+            for value, (member_name, variant_generator) in self.variants.items():
+                out_file.print("case {}:".format(self.tag_generator.convert_enum_label(value)))
+                with out_file.indent():
+                    generate_variant_call(variant_generator, "&{}->{}".format(struct_var_name, member_name), out_file)
+                    out_file.print("return false;")
+            out_file.print("default:")
+            with out_file.indent():
+                out_file.print("return true;")
+
+    @emit_once
+    def generate_codec_bodies(self, out_file):
+        for _, variant_generator in self.variants.values():
+            variant_generator.generate_codec_bodies(out_file)
+
+        out_file.print("static bool encode_{}(js2c_encoder_t *encoder, const {} *in)".format(self.name, self.c_type))
+        with out_file.code_block():
+            self.tag_generator.generate_encoder_call("&in->{}".format(self.tag_name), out_file)
+            self.generate_variant_switch("in", UnionVariantGenerator.generate_encoder_call, out_file)
+        out_file.print("")
+
+        out_file.print("static bool decode_{}(js2c_decoder_t *decoder, {} *out)".format(self.name, self.c_type))
+        with out_file.code_block():
+            self.tag_generator.generate_decoder_call("&out->{}".format(self.tag_name), out_file)
+            self.generate_variant_switch("out", UnionVariantGenerator.generate_decoder_call, out_file)
+        out_file.print("")
+
+    def wire_signature(self):
+        return "<{}>".format(
+            ",".join(
+                "{}:{}".format(value, variant_generator.wire_signature())
+                for value, (_, variant_generator) in self.variants.items()
+            )
+        )
+
+    def max_encoded_size(self):
+        return self.tag_generator.max_encoded_size() + max(
+            variant_generator.max_encoded_size() for _, variant_generator in self.variants.values()
+        )
+
+    def python_value(self, in_var_name):
+        return "to_python_{}({})".format(self.name, in_var_name)
+
+    @emit_once
+    def generate_python_bodies(self, out_file):
+        """ The dict of the variant, with the discriminator put back """
+        self.tag_generator.generate_python_bodies(out_file)
+        for _, variant_generator in self.variants.values():
+            variant_generator.generate_python_bodies(out_file)
+
+        out_file.print("static PyObject *to_python_{}(const {} *in)".format(self.name, self.c_type))
+        with out_file.code_block():
+            out_file.print("PyObject *out;")
+            out_file.print("switch (in->{})".format(self.tag_name))
+            with out_file.code_block():
+                for value, (member_name, variant_generator) in self.variants.items():
+                    out_file.print("case {}:".format(self.tag_generator.convert_enum_label(value)))
+                    with out_file.indent():
+                        out_file.print("out = {};".format(variant_generator.python_value("&in->{}".format(member_name))))
+                        out_file.print("break;")
+                out_file.print("default:")
+                with out_file.indent():
+                    out_file.print('PyErr_SetString(PyExc_ValueError, "Invalid {} in {}");'.format(self.tag_name, self.name))
+                    out_file.print("return NULL;")
+            out_file.print(
+                'if (out == NULL || python_set_item(out, "{}", {}))'
+                .format(self.discriminator, self.tag_generator.python_value("&in->{}".format(self.tag_name)))
+            )
+            with out_file.code_block():
+                out_file.print("Py_XDECREF(out);")
+                out_file.print("return NULL;")
+            out_file.print("return out;")
+        out_file.print("")
+
+    def build_python_validator(self):
+        discriminator = self.discriminator
+        variant_validators = {
+            value: variant_generator.build_python_validator()
+            for value, (_, variant_generator) in self.variants.items()
+        }
+
+        def validate_union(value, context):
+            if not isinstance(value, dict):
+                raise ValueError("Invalid object: {!r}".format(value))
+            if discriminator not in value:
+                raise ValueError("Missing discriminator field: {}".format(discriminator))
+            tag = value[discriminator]
+            variant_validator = variant_validators.get(tag) if isinstance(tag, str) else None
+            if variant_validator is None:
+                raise ValueError("Unknown discriminator value: {!r}".format(tag))
+            variant_validator(value, context)
+        return validate_union
+
+    def max_token_num(self):
+        # The variant objects, with the discriminator key and value
+        return max(variant_generator.max_token_num() for _, variant_generator in self.variants.values()) + 2
+
+    def estimated_layout(self):
+        variant_layouts = [variant_generator.estimated_layout() for _, variant_generator in self.variants.values()]
+        # The anonymous union is as large as its largest variant
+        union_layout = self.struct_layout([
+            (max(size for size, _ in variant_layouts), max(alignment for _, alignment in variant_layouts))
+        ])
+        return self.struct_layout([self.tag_generator.estimated_layout(), union_layout])
+
+    def memory_children(self):
+        return [(".{}".format(self.tag_name), self.tag_generator, 1)] + [
+            (".{}".format(member_name), variant_generator, 1)
+            for member_name, variant_generator in self.variants.values()
+        ]
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import io
+import json
+import os
+import sys
+
+from .cache import GenerationCache, write_if_changed
+from .codegen.builtins_library import BuiltinsLibraryGenerator
+from .codegen.root import RootGenerator, DIR_OF_THIS_FILE as CODEGEN_DIR
+from .profiler import Profiler, NULL_PROFILER
+from .schema import load_schema
+from .settings import Settings
+
+BUILTIN_FILES = (
+    os.path.join(CODEGEN_DIR, 'js2c_builtins.h'),
+    os.path.join(CODEGEN_DIR, 'jsmn.h'),
+)
+SCHEMA_EXTENSIONS = ('.schema.json', '.json')
+
+
+def generate(schema, settings, h_file_name, profiler=NULL_PROFILER, extra_roots=()):
+    """ Returns the contents of the files listed by output_file_names(), in the same order """
+    with profiler.phase("Generator construction"):
+        root_generator = RootGenerator(schema, settings, extra_roots)
+    profiler.observe(root_generator)
+    # The source is generated first, so that the header knows the number of JS2C_STATS counters without a dry run.
+    with profiler.phase("Source emission"):
+        c_contents = io.StringIO()
+        internal_h_contents = io.StringIO()
+        part_contents = [io.StringIO() for _ in range(1, RootGenerator.split_parser_file_num(settings))]
+        root_generator.generate_parser_c(c_contents, h_file_name, internal_h_contents, part_contents)
+    with profiler.phase("Header emission"):
+        h_contents = io.StringIO()
+        root_generator.generate_parser_h(h_contents, h_file_name)
+    if not part_contents:
+        return [c_contents.getvalue(), h_contents.getvalue()]
+    return (
+        [c_contents.getvalue(), h_contents.getvalue(), internal_h_contents.getvalue()]
+        + [part.getvalue() for part in part_contents]
+    )
+
+
+def output_file_names(c_file_name, h_file_name, settings):
+    """ The generated files: the C file and the header, and with splitParserFiles the internal header and the parts """
+    file_num = RootGenerator.split_parser_file_num(settings)
+    if file_num <= 1:
+        return [c_file_name, h_file_name]
+    c_file_stem = os.path.splitext(c_file_name)[0]
+    return (
+        [c_file_name, h_file_name, RootGenerator.internal_header_name(h_file_name)]
+        + ["{}_{}.c".format(c_file_stem, part_index) for part_index in range(1, file_num)]
+    )
+
+
+def depfile_name(c_file_name):
+    return os.path.splitext(c_file_name)[0] + ".d"
+
+
+def generate_depfile(target_file_names, schema_file_names, settings):
+    """ Make-style dependency file, so build systems know when the parser must be regenerated """
+    dependencies = list(schema_file_names)
+    for field in Settings.FIELDS:
+        value = getattr(settings, field.name)
+        if hasattr(value, 'read'):
+            dependencies.append(value.name)
+    dependencies.extend(os.path.realpath(builtin_file) for builtin_file in BUILTIN_FILES)
+
+    def escape(file_name):
+        """ Escape the characters that are special in the rules of a Makefile """
+        for special_character in ' #:':
+            file_name = file_name.replace(special_character, '\\' + special_character)
+        return file_name.replace('$', '$$')
+
+    return "{}: \\\n  {}\n".format(
+        " ".join(escape(target_file_name) for target_file_name in target_file_names),
+        " \\\n  ".join(escape(dependency) for dependency in dependencies),
+    )
+
+
+def generate_files(schema_file_name, c_file_name, h_file_name, args):
+    """ args are the command line options: settings, plus the optional cache_dir, depfile and profiling options """
+    profiler = Profiler(args.get('profile_output')) if args.get('profile') else NULL_PROFILER
+    with profiler:
+        generate_files_with_profiler(schema_file_name, c_file_name, h_file_name, args, profiler)
+    profiler.report(schema_file_name, sys.stderr)
+
+
+def load_schema_and_settings(schema_file_name, args, profiler):
+    with open(schema_file_name, encoding="utf-8") as schema_file:
+        schema = load_schema(schema_file, profiler)
+    return schema, Settings(args, schema.get('js2cSettings', {}))
+
+
+def generate_files_with_profiler(schema_file_name, c_file_name, h_file_name, args, profiler):
+    extra_schema_file_names = args.get('extra_schema') or []
+    schema, settings = load_schema_and_settings(schema_file_name, args, profiler)
+    extra_roots = [
+        load_schema_and_settings(extra_schema_file_name, args, profiler)
+        for extra_schema_file_name in extra_schema_file_names
+    ]
+    h_base_name = os.path.basename(h_file_name)
+    file_names = output_file_names(c_file_name, h_file_name, settings)
+    if args.get('memory_report'):
+        RootGenerator(schema, settings, extra_roots).print_memory_report(sys.stderr)
+
+    if args.get('cache_dir') is None:
+        contents = generate(schema, settings, h_base_name, profiler, extra_roots)
+    else:
+        cache = GenerationCache(args['cache_dir'])
+        with profiler.phase("Cache lookup"):
+            key = cache.key(schema, settings, h_base_name, extra_roots)
+            contents = cache.load(key, len(file_names))
+        if contents is None:
+            contents = generate(schema, settings, h_base_name, profiler, extra_roots)
+            cache.store(key, contents)
+
+    with profiler.phase("Writing output files"):
+        for file_name_and_contents in zip(file_names, contents):
+            write_if_changed(*file_name_and_contents)
+        if args.get('depfile'):
+            write_if_changed(
+                depfile_name(c_file_name),
+                generate_depfile(file_names, [schema_file_name] + extra_schema_file_names, settings)
+            )
+
+
+def generate_builtins_library(c_file_name, h_file_name, args):
+    library_generator = BuiltinsLibraryGenerator(Settings(args, {}))
+    c_contents = io.StringIO()
+    library_generator.generate_library_c(c_contents)
+    h_contents = io.StringIO()
+    library_generator.generate_library_h(h_contents)
+    write_if_changed(h_file_name, h_contents.getvalue())
+    write_if_changed(c_file_name, c_contents.getvalue())
+
+
+def read_manifest(manifest_file_name):
+    """ A manifest is a JSON list of {"schema": ..., "c_file": ..., "h_file": ...} objects """
+    with open(manifest_file_name, encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+    return [(entry["schema"], entry["c_file"], entry["h_file"]) for entry in manifest]
+
+
+def expand_batch_patterns(patterns, output_dir):
+    """ Every <name>.schema.json matched by the patterns is generated into <output_dir>/<name>.parser.[ch] """
+    jobs = []
+    for pattern in patterns:
+        schema_file_names = sorted(glob.glob(pattern))
+        if not schema_file_names:
+            raise ValueError("No schemas found for pattern '{}'".format(pattern))
+        for schema_file_name in schema_file_names:
+            base_name = os.path.basename(schema_file_name)
+            for extension in SCHEMA_EXTENSIONS:
+                if base_name.endswith(extension):
+                    base_name = base_name[:-len(extension)]
+                    break
+            output_base = os.path.join(output_dir or os.path.dirname(schema_file_name), base_name)
+            jobs.append((schema_file_name, output_base + ".parser.c", output_base + ".parser.h"))
+    return jobs
+
+
+def picklable_args(args):
+    """ Files opened by argparse can not be sent to worker processes, so they are sent by name """
+    return {key: value.name if hasattr(value, 'read') else value for key, value in args.items()}
+
+
+def reopen_args(args):
+    args = dict(args)
+    for field in Settings.FIELDS:
+        if isinstance(args.get(field.name), str) and field.type is not str:
+            args[field.name] = field.type(args[field.name])
+    return args
+
+
+def generate_batch_job(job, args):
+    schema_file_name, c_file_name, h_file_name = job
+    try:
+        generate_files(schema_file_name, c_file_name, h_file_name, reopen_args(args))
+    except Exception as e:  # pylint: disable=broad-except
+        return "{}: {}: {}".format(schema_file_name, type(e).__name__, e)
+    return None
+
+
+def run_batch(jobs, args, max_workers=None):
+    """
+    Generate all (schema, c_file, h_file) jobs in parallel, always writing depfiles.
+    Returns the number of failed jobs.
+    """
+    output_files = [output_file for _, c_file_name, h_file_name in jobs for output_file in (c_file_name, h_file_name)]
+    duplicates = sorted(set(output_file for output_file in output_files if output_files.count(output_file) > 1))
+    if duplicates:
+        raise ValueError("Multiple schemas would be generated into the same files: {}".format(", ".join(duplicates)))
+
+    for _, c_file_name, h_file_name in jobs:
+        for output_file in (c_file_name, h_file_name):
+            os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+
+    args = picklable_args(args)
+    args['depfile'] = True
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        errors = list(executor.map(generate_batch_job, jobs, [args] * len(jobs)))
+    errors = [error for error in errors if error is not None]
+    for error in errors:
+        print(error, file=sys.stderr)
+    return len(errors)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+from collections import Counter
+import contextlib
+import cProfile
+import sys
+import time
+import tracemalloc
+
+from .codegen.code_block_printer import CodeBlockPrinter, CodeBlockContextManager
+from .codegen.generator_factory import schema_to_json
+
+
+class NullProfiler:
+    """ Used when profiling is off, so the profiled code does not need to check """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        pass
+
+    def phase(self, name):
+        _ = name
+        return contextlib.nullcontext()
+
+    def observe(self, root_generator):
+        pass
+
+    def report(self, title, out):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def count_lines_by_generator(lines_by_generator):
+    """ Creates a CodeBlockPrinter subclass that attributes the printed lines to the generator printing them """
+    class LineCountingCodeBlockPrinter(CodeBlockPrinter):
+        def print(self, line):
+            if line not in ("else", "{", ""):
+                self.count_lines(1)
+            super().print(line)
+
+        def write(self, data):
+            self.count_lines(data.count("\n") + 1)
+            super().write(data)
+
+        @classmethod
+        def count_lines(cls, line_num):
+            frame = sys._getframe(2)  # pylint: disable=protected-access
+            while frame is not None:
+                caller = frame.f_locals.get('self')
+                if caller is not None and not isinstance(caller, (CodeBlockPrinter, CodeBlockContextManager)):
+                    lines_by_generator[type(caller).__name__] += line_num
+                    return
+                frame = frame.f_back
+
+    return LineCountingCodeBlockPrinter
+
+
+class Profiler:
+    """ Measures wall time and peak memory of the generation phases, and collects generator statistics.
+
+    Note that memory tracing itself slows down Python considerably, so the times are only comparable
+    to each other.
+    """
+    LARGEST_SUBSCHEMA_NUM = 10
+
+    def __init__(self, cprofile_file_name=None):
+        self.cprofile_file_name = cprofile_file_name
+        self.cprofile = None
+        self.phases = []
+        self.generator_counts = Counter()
+        self.lines_by_generator = Counter()
+        self.largest_subschemas = []
+
+    def __enter__(self):
+        tracemalloc.start()
+        if self.cprofile_file_name is not None:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.cprofile_file_name)
+        tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0]
+        start_time = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start_time
+        peak_memory = tracemalloc.get_traced_memory()[1] - start_memory
+        self.phases.append((name, elapsed, peak_memory))
+
+    def observe(self, root_generator):
+        """ Collect statistics about the generator tree, and count the lines it emits from now on """
+        subschema_sizes = []
+        for generator, schema in root_generator.generator_factory.created_generators:
+            self.generator_counts[type(generator).__name__] += 1
+            subschema_sizes.append((len(schema_to_json(schema)), generator.name, type(generator).__name__))
+        subschema_sizes.sort(reverse=True)
+        self.largest_subschemas = subschema_sizes[:self.LARGEST_SUBSCHEMA_NUM]
+        root_generator.printer_class = count_lines_by_generator(self.lines_by_generator)
+
+    def report(self, title, out):
+        out.write("Profile of {}\n".format(title))
+        out.write("  {:<28}{:>12}{:>20}\n".format("Phase", "Time [ms]", "Peak memory [KiB]"))
+        for name, elapsed, peak_memory in self.phases:
+            out.write("  {:<28}{:>12.1f}{:>20.1f}\n".format(name, elapsed * 1000, peak_memory / 1024))
+        out.write("  {:<28}{:>12.1f}\n".format("Total", sum(elapsed for _, elapsed, _ in self.phases) * 1000))
+
+        out.write("Generator instances\n")
+        for class_name, count in self.generator_counts.most_common():
+            out.write("  {:<40}{:>10}\n".format(class_name, count))
+
+        out.write("Emitted lines per generator type\n")
+        for class_name, count in self.lines_by_generator.most_common():
+            out.write("  {:<40}{:>10}\n".format(class_name, count))
+
+        out.write("Largest subschemas (serialized size in bytes)\n")
+        for size, name, class_name in self.largest_subschemas:
+            out.write("  {:<40}{:>10}  {}\n".format(name, size, class_name))
+
+        if self.cprofile_file_name is not None:
+            out.write("cProfile statistics written to {}\n".format(self.cprofile_file_name))
@@ -25,45 +25,108 @@
 import json
 from collections import OrderedDict
 
+from .profiler import NULL_PROFILER
 
-# WARNING: reviewing the following algorithm might cause brain damage
-# Sorry for that.
-def resolve_children(full_schema, part_to_resolve):
-    if part_to_resolve is None:
-        return
-    if isinstance(part_to_resolve, (str, int, bool, float)):
-        return
-    if isinstance(part_to_resolve, list):
-        for i, v in enumerate(part_to_resolve):
-            part_to_resolve[i] = resolve_ref(full_schema, v)
-            resolve_children(full_schema, v)
-        return
-    if isinstance(part_to_resolve, dict):
-        for k, v in part_to_resolve.items():
-            part_to_resolve[k] = resolve_ref(full_schema, v)
-            resolve_children(full_schema, v)
-        return
-    raise ValueError("Value {} is not supported by the schema loader".format(part_to_resolve))
-
-
-def resolve_ref(full_schema, part_to_resolve):
-    if not isinstance(part_to_resolve, dict) or "$ref" not in part_to_resolve:
-        return part_to_resolve
-    if len(part_to_resolve) > 1:
-        raise ValueError("Reference nodes should not contain other fields")
-
-    ref_str = part_to_resolve["$ref"]
-    if ref_str[0] != '#':
-        raise ValueError("Only in-file references are supported")
-    if ref_str[1] != '/':
-        raise ValueError("Only path-like references are supported. (Id-based references are not)")
-    ref_str = ref_str[2:] + '/'
-    replacement = full_schema
-    while ref_str:
-        part, ref_str = ref_str.split('/', 1)
-        replacement = replacement[part]
-    return replacement
-# WARNING OVER
+
+class SchemaDefinition(OrderedDict):
+    """ A part of the schema that was referenced with $ref.
+
+    All references to the same definition resolve to the same instance, so generators can be shared.
+    """
+
+    def __init__(self, items=(), ref=None):
+        super().__init__(items)
+        self.ref = ref
+
+
+SCALAR_TYPES = (str, int, bool, float, type(None))
+
+
+def is_ref_node(node):
+    return isinstance(node, dict) and "$ref" in node
+
+
+class ReferenceResolver:
+    """ Resolves $ref strings to the referenced parts of the schema.
+
+    Every JSON pointer is only parsed and followed once, references to references are followed
+    until a real schema part is found, and reference cycles are reported instead of looping forever.
+    """
+
+    def __init__(self, full_schema):
+        self.full_schema = full_schema
+        self.targets = {}
+        self.references = {}
+        self.resolving = []
+
+    @classmethod
+    def get_ref_string(cls, ref_node):
+        if len(ref_node) > 1:
+            raise ValueError("Reference nodes should not contain other fields")
+        ref_str = ref_node["$ref"]
+        if not ref_str.startswith('#'):
+            raise ValueError("Only in-file references are supported")
+        if not ref_str.startswith('#/'):
+            raise ValueError("Only path-like references are supported. (Id-based references are not)")
+        return ref_str
+
+    def resolve(self, ref_node):
+        ref_str = self.get_ref_string(ref_node)
+        chain = []
+        while ref_str not in self.targets:
+            if ref_str in self.resolving:
+                cycle = self.resolving[self.resolving.index(ref_str):] + [ref_str]
+                raise ValueError("Circular $ref chain: {}".format(" -> ".join(cycle)))
+            chain.append(ref_str)
+            self.resolving.append(ref_str)
+            target = self.follow_pointer(ref_str)
+            if not is_ref_node(target):
+                self.targets[ref_str] = target
+                self.references.setdefault(id(target), ref_str)
+                break
+            ref_str = self.get_ref_string(target)
+        target = self.targets[ref_str]
+        for chained_ref_str in chain:
+            self.targets[chained_ref_str] = target
+        del self.resolving[len(self.resolving) - len(chain):]
+        return target
+
+    def follow_pointer(self, ref_str):
+        node = self.full_schema
+        for part in ref_str[2:].split('/'):
+            if is_ref_node(node):
+                node = self.resolve(node)
+            part = part.replace('~1', '/').replace('~0', '~')
+            try:
+                node = node[int(part)] if isinstance(node, list) else node[part]
+            except (KeyError, IndexError, ValueError, TypeError):
+                raise ValueError("Could not resolve reference '{}'".format(ref_str)) from None
+        return node
+
+
+def resolve_refs(full_schema):
+    """ Replace all reference nodes in place with the referenced parts of the schema.
+
+    Returns a dict of id(referenced part) -> $ref string.
+    """
+    resolver = ReferenceResolver(full_schema)
+    visited = set()
+    to_visit = [full_schema]
+    while to_visit:
+        part_to_resolve = to_visit.pop()
+        if id(part_to_resolve) in visited:
+            continue
+        visited.add(id(part_to_resolve))
+        children = part_to_resolve.items() if isinstance(part_to_resolve, dict) else enumerate(part_to_resolve)
+        for key, value in children:
+            if is_ref_node(value):
+                value = resolver.resolve(value)
+                part_to_resolve[key] = value
+            if isinstance(value, (dict, list)):
+                to_visit.append(value)
+            elif not isinstance(value, SCALAR_TYPES):
+                raise ValueError("Value {} is not supported by the schema loader".format(value))
+    return resolver.references
 
 
 def all_of_merge_single_pair(element1, element2):
@@ -85,7 +148,8 @@ def all_of_merge_single_pair(element1, element2):
 
 
 def all_of_merge_dict(schema1, schema2):
-    result = schema1.copy()
+    # The merged schema is a new type, even if one of its parts was a referenced definition.
+    result = OrderedDict(schema1)
     for key, value in schema2.items():
         if key in result:
             result[key] = all_of_merge_single_pair(result[key], value)
@@ -94,23 +158,75 @@ def all_of_merge_dict(schema1, schema2):
     return result
 
 
-def resolve_all_of(schema):
-    if not isinstance(schema, dict):
-        # TODO: Also process arrays in the schema. I'm not sure it's needed though, there are not many arrays
-        #       in schema definitions, and I think none of them need allOf expansion.
+def finish_part(schema, replaced, references, unfinished_definitions):
+    """ Build the final version of a schema part, once all of its children are finished.
+
+    Parts that are not referenced are only reachable from a single place, so they are updated in place.
+    Referenced parts fill their SchemaDefinition, which was created in advance, so that references back to
+    the part from its own children (recursive schemas) point to it too.
+    """
+    children = schema.items() if isinstance(schema, dict) else enumerate(schema)
+    for k, v in children:
+        if id(v) in replaced:
+            schema[k] = replaced[id(v)]
+    if isinstance(schema, list) or ("allOf" not in schema and id(schema) not in references):
         return schema
 
-    result = OrderedDict((k, resolve_all_of(v)) for k, v in schema.items() if k != "allOf")
-    if "allOf" in schema:
-        for schema_to_process in schema["allOf"]:
-            schema_to_process = resolve_all_of(schema_to_process)
-            result = all_of_merge_dict(result, schema_to_process)
+    result = OrderedDict((k, v) for k, v in schema.items() if k != "allOf")
+    for schema_to_process in schema.get("allOf", ()):
+        if id(schema_to_process) in unfinished_definitions:
+            raise ValueError("Recursive allOf is not supported (found a cycle through '{}')".format(
+                schema_to_process.ref
+            ))
+        result = all_of_merge_dict(result, schema_to_process)
+    if id(schema) in references:
+        definition = replaced[id(schema)]
+        definition.update(result)
+        unfinished_definitions.remove(id(definition))
+        return definition
     return result
 
 
-def load_schema(schema_file):
-    schema = json.load(schema_file, object_pairs_hook=OrderedDict)
+def resolve_all_of(schema, references):
+    """ Merge allOf declarations, and wrap referenced parts into SchemaDefinitions.
+
+    Referenced parts are reached multiple times, but are only processed once and stay a single instance.
+    Cycles are only possible through references, and become cycles of SchemaDefinitions.
+    """
+    replaced = {}
+    finished = set()
+    in_progress = set()
+    unfinished_definitions = set()
+    to_process = [(schema, False)]
+    while to_process:
+        part, children_finished = to_process.pop()
+        if children_finished:
+            in_progress.remove(id(part))
+            finished.add(id(part))
+            new_part = finish_part(part, replaced, references, unfinished_definitions)
+            if new_part is not part:
+                replaced[id(part)] = new_part
+            continue
+        if id(part) in finished or id(part) in in_progress:
+            continue
+        in_progress.add(id(part))
+        if id(part) in references:
+            definition = SchemaDefinition(ref=references[id(part)])
+            replaced[id(part)] = definition
+            unfinished_definitions.add(id(definition))
+        to_process.append((part, True))
+        for child in part.values() if isinstance(part, dict) else part:
+            if isinstance(child, (dict, list)) and id(child) not in finished:
+                to_process.append((child, False))
+    return replaced.get(id(schema), schema)
+
+
+def load_schema(schema_file, profiler=NULL_PROFILER):
+    with profiler.phase("JSON loading"):
+        schema = json.load(schema_file, object_pairs_hook=OrderedDict)
     assert '$id' in schema, "All schemas must have an ID (a field named '$id')"
-    resolve_children(schema, schema)
-    schema = resolve_all_of(schema)
+    with profiler.phase("$ref resolution"):
+        references = resolve_refs(schema)
+    with profiler.phase("allOf merging"):
+        schema = resolve_all_of(schema, references)
     return schema
@@ -33,6 +33,16 @@ def snake_to_camel_case(text: str):
     return text[0].lower() + text[1:]
 
 
+def str_to_bool(value):
+    if isinstance(value, bool):
+        return value
+    if str(value).lower() in ("1", "true", "yes", "on"):
+        return True
+    if str(value).lower() in ("0", "false", "no", "off"):
+        return False
+    raise argparse.ArgumentTypeError("Boolean value expected, got '{}'".format(value))
+
+
 class Settings:
     # pylint: disable=too-few-public-methods
     FIELDS = [
@@ -74,6 +84,74 @@ class Settings:
             "with this path will be generated. Be sure to copy js2c_builtins.h there.",
             metavar="file",
         ),
+        SettingsField(
+            "binary_input_formats",
+            type=str,
+            help="Comma separated list of binary formats (cbor, msgpack) to generate additional parsers for,\n"
+            "e.g. cbor_parse_<name>(data, size, &out), filling the same structs with the same checks as the JSON parser.",
+            metavar="formats",
+        ),
+        SettingsField(
+            "binary_codec",
+            type=str_to_bool,
+            help="Generate <name>_encode and <name>_decode, to store parsed structs in a compact, versioned binary format \n"
+            "(e.g. for IPC or caching), with the same checks on decoding as the JSON parser.",
+            metavar="bool",
+        ),
+        SettingsField(
+            "merge_patch",
+            type=str_to_bool,
+            help="Generate json_merge_patch_<name>(&inout, patch, len), which applies a JSON merge patch (RFC 7386) \n"
+            "to an already parsed struct, only parsing the fields present in the patch.",
+            metavar="bool",
+        ),
+        SettingsField(
+            "python_module",
+            type=str,
+            help="Also generate a CPython extension module with this name into the .c file, with parse(bytes) -> dict \n"
+            "and validate(bytes) -> bool functions. It is compiled if JS2C_PYTHON_MODULE is defined.",
+            metavar="name",
+        ),
+        SettingsField(
+            "table_driven_parser",
+            type=str_to_bool,
+            help="Instead of a specialised parse function for every type, generate compact static descriptor tables \n"
+            "that are parsed by a generic interpreter in the builtins. Results in much smaller code for large schemas.",
+            metavar="bool",
+        ),
+        SettingsField(
+            "max_struct_bytes",
+            type=int,
+            help="Fail if the estimated size of a root type is larger than this, and static_assert its exact size.",
+            metavar="bytes",
+        ),
+        SettingsField(
+            "max_stack_bytes",
+            type=int,
+            help="Fail if the estimated stack space of the token buffers of a root is larger than this, \n"
+            "and static_assert their exact size.",
+            metavar="bytes",
+        ),
+        SettingsField(
+            "split_parser_files",
+            type=int,
+            help="Split the parsers of the generated C file between this many files (<c file>, <c file>_1.c, ...) \n"
+            "that can be compiled in parallel, with their shared declarations in <h file>_internal.h.",
+            metavar="n",
+        ),
+        SettingsField(
+            "max_recursive_nodes",
+            type=int,
+            help="Required for recursive schemas: the maximum number of nodes of recursive types in a document. \n"
+            "The token buffer is sized for this many nodes, and they are stored in a node pool given to the parser.",
+            metavar="n",
+        ),
+        SettingsField(
+            "max_recursion_depth",
+            type=int,
+            help="The maximum nesting depth of the nodes of recursive types. Not limited by default.",
+            metavar="n",
+        ),
     ]
 
     def __init__(self, args, settings_json):
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+""" Pure Python validators, built from the same generator tree as the C parsers.
+
+The schema is only processed once per (schema, settings) pair: the generators build a tree of specialised closures,
+which is cached, so validating a document does not walk the schema again.
+"""
+import json
+
+from .cache import schema_fingerprint
+from .codegen.root import RootGenerator
+from .schema import load_schema
+from .settings import Settings
+
+_validator_cache = {}
+
+
+def compile_validator(schema, args=None):
+    """ A function raising ValueError if a decoded JSON document (e.g. from json.loads) is rejected by the C parser.
+
+    schema is a loaded schema (see load_schema), args are command line settings, as for generate_files.
+    """
+    args = args or {}
+    key = (schema_fingerprint(schema), json.dumps(args, sort_keys=True, default=str))
+    validator = _validator_cache.get(key)
+    if validator is None:
+        settings = Settings(args, schema.get('js2cSettings', {}))
+        validator = RootGenerator(schema, settings).build_python_validator()
+        _validator_cache[key] = validator
+    return validator
+
+
+def load_validator(schema_file_name, args=None):
+    with open(schema_file_name, encoding="utf-8") as schema_file:
+        schema = load_schema(schema_file)
+    return compile_validator(schema, args)
+
+
+def reject_duplicate_keys(pairs):
+    result = dict(pairs)
+    if len(result) != len(pairs):
+        raise ValueError("Duplicate field definition")
+    return result
+
+
+def validate_json(validator, json_string):
+    """ Decode and validate a JSON document. Duplicate keys are rejected, like in the C parser. """
+    validator(json.loads(json_string, object_pairs_hook=reject_duplicate_keys))
@@ -25,14 +25,20 @@
 #define JS2C_BUILTINS_H
 
 #include <stdbool.h>
+#include <stddef.h>
 #include <stdint.h>
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
 
+/* Builtin functions are private to every generated parser by default. The prebuilt builtins library
+ * (see --builtins-library) defines JS2C_API as empty, so that they are only compiled once. */
+#ifndef JS2C_API
+#define JS2C_API static inline
 #ifndef JSMN_STATIC
 #define JSMN_STATIC
 #endif
+#endif
 
 #ifndef JSMN_STRICT
 #define JSMN_STRICT
@@ -44,20 +50,103 @@
 #define LOG_ERROR(position, ...)
 #endif
 
+#ifdef JS2C_STATS
+#include <inttypes.h>
+#include <time.h>
+#endif
+
+/* Numbers and literals of binary (CBOR, MessagePack) input, which have no text to parse */
+typedef enum js2c_binary_kind_e {
+    JS2C_BINARY_UNSIGNED,
+    JS2C_BINARY_NEGATIVE,
+    JS2C_BINARY_DOUBLE,
+    JS2C_BINARY_TRUE,
+    JS2C_BINARY_FALSE,
+    JS2C_BINARY_NULL
+} js2c_binary_kind_t;
+
+typedef struct js2c_binary_value_s {
+    js2c_binary_kind_t kind;
+    union {
+        uint64_t u;
+        int64_t i;
+        double d;
+    } as;
+} js2c_binary_value_t;
+
+struct parse_state_s;
+
+/* A node of a recursive type, which is parsed after its parent (see builtin_defer_parse) */
+typedef struct js2c_deferred_parse_s {
+    bool (*parse)(struct parse_state_s *parse_state, void *out);
+    void *out;
+    uint64_t token;
+    const char *key;
+    uint64_t depth;
+} js2c_deferred_parse_t;
+
+/* Parser state of recursive schemas. The nodes are allocated from a pool given by the caller, and the nodes
+ * still to be parsed are kept on an explicit stack, so the C stack does not grow with the depth of the document. */
+typedef struct js2c_recursion_s {
+    uint8_t *pool;
+    size_t pool_size;
+    size_t pool_used;
+    js2c_deferred_parse_t *deferred;
+    uint64_t deferred_num;
+    uint64_t node_num;
+    uint64_t max_node_num;
+    uint64_t depth;
+    uint64_t max_depth;
+} js2c_recursion_t;
+
 typedef struct parse_state_s {
     const char *json_string;
     const char *current_key;
     jsmntok_t *tokens;
+    /* For binary input: the values of the primitive tokens, indexed like tokens. NULL for JSON input. */
+    const js2c_binary_value_t *binary_values;
+    /* Only used by the parsers of recursive schemas */
+    js2c_recursion_t *recursion;
     uint64_t current_token;
     uint64_t max_token_num;
+    /* Counters of the caller-provided stats struct. NULL if the parser was called without stats.
+     * Only used if JS2C_STATS is defined, but always present, so a builtins library compiled with different
+     * flags than the parsers still agrees with them on the layout of parse_state_t.
+     */
+    uint64_t *stats_field_hits;
+    uint64_t *stats_error_sites;
+    uint64_t stats_token_num;
+    uint64_t stats_byte_num;
+    uint64_t stats_tokenized_ns;
+    bool stats_syntax_error;
 } parse_state_t;
 
+/* Runtime statistics. Only compiled in if JS2C_STATS is defined, and expand to nothing otherwise. */
+#ifdef JS2C_STATS
+#define JS2C_STATS_INIT(parse_state) \
+    ((parse_state)->stats_field_hits = NULL, (parse_state)->stats_error_sites = NULL)
+#define JS2C_STATS_FIELD_HIT(parse_state, index) \
+    ((parse_state)->stats_field_hits ? (void)((parse_state)->stats_field_hits[(index)] += 1) : (void)0)
+#define JS2C_STATS_ERROR_SITE(parse_state, index) \
+    ((parse_state)->stats_error_sites ? (void)((parse_state)->stats_error_sites[(index)] += 1) : (void)0)
+
+JS2C_API uint64_t builtin_stats_now_ns(void) {
+    struct timespec now;
+    timespec_get(&now, TIME_UTC);
+    return (uint64_t)now.tv_sec * 1000000000u + (uint64_t)now.tv_nsec;
+}
+#else
+#define JS2C_STATS_INIT(parse_state) ((void)0)
+#define JS2C_STATS_FIELD_HIT(parse_state, index) ((void)0)
+#define JS2C_STATS_ERROR_SITE(parse_state, index) ((void)0)
+#endif
+
 #define CURRENT_TOKEN(parse_state) ((parse_state)->tokens[(parse_state)->current_token])
 #define CURRENT_STRING(parse_state) ((parse_state)->json_string + CURRENT_TOKEN(parse_state).start)
 #define CURRENT_STRING_LENGTH(parse_state) (CURRENT_TOKEN(parse_state).end - CURRENT_TOKEN(parse_state).start)
 #define CURRENT_STRING_FOR_ERROR(parse_state) CURRENT_STRING_LENGTH(parse_state), CURRENT_STRING(parse_state)
 
-static inline const char *token_type_as_string(jsmntype_t type) {
+JS2C_API const char *token_type_as_string(jsmntype_t type) {
     switch (type) {
     case JSMN_UNDEFINED:
         return "UNDEFINED";
@@ -74,7 +163,7 @@ static inline const char *token_type_as_string(jsmntype_t type) {
     }
 }
 
-static inline const char *jsmn_error_as_string(int err) {
+JS2C_API const char *jsmn_error_as_string(int err) {
     switch (err) {
     case JSMN_ERROR_INVAL:
         return "Invalid character";
@@ -87,7 +176,7 @@ static inline const char *jsmn_error_as_string(int err) {
     }
 }
 
-static inline bool check_type(const parse_state_t *parse_state, jsmntype_t type) {
+JS2C_API bool check_type(const parse_state_t *parse_state, jsmntype_t type) {
     const jsmntok_t *token = &parse_state->tokens[parse_state->current_token];
     if (token->type != type) {
         LOG_ERROR(
@@ -101,7 +190,7 @@ static inline bool check_type(const parse_state_t *parse_state, jsmntype_t type)
     return false;
 }
 
-static inline bool current_string_is(const parse_state_t *parse_state, const char *s) {
+JS2C_API bool current_string_is(const parse_state_t *parse_state, const char *s) {
     const jsmntok_t *token = &parse_state->tokens[parse_state->current_token];
     if (token->type != JSMN_STRING) {
         return false;
@@ -112,49 +201,360 @@ static inline bool current_string_is(const parse_state_t *parse_state, const cha
     return memcmp(parse_state->json_string + token->start, s, token->end - token->start) == 0;
 }
 
-static inline bool builtin_check_current_string(parse_state_t *parse_state, int min_len, int max_len) {
+/* Returns the index of the current key in field_names, or field_num if it is not a field name.
+ * Keys usually come in declaration order, so the field after the previous match is tried first,
+ * and all fields are only searched if that fails. */
+JS2C_API uint64_t builtin_match_key(const parse_state_t *parse_state, const char *const *field_names, uint64_t field_num, uint64_t *expected_field) {
+    uint64_t field = *expected_field;
+    if (field >= field_num || !current_string_is(parse_state, field_names[field])) {
+        for (field = 0; field < field_num && !current_string_is(parse_state, field_names[field]); ++field) {}
+    }
+    if (field < field_num) {
+        *expected_field = field + 1;
+    }
+    return field;
+}
+
+JS2C_API bool builtin_check_string_length(const parse_state_t *parse_state, int length, int min_len, int max_len) {
+    (void)parse_state; /* Only used for logging */
+    if (length > max_len) {
+        LOG_ERROR(CURRENT_TOKEN(parse_state).start, "String too large in '%s'. Length: %i. Maximum length: %i.", parse_state->current_key, length, max_len);
+        return true;
+    }
+    if (length < min_len) {
+        LOG_ERROR(CURRENT_TOKEN(parse_state).start, "String too short in '%s'. Length: %i. Minimum length: %i.", parse_state->current_key, length, min_len);
+        return true;
+    }
+    return false;
+}
+
+/* Checks the raw, still escaped string. Used for strings parsed with a js2cParseFunction. */
+JS2C_API bool builtin_check_current_string(parse_state_t *parse_state, int min_len, int max_len) {
     if (check_type(parse_state, JSMN_STRING)) {
         return true;
     }
-    const jsmntok_t *token = &CURRENT_TOKEN(parse_state);
-    if (token->end - token->start > max_len) {
-        LOG_ERROR(token->start, "String too large in '%s'. Length: %i. Maximum length: %i.", parse_state->current_key, token->end - token->start, max_len);
+    return builtin_check_string_length(parse_state, CURRENT_STRING_LENGTH(parse_state), min_len, max_len);
+}
+
+JS2C_API int builtin_hex_digit(char c) {
+    if (c >= '0' && c <= '9') {
+        return c - '0';
+    }
+    if (c >= 'a' && c <= 'f') {
+        return c - 'a' + 10;
+    }
+    if (c >= 'A' && c <= 'F') {
+        return c - 'A' + 10;
+    }
+    return -1;
+}
+
+/* The code unit of the \uXXXX escape at in, or -1 if it is not one */
+JS2C_API int32_t builtin_unicode_escape(const char *in, const char *end) {
+    if (end - in < 6 || in[0] != '\\' || in[1] != 'u') {
+        return -1;
+    }
+    int32_t code_unit = 0;
+    for (int i = 2; i < 6; ++i) {
+        const int digit = builtin_hex_digit(in[i]);
+        if (digit < 0) {
+            return -1;
+        }
+        code_unit = code_unit * 16 + digit;
+    }
+    return code_unit;
+}
+
+/* Decodes the escape sequences of a JSON string into UTF-8, and returns the decoded length, or -1 if an escape
+ * sequence is invalid. If out is NULL, only the length is calculated. Lone surrogates and \u0000 are invalid,
+ * as the result could not be stored in a NUL-terminated UTF-8 string. */
+JS2C_API int64_t builtin_unescape_string(const char *in, uint64_t length, char *out) {
+    const char *end = in + length;
+    int64_t out_length = 0;
+    while (in < end) {
+        const char *backslash = memchr(in, '\\', end - in);
+        const uint64_t plain_length = (backslash ? backslash : end) - in;
+        if (out) {
+            memcpy(out + out_length, in, plain_length);
+        }
+        out_length += plain_length;
+        if (!backslash) {
+            break;
+        }
+        in = backslash;
+        if (end - in < 2) {
+            return -1;
+        }
+        char escaped = 0;
+        switch (in[1]) {
+        case '"': escaped = '"'; break;
+        case '\\': escaped = '\\'; break;
+        case '/': escaped = '/'; break;
+        case 'b': escaped = '\b'; break;
+        case 'f': escaped = '\f'; break;
+        case 'n': escaped = '\n'; break;
+        case 'r': escaped = '\r'; break;
+        case 't': escaped = '\t'; break;
+        case 'u': break;
+        default: return -1;
+        }
+        if (escaped) {
+            if (out) {
+                out[out_length] = escaped;
+            }
+            out_length += 1;
+            in += 2;
+            continue;
+        }
+        const int32_t code_unit = builtin_unicode_escape(in, end);
+        if (code_unit <= 0 || (code_unit >= 0xDC00 && code_unit <= 0xDFFF)) {
+            return -1;
+        }
+        in += 6;
+        uint32_t code_point = code_unit;
+        if (code_unit >= 0xD800 && code_unit <= 0xDBFF) {
+            const int32_t low = builtin_unicode_escape(in, end);
+            if (low < 0xDC00 || low > 0xDFFF) {
+                return -1;
+            }
+            code_point = 0x10000 + ((uint32_t)(code_unit - 0xD800) << 10) + (uint32_t)(low - 0xDC00);
+            in += 6;
+        }
+        char utf8[4];
+        int utf8_length;
+        if (code_point < 0x80) {
+            utf8[0] = (char)code_point;
+            utf8_length = 1;
+        } else if (code_point < 0x800) {
+            utf8[0] = (char)(0xC0 | (code_point >> 6));
+            utf8[1] = (char)(0x80 | (code_point & 0x3F));
+            utf8_length = 2;
+        } else if (code_point < 0x10000) {
+            utf8[0] = (char)(0xE0 | (code_point >> 12));
+            utf8[1] = (char)(0x80 | ((code_point >> 6) & 0x3F));
+            utf8[2] = (char)(0x80 | (code_point & 0x3F));
+            utf8_length = 3;
+        } else {
+            utf8[0] = (char)(0xF0 | (code_point >> 18));
+            utf8[1] = (char)(0x80 | ((code_point >> 12) & 0x3F));
+            utf8[2] = (char)(0x80 | ((code_point >> 6) & 0x3F));
+            utf8[3] = (char)(0x80 | (code_point & 0x3F));
+            utf8_length = 4;
+        }
+        if (out) {
+            memcpy(out + out_length, utf8, utf8_length);
+        }
+        out_length += utf8_length;
+    }
+    return out_length;
+}
+
+/* Checks the type and the decoded length of the current string. Strings without a backslash (and the strings of
+ * binary input, which are never escaped) are not decoded, *escaped tells if builtin_copy_current_string has to. */
+JS2C_API bool builtin_check_current_unescaped_string(
+    parse_state_t *parse_state,
+    int min_len,
+    int max_len,
+    uint64_t *length,
+    bool *escaped
+) {
+    if (check_type(parse_state, JSMN_STRING)) {
         return true;
     }
-    if (token->end - token->start < min_len) {
-        LOG_ERROR(token->start, "String too short in '%s'. Length: %i. Minimum length: %i.", parse_state->current_key, token->end - token->start, min_len);
+    const char *raw = CURRENT_STRING(parse_state);
+    const uint64_t raw_length = CURRENT_STRING_LENGTH(parse_state);
+    *escaped = parse_state->binary_values == NULL && memchr(raw, '\\', raw_length) != NULL;
+    *length = raw_length;
+    if (*escaped) {
+        const int64_t unescaped_length = builtin_unescape_string(raw, raw_length, NULL);
+        if (unescaped_length < 0) {
+            LOG_ERROR(CURRENT_TOKEN(parse_state).start, "Invalid escape sequence in '%s': %.*s", parse_state->current_key, CURRENT_STRING_FOR_ERROR(parse_state))
+            return true;
+        }
+        *length = unescaped_length;
+    }
+    return builtin_check_string_length(parse_state, *length, min_len, max_len);
+}
+
+/* Copies the current, already checked string to out, and NUL-terminates it. out must have length + 1 bytes. */
+JS2C_API void builtin_copy_current_string(const parse_state_t *parse_state, char *out, uint64_t length, bool escaped) {
+    if (escaped) {
+        builtin_unescape_string(CURRENT_STRING(parse_state), CURRENT_STRING_LENGTH(parse_state), out);
+    } else {
+        memcpy(out, CURRENT_STRING(parse_state), length);
+    }
+    out[length] = 0;
+}
+
+JS2C_API bool builtin_parse_string(parse_state_t *parse_state, char *out, int min_len, int max_len) {
+    uint64_t length;
+    bool escaped;
+    if (builtin_check_current_unescaped_string(parse_state, min_len, max_len, &length, &escaped)) {
         return true;
     }
+    builtin_copy_current_string(parse_state, out, length, escaped);
+    parse_state->current_token += 1;
     return false;
 }
 
-static inline bool builtin_parse_string(parse_state_t *parse_state, char *out, int min_len, int max_len) {
-    if (builtin_check_current_string(parse_state, min_len, max_len)){
+/* Append the current string to a pool of NUL-terminated strings, used by arrays with js2cPoolSize */
+JS2C_API bool builtin_parse_pooled_string(
+    parse_state_t *parse_state,
+    char *pool,
+    uint64_t pool_size,
+    uint64_t *pool_used,
+    int min_len,
+    int max_len
+) {
+    uint64_t length;
+    bool escaped;
+    if (builtin_check_current_unescaped_string(parse_state, min_len, max_len, &length, &escaped)) {
         return true;
     }
-    const jsmntok_t *token = &CURRENT_TOKEN(parse_state);
-    memcpy(out, parse_state->json_string + token->start, token->end - token->start);
-    out[token->end - token->start] = 0;
+    if (length + 1 > pool_size - *pool_used) {
+        LOG_ERROR(CURRENT_TOKEN(parse_state).start, "String pool of '%s' is full. Pool size: %llu.", parse_state->current_key, (unsigned long long)pool_size);
+        return true;
+    }
+    builtin_copy_current_string(parse_state, pool + *pool_used, length, escaped);
+    *pool_used += length + 1;
     parse_state->current_token += 1;
     return false;
 }
 
-static inline bool builtin_parse_bool(parse_state_t *parse_state, bool *out) {
+/* Conversion of primitive tokens. Return true if the token is not a valid literal, without logging,
+ * so that the bulk array parsers can fall back to the logging parsers. */
+JS2C_API bool builtin_token_to_bool(const parse_state_t *parse_state, const jsmntok_t *token, bool *out) {
+    if (parse_state->binary_values != NULL) {
+        const js2c_binary_value_t *value = &parse_state->binary_values[token - parse_state->tokens];
+        *out = value->kind == JS2C_BINARY_TRUE;
+        return value->kind != JS2C_BINARY_TRUE && value->kind != JS2C_BINARY_FALSE;
+    }
+    const char first_char = parse_state->json_string[token->start];
+    *out = first_char == 't';
+    return first_char != 't' && first_char != 'f';
+}
+
+/* Short decimal integers, which cannot overflow, are converted without strtoll. */
+JS2C_API bool builtin_text_to_signed(const char *json_string, const jsmntok_t *token, int64_t *out) {
+    const char *start_char = json_string + token->start;
+    const char *end = json_string + token->end;
+    const char *digits = start_char + (*start_char == '-');
+    if (end > digits && end - digits <= 18) {
+        uint64_t value = 0;
+        const char *c = digits;
+        for (; c < end && *c >= '0' && *c <= '9'; ++c) {
+            value = value * 10 + (uint64_t)(*c - '0');
+        }
+        if (c == end) {
+            *out = digits == start_char ? (int64_t)value : -(int64_t)value;
+            return false;
+        }
+    }
+    char *end_char = NULL;
+    *out = strtoll(start_char, &end_char, 10);
+    return end_char != end;
+}
+
+JS2C_API bool builtin_text_to_unsigned(const char *json_string, const jsmntok_t *token, uint64_t *out) {
+    const char *start_char = json_string + token->start;
+    const char *end = json_string + token->end;
+    if (*start_char == '-') {
+        return true;
+    }
+    if (end > start_char && end - start_char <= 19) {
+        uint64_t value = 0;
+        const char *c = start_char;
+        for (; c < end && *c >= '0' && *c <= '9'; ++c) {
+            value = value * 10 + (uint64_t)(*c - '0');
+        }
+        if (c == end) {
+            *out = value;
+            return false;
+        }
+    }
+    char *end_char = NULL;
+    *out = strtoull(start_char, &end_char, 10);
+    return end_char != end;
+}
+
+JS2C_API bool builtin_text_to_double(const char *json_string, const jsmntok_t *token, double *out) {
+    const char *start_char = json_string + token->start;
+    if (token->end - token->start >= 2) {
+        if (start_char[1] != '.' && start_char[1] != 'e' && start_char[1] != 'E' &&
+            !(start_char[1] >= '0' && start_char[1] <= '9')) {
+            return true;
+        }
+    }
+    char *end_char = NULL;
+    *out = strtod(start_char, &end_char);
+    return end_char != json_string + token->end;
+}
+
+JS2C_API bool builtin_token_to_signed(const parse_state_t *parse_state, const jsmntok_t *token, int64_t *out) {
+    if (parse_state->binary_values == NULL) {
+        return builtin_text_to_signed(parse_state->json_string, token, out);
+    }
+    const js2c_binary_value_t *value = &parse_state->binary_values[token - parse_state->tokens];
+    *out = value->as.i;
+    return !(value->kind == JS2C_BINARY_NEGATIVE || (value->kind == JS2C_BINARY_UNSIGNED && value->as.u <= INT64_MAX));
+}
+
+JS2C_API bool builtin_token_to_unsigned(const parse_state_t *parse_state, const jsmntok_t *token, uint64_t *out) {
+    if (parse_state->binary_values == NULL) {
+        return builtin_text_to_unsigned(parse_state->json_string, token, out);
+    }
+    const js2c_binary_value_t *value = &parse_state->binary_values[token - parse_state->tokens];
+    *out = value->as.u;
+    return value->kind != JS2C_BINARY_UNSIGNED;
+}
+
+JS2C_API bool builtin_token_to_double(const parse_state_t *parse_state, const jsmntok_t *token, double *out) {
+    if (parse_state->binary_values == NULL) {
+        return builtin_text_to_double(parse_state->json_string, token, out);
+    }
+    const js2c_binary_value_t *value = &parse_state->binary_values[token - parse_state->tokens];
+    switch (value->kind) {
+    case JS2C_BINARY_DOUBLE:
+        *out = value->as.d;
+        return false;
+    case JS2C_BINARY_UNSIGNED:
+        *out = (double)value->as.u;
+        return false;
+    case JS2C_BINARY_NEGATIVE:
+        *out = (double)value->as.i;
+        return false;
+    default:
+        return true;
+    }
+}
+
+/* strtoll/strtoull of a string token. Strings of binary input are not followed by a quote, so they are copied. */
+JS2C_API const char *builtin_numeric_string(const parse_state_t *parse_state, const jsmntok_t *token, char *buffer, size_t buffer_size) {
+    const int length = token->end - token->start;
+    if (parse_state->binary_values == NULL) {
+        return parse_state->json_string + token->start;
+    }
+    if ((size_t)length >= buffer_size) {
+        return NULL;
+    }
+    memcpy(buffer, parse_state->json_string + token->start, length);
+    buffer[length] = 0;
+    return buffer;
+}
+
+JS2C_API bool builtin_parse_bool(parse_state_t *parse_state, bool *out) {
     if (check_type(parse_state, JSMN_PRIMITIVE)) {
         return true;
     }
-    const jsmntok_t *token = &parse_state->tokens[parse_state->current_token];
-    const char first_char = parse_state->json_string[token->start];
-    if (first_char != 't' && first_char != 'f') {
-        LOG_ERROR(token->start, "Invalid boolean literal in '%s': %.*s", parse_state->current_key, CURRENT_STRING_FOR_ERROR(parse_state));
+    if (builtin_token_to_bool(parse_state, &CURRENT_TOKEN(parse_state), out)) {
+        LOG_ERROR(CURRENT_TOKEN(parse_state).start, "Invalid boolean literal in '%s': %.*s", parse_state->current_key, CURRENT_STRING_FOR_ERROR(parse_state));
         return true;
     }
-    *out = first_char == 't';
     parse_state->current_token += 1;
     return false;
 }
 
-static inline bool builtin_parse_signed(
+JS2C_API bool builtin_parse_signed(
     parse_state_t *parse_state,
     bool number_allowed,
     bool string_allowed,
@@ -165,12 +565,20 @@ static inline bool builtin_parse_signed(
         LOG_ERROR(token->start, "Unexpected token in '%s': %s", parse_state->current_key, token_type_as_string(token->type))
         return true;
     }
+    bool invalid = false;
     if (token->type == JSMN_PRIMITIVE) {
-        radix = 10;
+        invalid = builtin_token_to_signed(parse_state, token, out);
+    } else {
+        char buffer[72];
+        const char *start_char = builtin_numeric_string(parse_state, token, buffer, sizeof(buffer));
+        char *end_char = NULL;
+        invalid = start_char == NULL;
+        if (!invalid) {
+            *out = strtoll(start_char, &end_char, radix);
+            invalid = end_char != start_char + (token->end - token->start);
+        }
     }
-    char *end_char = NULL;
-    *out = strtoll(parse_state->json_string + token->start, &end_char, radix);
-    if (end_char != parse_state->json_string + token->end) {
+    if (invalid) {
         LOG_ERROR(token->start, "Invalid signed integer literal in '%s': %.*s", parse_state->current_key, CURRENT_STRING_FOR_ERROR(parse_state));
         return true;
     }
@@ -178,7 +586,7 @@ static inline bool builtin_parse_signed(
     return false;
 }
 
-static inline bool builtin_parse_unsigned(
+JS2C_API bool builtin_parse_unsigned(
     parse_state_t *parse_state,
     bool number_allowed,
     bool string_allowed,
@@ -190,17 +598,20 @@ static inline bool builtin_parse_unsigned(
         LOG_ERROR(token->start, "Unexpected token in '%s': %s", parse_state->current_key, token_type_as_string(token->type))
         return true;
     }
+    bool invalid = false;
     if (token->type == JSMN_PRIMITIVE) {
-        radix = 10;
-    }
-    const char *start_char = parse_state->json_string + token->start;
-    char *end_char = NULL;
-    if (*start_char == '-') {
-        LOG_ERROR(token->start, "Invalid unsigned integer literal in '%s': %.*s", parse_state->current_key, CURRENT_STRING_FOR_ERROR(parse_state));
-        return true;
+        invalid = builtin_token_to_unsigned(parse_state, token, out);
+    } else {
+        char buffer[72];
+        const char *start_char = builtin_numeric_string(parse_state, token, buffer, sizeof(buffer));
+        char *end_char = NULL;
+        invalid = start_char == NULL || *start_char == '-';
+        if (!invalid) {
+            *out = strtoull(start_char, &end_char, radix);
+            invalid = end_char != start_char + (token->end - token->start);
+        }
     }
-    *out = strtoull(start_char, &end_char, radix);
-    if (end_char != parse_state->json_string + token->end) {
+    if (invalid) {
         LOG_ERROR(token->start, "Invalid unsigned integer literal in '%s': %.*s", parse_state->current_key, CURRENT_STRING_FOR_ERROR(parse_state));
         return true;
     }
@@ -208,22 +619,12 @@ static inline bool builtin_parse_unsigned(
     return false;
 }
 
-static inline bool builtin_parse_double(parse_state_t *parse_state, double *out) {
+JS2C_API bool builtin_parse_double(parse_state_t *parse_state, double *out) {
     const jsmntok_t *token = &parse_state->tokens[parse_state->current_token];
     if (check_type(parse_state, JSMN_PRIMITIVE)) {
         return true;
     }
-    const char *start_char = parse_state->json_string + token->start;
-    if (token->end - token->start >= 2) {
-        if (start_char[1] != '.' && start_char[1] != 'e' && start_char[1] != 'E' &&
-            !(start_char[1] >= '0' && start_char[1] <= '9')) {
-            LOG_ERROR(token->start, "Invalid floating point literal in '%s': %.*s", parse_state->current_key, CURRENT_STRING_FOR_ERROR(parse_state));
-            return true;
-        }
-    }
-    char *end_char = NULL;
-    *out = strtod(start_char, &end_char);
-    if (end_char != parse_state->json_string + token->end) {
+    if (builtin_token_to_double(parse_state, token, out)) {
         LOG_ERROR(token->start, "Invalid floating point literal in '%s': %.*s", parse_state->current_key, CURRENT_STRING_FOR_ERROR(parse_state));
         return true;
     }
@@ -231,7 +632,7 @@ static inline bool builtin_parse_double(parse_state_t *parse_state, double *out)
     return false;
 }
 
-static inline bool builtin_skip(parse_state_t *parse_state) {
+JS2C_API bool builtin_skip(parse_state_t *parse_state) {
     /* The algorithm works, because of how .size behaves on JSMN tokens:
      *   - Arrays have size = number of elements
      *   - Objects have size = number of fields
@@ -254,22 +655,85 @@ static inline bool builtin_skip(parse_state_t *parse_state) {
     return false;
 }
 
-static inline bool builtin_parse_json_string(
+/* Allocate a node of a recursive type from the node pool, and skip its tokens. It is only parsed by
+ * builtin_parse_deferred, after its parent. Returns NULL on errors. */
+JS2C_API void *builtin_defer_parse(
+    parse_state_t *parse_state,
+    size_t size,
+    size_t alignment,
+    bool (*parse)(parse_state_t *parse_state, void *out)
+) {
+    js2c_recursion_t *recursion = parse_state->recursion;
+    if (recursion->depth >= recursion->max_depth) {
+        LOG_ERROR(CURRENT_TOKEN(parse_state).start, "Too deep nesting in '%s'. Maximum depth: %llu.", parse_state->current_key, (unsigned long long)recursion->max_depth);
+        return NULL;
+    }
+    if (recursion->node_num >= recursion->max_node_num) {
+        LOG_ERROR(CURRENT_TOKEN(parse_state).start, "Too many nodes in '%s'. Maximum: %llu.", parse_state->current_key, (unsigned long long)recursion->max_node_num);
+        return NULL;
+    }
+    const uintptr_t start = ((uintptr_t)(recursion->pool + recursion->pool_used) + alignment - 1) & ~(uintptr_t)(alignment - 1);
+    const size_t end = start - (uintptr_t)recursion->pool + size;
+    if (end > recursion->pool_size) {
+        LOG_ERROR(CURRENT_TOKEN(parse_state).start, "Node pool is full in '%s'. Pool size: %llu.", parse_state->current_key, (unsigned long long)recursion->pool_size);
+        return NULL;
+    }
+    recursion->pool_used = end;
+    recursion->node_num += 1;
+
+    js2c_deferred_parse_t *deferred = &recursion->deferred[recursion->deferred_num];
+    recursion->deferred_num += 1;
+    deferred->parse = parse;
+    deferred->out = (void *)start;
+    deferred->token = parse_state->current_token;
+    deferred->key = parse_state->current_key;
+    deferred->depth = recursion->depth + 1;
+    if (builtin_skip(parse_state)) {
+        return NULL;
+    }
+    return deferred->out;
+}
+
+/* Parse the nodes deferred by builtin_defer_parse, and the nodes deferred while parsing them */
+JS2C_API bool builtin_parse_deferred(parse_state_t *parse_state) {
+    js2c_recursion_t *recursion = parse_state->recursion;
+    while (recursion->deferred_num > 0) {
+        recursion->deferred_num -= 1;
+        const js2c_deferred_parse_t deferred = recursion->deferred[recursion->deferred_num];
+        parse_state->current_token = deferred.token;
+        parse_state->current_key = deferred.key;
+        recursion->depth = deferred.depth;
+        if (deferred.parse(parse_state, deferred.out)) {
+            return true;
+        }
+    }
+    return false;
+}
+
+JS2C_API bool builtin_parse_json(
     parse_state_t *parse_state,
     jsmntok_t *token_buffer,
     uint64_t token_buffer_size,
-    const char *json_string
+    const char *json_string,
+    size_t json_length
 ) {
     jsmn_parser parser = {0};
 
     parse_state->json_string = json_string;
     parse_state->tokens = token_buffer;
+    parse_state->binary_values = NULL;
     parse_state->current_token = 0;
     parse_state->max_token_num = token_buffer_size;
     parse_state->current_key = "document root";
 
     jsmn_init(&parser);
-    int token_num = jsmn_parse(&parser, json_string, strlen(json_string), parse_state->tokens, token_buffer_size);
+    int token_num = jsmn_parse(&parser, json_string, json_length, parse_state->tokens, token_buffer_size);
+#ifdef JS2C_STATS
+    parse_state->stats_byte_num = json_length;
+    parse_state->stats_token_num = token_num < 0 ? 0 : token_num;
+    parse_state->stats_tokenized_ns = builtin_stats_now_ns();
+    parse_state->stats_syntax_error = token_num < 0;
+#endif
     if (token_num < 0) {
         LOG_ERROR(parser.pos, "JSON syntax error: %s", jsmn_error_as_string(token_num));
         return true;
@@ -277,4 +741,897 @@ static inline bool builtin_parse_json_string(
     return false;
 }
 
+JS2C_API bool builtin_parse_json_string(
+    parse_state_t *parse_state,
+    jsmntok_t *token_buffer,
+    uint64_t token_buffer_size,
+    const char *json_string
+) {
+    return builtin_parse_json(parse_state, token_buffer, token_buffer_size, json_string, strlen(json_string));
+}
+
+/* The current token is a JSON null. Used by JSON merge patches, where null removes a field. */
+JS2C_API bool builtin_is_null(const parse_state_t *parse_state) {
+    return CURRENT_TOKEN(parse_state).type == JSMN_PRIMITIVE && CURRENT_STRING(parse_state)[0] == 'n';
+}
+
+/* ===================== Binary input (CBOR, MessagePack) ===================== */
+
+/* Binary input is converted to the same token stream as JSON, so the generated parsers work on it unchanged.
+ * Strings point into the input, the values of numbers and literals are stored in binary_values. */
+
+#ifndef JS2C_BINARY_MAX_DEPTH
+#define JS2C_BINARY_MAX_DEPTH 64
+#endif
+
+typedef struct js2c_binary_item_s {
+    jsmntype_t type;
+    uint64_t length;     /* Bytes of strings, items of arrays, key-value pairs of maps */
+    size_t start;        /* Position of string data, or of the item header */
+    js2c_binary_value_t value;
+} js2c_binary_item_t;
+
+/* Read the header of the next item at *pos. Return true on invalid or unsupported data. */
+typedef bool (*js2c_read_binary_item_t)(const uint8_t *data, size_t size, size_t *pos, js2c_binary_item_t *item);
+
+JS2C_API bool builtin_read_big_endian(const uint8_t *data, size_t size, size_t *pos, unsigned bytes, uint64_t *out) {
+    if (bytes > size - *pos) {
+        return true;
+    }
+    *out = 0;
+    for (unsigned i = 0; i < bytes; ++i) {
+        *out = (*out << 8) | data[*pos + i];
+    }
+    *pos += bytes;
+    return false;
+}
+
+JS2C_API double builtin_float_from_bits(uint64_t bits, unsigned bytes) {
+    if (bytes == 8) {
+        double value;
+        memcpy(&value, &bits, sizeof(value));
+        return value;
+    }
+    if (bytes == 4) {
+        const uint32_t bits32 = (uint32_t)bits;
+        float value;
+        memcpy(&value, &bits32, sizeof(value));
+        return value;
+    }
+    /* IEEE 754 half precision, converted to single precision */
+    const uint32_t sign = (uint32_t)(bits & 0x8000) << 16;
+    const uint32_t exponent = (bits >> 10) & 0x1f;
+    const uint32_t mantissa = bits & 0x3ff;
+    if (exponent == 0) {
+        const double value = mantissa / 16777216.0;
+        return sign ? -value : value;
+    }
+    return builtin_float_from_bits(sign | ((exponent == 31 ? 0xff : exponent + 112) << 23) | (mantissa << 13), 4);
+}
+
+JS2C_API void builtin_set_binary_integer(js2c_binary_item_t *item, bool negative, uint64_t value) {
+    item->type = JSMN_PRIMITIVE;
+    item->value.kind = negative ? JS2C_BINARY_NEGATIVE : JS2C_BINARY_UNSIGNED;
+    item->value.as.u = value;
+}
+
+JS2C_API bool builtin_read_cbor_item(const uint8_t *data, size_t size, size_t *pos, js2c_binary_item_t *item) {
+    uint8_t major;
+    uint64_t argument;
+    do {
+        if (*pos >= size) {
+            return true;
+        }
+        item->start = *pos;
+        major = data[*pos] >> 5;
+        const uint8_t info = data[*pos] & 0x1f;
+        *pos += 1;
+        if (major == 7) {
+            item->type = JSMN_PRIMITIVE;
+            switch (info) {
+            case 20:
+                item->value.kind = JS2C_BINARY_FALSE;
+                return false;
+            case 21:
+                item->value.kind = JS2C_BINARY_TRUE;
+                return false;
+            case 22:
+            case 23:
+                item->value.kind = JS2C_BINARY_NULL;
+                return false;
+            case 25:
+            case 26:
+            case 27:
+                if (builtin_read_big_endian(data, size, pos, 1 << (info - 24), &argument)) {
+                    return true;
+                }
+                item->value.kind = JS2C_BINARY_DOUBLE;
+                item->value.as.d = builtin_float_from_bits(argument, 1 << (info - 24));
+                return false;
+            default:
+                return true;
+            }
+        }
+        if (info < 24) {
+            argument = info;
+        } else if (info < 28) {
+            if (builtin_read_big_endian(data, size, pos, 1 << (info - 24), &argument)) {
+                return true;
+            }
+        } else {
+            /* Indefinite lengths are not supported */
+            return true;
+        }
+        /* Semantic tags (major type 6) are skipped, the tagged item is used as-is */
+    } while (major == 6);
+
+    switch (major) {
+    case 0:
+        builtin_set_binary_integer(item, false, argument);
+        return false;
+    case 1:
+        if (argument > INT64_MAX) {
+            return true;
+        }
+        builtin_set_binary_integer(item, true, (uint64_t)(-1 - (int64_t)argument));
+        return false;
+    case 3:
+        if (argument > size - *pos) {
+            return true;
+        }
+        item->type = JSMN_STRING;
+        item->start = *pos;
+        item->length = argument;
+        *pos += argument;
+        return false;
+    case 4:
+    case 5:
+        item->type = major == 4 ? JSMN_ARRAY : JSMN_OBJECT;
+        item->length = argument;
+        return false;
+    default:
+        /* Byte strings have no JSON equivalent */
+        return true;
+    }
+}
+
+JS2C_API bool builtin_read_msgpack_item(const uint8_t *data, size_t size, size_t *pos, js2c_binary_item_t *item) {
+    if (*pos >= size) {
+        return true;
+    }
+    item->start = *pos;
+    const uint8_t header = data[*pos];
+    *pos += 1;
+    uint64_t argument = 0;
+    if (header <= 0x7f) {
+        builtin_set_binary_integer(item, false, header);
+        return false;
+    }
+    if (header >= 0xe0) {
+        builtin_set_binary_integer(item, true, (uint64_t)(int64_t)(int8_t)header);
+        return false;
+    }
+    if (header >= 0x80 && header <= 0x9f) {
+        item->type = header <= 0x8f ? JSMN_OBJECT : JSMN_ARRAY;
+        item->length = header & 0x0f;
+        return false;
+    }
+    if (header >= 0xa0 && header <= 0xbf) {
+        argument = header & 0x1f;
+    }
+    switch (header) {
+    case 0xc0:
+        item->type = JSMN_PRIMITIVE;
+        item->value.kind = JS2C_BINARY_NULL;
+        return false;
+    case 0xc2:
+    case 0xc3:
+        item->type = JSMN_PRIMITIVE;
+        item->value.kind = header == 0xc3 ? JS2C_BINARY_TRUE : JS2C_BINARY_FALSE;
+        return false;
+    case 0xca:
+    case 0xcb:
+        if (builtin_read_big_endian(data, size, pos, header == 0xca ? 4 : 8, &argument)) {
+            return true;
+        }
+        item->type = JSMN_PRIMITIVE;
+        item->value.kind = JS2C_BINARY_DOUBLE;
+        item->value.as.d = builtin_float_from_bits(argument, header == 0xca ? 4 : 8);
+        return false;
+    case 0xcc:
+    case 0xcd:
+    case 0xce:
+    case 0xcf:
+        if (builtin_read_big_endian(data, size, pos, 1 << (header - 0xcc), &argument)) {
+            return true;
+        }
+        builtin_set_binary_integer(item, false, argument);
+        return false;
+    case 0xd0:
+    case 0xd1:
+    case 0xd2:
+    case 0xd3: {
+        const unsigned bytes = 1 << (header - 0xd0);
+        if (builtin_read_big_endian(data, size, pos, bytes, &argument)) {
+            return true;
+        }
+        /* Sign extension */
+        const unsigned shift = 64 - 8 * bytes;
+        const int64_t value = (int64_t)(argument << shift) >> shift;
+        builtin_set_binary_integer(item, value < 0, (uint64_t)value);
+        return false;
+    }
+    case 0xd9:
+    case 0xda:
+    case 0xdb:
+        if (builtin_read_big_endian(data, size, pos, 1 << (header - 0xd9), &argument)) {
+            return true;
+        }
+        break;
+    case 0xdc:
+    case 0xdd:
+    case 0xde:
+    case 0xdf:
+        item->type = header <= 0xdd ? JSMN_ARRAY : JSMN_OBJECT;
+        return builtin_read_big_endian(data, size, pos, (header & 1) ? 4 : 2, &item->length);
+    default:
+        if (header < 0xa0 || header > 0xbf) {
+            /* Binary and extension types have no JSON equivalent */
+            return true;
+        }
+        break;
+    }
+    /* Strings */
+    if (argument > size - *pos) {
+        return true;
+    }
+    item->type = JSMN_STRING;
+    item->start = *pos;
+    item->length = argument;
+    *pos += argument;
+    return false;
+}
+
+JS2C_API bool builtin_parse_binary(
+    parse_state_t *parse_state,
+    jsmntok_t *token_buffer,
+    js2c_binary_value_t *value_buffer,
+    uint64_t token_buffer_size,
+    const uint8_t *data,
+    size_t size,
+    js2c_read_binary_item_t read_item,
+    const char *format_name
+) {
+    parse_state->json_string = (const char *)data;
+    parse_state->tokens = token_buffer;
+    parse_state->binary_values = value_buffer;
+    parse_state->current_token = 0;
+    parse_state->max_token_num = token_buffer_size;
+    /* Syntax errors are reported in the name of the format, until the tokens are ready to be parsed */
+    parse_state->current_key = format_name;
+
+    /* Number of items still to be read in every open container. Every other item of a map is a key. */
+    uint64_t remaining[JS2C_BINARY_MAX_DEPTH];
+    bool is_map[JS2C_BINARY_MAX_DEPTH];
+    int depth = 0;
+    size_t pos = 0;
+    uint64_t token_num = 0;
+    bool error = size > INT32_MAX;
+    while (!error) {
+        const bool is_key = depth > 0 && is_map[depth - 1] && remaining[depth - 1] % 2 == 0;
+        js2c_binary_item_t item = {0};
+        if (read_item(data, size, &pos, &item)) {
+            LOG_ERROR(pos, "%s syntax error: invalid or unsupported item", parse_state->current_key);
+            error = true;
+            break;
+        }
+        if (is_key && item.type != JSMN_STRING) {
+            LOG_ERROR(item.start, "%s syntax error: map keys must be strings", parse_state->current_key);
+            error = true;
+            break;
+        }
+        if (token_num >= token_buffer_size || (item.type != JSMN_STRING && item.length > token_buffer_size)) {
+            LOG_ERROR(item.start, "%s syntax error: %s", parse_state->current_key, jsmn_error_as_string(JSMN_ERROR_NOMEM));
+            error = true;
+            break;
+        }
+        jsmntok_t *token = &token_buffer[token_num];
+        token->type = item.type;
+        token->start = item.start;
+        token->end = item.start + (item.type == JSMN_STRING ? item.length : 0);
+        token->size = 0;
+        if (is_key) {
+            token->size = 1;
+        } else if (item.type == JSMN_ARRAY || item.type == JSMN_OBJECT) {
+            token->size = item.length;
+        }
+        value_buffer[token_num] = item.value;
+        token_num += 1;
+
+        if (depth > 0) {
+            remaining[depth - 1] -= 1;
+        }
+        if ((item.type == JSMN_ARRAY || item.type == JSMN_OBJECT) && item.length > 0) {
+            if (depth == JS2C_BINARY_MAX_DEPTH) {
+                LOG_ERROR(item.start, "%s syntax error: nesting deeper than %d", parse_state->current_key, JS2C_BINARY_MAX_DEPTH);
+                error = true;
+                break;
+            }
+            remaining[depth] = item.type == JSMN_OBJECT ? item.length * 2 : item.length;
+            is_map[depth] = item.type == JSMN_OBJECT;
+            depth += 1;
+        }
+        while (depth > 0 && remaining[depth - 1] == 0) {
+            depth -= 1;
+        }
+        if (depth == 0) {
+            break;
+        }
+    }
+    if (!error && pos != size) {
+        LOG_ERROR(pos, "%s syntax error: trailing data", parse_state->current_key);
+        error = true;
+    }
+    parse_state->current_key = "document root";
+#ifdef JS2C_STATS
+    parse_state->stats_byte_num = size;
+    parse_state->stats_token_num = error ? 0 : token_num;
+    parse_state->stats_tokenized_ns = builtin_stats_now_ns();
+    parse_state->stats_syntax_error = error;
+#endif
+    return error;
+}
+
+JS2C_API bool builtin_parse_cbor(
+    parse_state_t *parse_state,
+    jsmntok_t *token_buffer,
+    js2c_binary_value_t *value_buffer,
+    uint64_t token_buffer_size,
+    const uint8_t *data,
+    size_t size
+) {
+    return builtin_parse_binary(
+        parse_state, token_buffer, value_buffer, token_buffer_size, data, size, builtin_read_cbor_item, "CBOR"
+    );
+}
+
+JS2C_API bool builtin_parse_msgpack(
+    parse_state_t *parse_state,
+    jsmntok_t *token_buffer,
+    js2c_binary_value_t *value_buffer,
+    uint64_t token_buffer_size,
+    const uint8_t *data,
+    size_t size
+) {
+    return builtin_parse_binary(
+        parse_state, token_buffer, value_buffer, token_buffer_size, data, size, builtin_read_msgpack_item, "MessagePack"
+    );
+}
+
+/* ===================== Binary wire format (<name>_encode, <name>_decode) ===================== */
+
+/* Records are written field by field in schema order, without keys. A header with the format version and a
+ * fingerprint of the schema layout is written first, so records of a different schema are rejected.
+ * Unsigned integers, lengths and enum values are LEB128 varints, signed integers are zigzag varints, doubles are
+ * 8 little endian bytes, bools are a single byte, strings are a length followed by the characters, arrays are
+ * a length followed by the items. */
+
+#define JS2C_WIRE_FORMAT_VERSION 1
+#define JS2C_WIRE_HEADER_SIZE 8
+/* The largest encoded size of any varint */
+#define JS2C_VARINT_MAX_SIZE 10
+
+typedef struct js2c_encoder_s {
+    uint8_t *data;
+    size_t size;
+    size_t position;
+} js2c_encoder_t;
+
+typedef struct js2c_decoder_s {
+    const uint8_t *data;
+    size_t size;
+    size_t position;
+} js2c_decoder_t;
+
+JS2C_API bool builtin_encode_bytes(js2c_encoder_t *encoder, const void *bytes, size_t length) {
+    if (length > encoder->size - encoder->position) {
+        return true;
+    }
+    memcpy(encoder->data + encoder->position, bytes, length);
+    encoder->position += length;
+    return false;
+}
+
+JS2C_API bool builtin_encode_unsigned(js2c_encoder_t *encoder, uint64_t value) {
+    uint8_t bytes[JS2C_VARINT_MAX_SIZE];
+    size_t length = 0;
+    do {
+        bytes[length] = (value & 0x7f) | (value > 0x7f ? 0x80 : 0);
+        value >>= 7;
+        length += 1;
+    } while (value);
+    return builtin_encode_bytes(encoder, bytes, length);
+}
+
+JS2C_API bool builtin_encode_signed(js2c_encoder_t *encoder, int64_t value) {
+    return builtin_encode_unsigned(encoder, ((uint64_t)value << 1) ^ (value < 0 ? UINT64_MAX : 0));
+}
+
+JS2C_API bool builtin_encode_double(js2c_encoder_t *encoder, double value) {
+    uint64_t bits;
+    memcpy(&bits, &value, sizeof(bits));
+    uint8_t bytes[8];
+    for (unsigned i = 0; i < 8; ++i) {
+        bytes[i] = bits >> (8 * i);
+    }
+    return builtin_encode_bytes(encoder, bytes, sizeof(bytes));
+}
+
+JS2C_API bool builtin_encode_bool(js2c_encoder_t *encoder, bool value) {
+    const uint8_t byte = value;
+    return builtin_encode_bytes(encoder, &byte, 1);
+}
+
+JS2C_API bool builtin_encode_string(js2c_encoder_t *encoder, const char *value) {
+    const size_t length = strlen(value);
+    return builtin_encode_unsigned(encoder, length) || builtin_encode_bytes(encoder, value, length);
+}
+
+JS2C_API bool builtin_encode_header(js2c_encoder_t *encoder, uint32_t fingerprint) {
+    const uint8_t header[JS2C_WIRE_HEADER_SIZE] = {
+        'j', '2', 'c', JS2C_WIRE_FORMAT_VERSION,
+        fingerprint, fingerprint >> 8, fingerprint >> 16, fingerprint >> 24,
+    };
+    return builtin_encode_bytes(encoder, header, sizeof(header));
+}
+
+JS2C_API bool builtin_decode_bytes(js2c_decoder_t *decoder, void *bytes, size_t length) {
+    if (length > decoder->size - decoder->position) {
+        LOG_ERROR(decoder->position, "Truncated binary record: %llu more bytes expected", (unsigned long long)length);
+        return true;
+    }
+    memcpy(bytes, decoder->data + decoder->position, length);
+    decoder->position += length;
+    return false;
+}
+
+JS2C_API bool builtin_decode_unsigned(js2c_decoder_t *decoder, uint64_t *out) {
+    *out = 0;
+    for (unsigned shift = 0; shift < 64; shift += 7) {
+        uint8_t byte;
+        if (builtin_decode_bytes(decoder, &byte, 1)) {
+            return true;
+        }
+        *out |= (uint64_t)(byte & 0x7f) << shift;
+        if (!(byte & 0x80)) {
+            return false;
+        }
+    }
+    LOG_ERROR(decoder->position, "Invalid varint in binary record");
+    return true;
+}
+
+JS2C_API bool builtin_decode_signed(js2c_decoder_t *decoder, int64_t *out) {
+    uint64_t zigzag;
+    if (builtin_decode_unsigned(decoder, &zigzag)) {
+        return true;
+    }
+    *out = (int64_t)(zigzag >> 1) ^ -(int64_t)(zigzag & 1);
+    return false;
+}
+
+JS2C_API bool builtin_decode_double(js2c_decoder_t *decoder, double *out) {
+    uint8_t bytes[8];
+    if (builtin_decode_bytes(decoder, bytes, sizeof(bytes))) {
+        return true;
+    }
+    uint64_t bits = 0;
+    for (unsigned i = 0; i < 8; ++i) {
+        bits |= (uint64_t)bytes[i] << (8 * i);
+    }
+    memcpy(out, &bits, sizeof(*out));
+    return false;
+}
+
+JS2C_API bool builtin_decode_bool(js2c_decoder_t *decoder, bool *out) {
+    uint8_t byte;
+    if (builtin_decode_bytes(decoder, &byte, 1)) {
+        return true;
+    }
+    if (byte > 1) {
+        LOG_ERROR(decoder->position - 1, "Invalid bool in binary record: %u", byte);
+        return true;
+    }
+    *out = byte;
+    return false;
+}
+
+JS2C_API bool builtin_decode_length(js2c_decoder_t *decoder, uint64_t min_length, uint64_t max_length, uint64_t *out) {
+    if (builtin_decode_unsigned(decoder, out)) {
+        return true;
+    }
+    if (*out < min_length || *out > max_length) {
+        LOG_ERROR(
+            decoder->position, "Invalid length in binary record: %llu, must be between %llu and %llu",
+            (unsigned long long)*out, (unsigned long long)min_length, (unsigned long long)max_length
+        );
+        return true;
+    }
+    return false;
+}
+
+JS2C_API bool builtin_decode_string(js2c_decoder_t *decoder, char *out, uint64_t min_length, uint64_t max_length) {
+    uint64_t length;
+    if (builtin_decode_length(decoder, min_length, max_length, &length) || builtin_decode_bytes(decoder, out, length)) {
+        return true;
+    }
+    if (memchr(out, 0, length)) {
+        LOG_ERROR(decoder->position, "Invalid string in binary record: contains NUL");
+        return true;
+    }
+    out[length] = 0;
+    return false;
+}
+
+JS2C_API bool builtin_decode_pooled_string(
+    js2c_decoder_t *decoder,
+    char *pool,
+    uint64_t pool_size,
+    uint64_t *pool_used,
+    uint64_t min_length,
+    uint64_t max_length
+) {
+    if (*pool_used >= pool_size) {
+        LOG_ERROR(decoder->position, "String pool full in binary record. Pool size: %llu.", (unsigned long long)pool_size);
+        return true;
+    }
+    const uint64_t pool_free = pool_size - *pool_used - 1;
+    if (builtin_decode_string(decoder, pool + *pool_used, min_length, max_length < pool_free ? max_length : pool_free)) {
+        return true;
+    }
+    *pool_used += strlen(pool + *pool_used) + 1;
+    return false;
+}
+
+JS2C_API bool builtin_decode_header(js2c_decoder_t *decoder, uint32_t fingerprint) {
+    uint8_t header[JS2C_WIRE_HEADER_SIZE];
+    if (builtin_decode_bytes(decoder, header, sizeof(header))) {
+        return true;
+    }
+    if (header[0] != 'j' || header[1] != '2' || header[2] != 'c' || header[3] != JS2C_WIRE_FORMAT_VERSION) {
+        LOG_ERROR(0, "Not a binary record of wire format version %d", JS2C_WIRE_FORMAT_VERSION);
+        return true;
+    }
+    const uint32_t record_fingerprint = header[4] | header[5] << 8 | header[6] << 16 | (uint32_t)header[7] << 24;
+    if (record_fingerprint != fingerprint) {
+        LOG_ERROR(4, "Binary record of a different schema: fingerprint %08lx, expected %08lx",
+                  (unsigned long)record_fingerprint, (unsigned long)fingerprint);
+        return true;
+    }
+    return false;
+}
+
+/* ===================== Table-driven parser interpreter ===================== */
+
+typedef enum js2c_kind_e {
+    JS2C_KIND_OBJECT,
+    JS2C_KIND_ARRAY,
+    JS2C_KIND_SIGNED,
+    JS2C_KIND_UNSIGNED,
+    JS2C_KIND_DOUBLE,
+    JS2C_KIND_BOOL,
+    JS2C_KIND_STRING,
+    JS2C_KIND_ENUM,
+    JS2C_KIND_CUSTOM
+} js2c_kind_t;
+
+typedef struct js2c_range_check_s {
+    const char *op;   /* One of ">=", "<=", ">", "<" */
+    const char *text; /* The limit as written in the schema, used in error messages */
+    int64_t signed_limit;
+    uint64_t unsigned_limit;
+    double double_limit;
+} js2c_range_check_t;
+
+typedef struct js2c_type_desc_s js2c_type_desc_t;
+
+typedef struct js2c_field_desc_s {
+    const char *name;
+    uint32_t name_length;
+    uint32_t offset;
+    const js2c_type_desc_t *type;
+    /* NULL for required fields */
+    bool (*set_default)(parse_state_t *parse_state, void *out);
+    /* Index in the field hit counters, see JS2C_STATS */
+    uint32_t stats_index;
+} js2c_field_desc_t;
+
+struct js2c_type_desc_s {
+    js2c_kind_t kind;
+    uint32_t size;
+    /* Objects */
+    const js2c_field_desc_t *fields;
+    uint32_t field_count;
+    bool allow_additional_properties;
+    /* Arrays */
+    const js2c_type_desc_t *item;
+    uint32_t items_offset;
+    int min_items;
+    int max_items;
+    /* Integers and floating point values */
+    const js2c_range_check_t *checks;
+    uint32_t check_count;
+    bool number_allowed;
+    bool string_allowed;
+    int radix;
+    /* Strings */
+    int min_length;
+    int max_length;
+    /* Enums */
+    const char *const *labels;
+    uint32_t label_count;
+    /* Everything that is parsed by a generated function */
+    bool (*parse)(parse_state_t *parse_state, void *out);
+};
+
+JS2C_API bool builtin_table_parse(parse_state_t *parse_state, const js2c_type_desc_t *desc, void *out);
+
+JS2C_API bool builtin_table_check_passes(const char *op, int comparison) {
+    if (op[0] == '>') {
+        return op[1] == '=' ? comparison >= 0 : comparison > 0;
+    }
+    return op[1] == '=' ? comparison <= 0 : comparison < 0;
+}
+
+JS2C_API void builtin_table_store_signed(void *out, uint32_t size, int64_t value) {
+    switch (size) {
+    case 1:
+        *(int8_t *)out = (int8_t)value;
+        break;
+    case 2:
+        *(int16_t *)out = (int16_t)value;
+        break;
+    case 4:
+        *(int32_t *)out = (int32_t)value;
+        break;
+    default:
+        *(int64_t *)out = value;
+        break;
+    }
+}
+
+JS2C_API void builtin_table_store_unsigned(void *out, uint32_t size, uint64_t value) {
+    switch (size) {
+    case 1:
+        *(uint8_t *)out = (uint8_t)value;
+        break;
+    case 2:
+        *(uint16_t *)out = (uint16_t)value;
+        break;
+    case 4:
+        *(uint32_t *)out = (uint32_t)value;
+        break;
+    default:
+        *(uint64_t *)out = value;
+        break;
+    }
+}
+
+JS2C_API bool builtin_table_parse_signed(parse_state_t *parse_state, const js2c_type_desc_t *desc, void *out) {
+    int64_t value;
+    if (builtin_parse_signed(parse_state, desc->number_allowed, desc->string_allowed, desc->radix, &value)) {
+        return true;
+    }
+    for (uint32_t i = 0; i < desc->check_count; ++i) {
+        const js2c_range_check_t *check = &desc->checks[i];
+        const int comparison = (value > check->signed_limit) - (value < check->signed_limit);
+        if (!builtin_table_check_passes(check->op, comparison)) {
+            /* Roll back the token, as the value was not actually correct */
+            parse_state->current_token -= 1;
+            LOG_ERROR(
+                CURRENT_TOKEN(parse_state).start,
+                "Integer %li in '%s' out of range. It must be %s %s.",
+                value,
+                parse_state->current_key,
+                check->op,
+                check->text)
+            return true;
+        }
+    }
+    builtin_table_store_signed(out, desc->size, value);
+    return false;
+}
+
+JS2C_API bool builtin_table_parse_unsigned(parse_state_t *parse_state, const js2c_type_desc_t *desc, void *out) {
+    uint64_t value;
+    if (builtin_parse_unsigned(parse_state, desc->number_allowed, desc->string_allowed, desc->radix, &value)) {
+        return true;
+    }
+    for (uint32_t i = 0; i < desc->check_count; ++i) {
+        const js2c_range_check_t *check = &desc->checks[i];
+        const int comparison = (value > check->unsigned_limit) - (value < check->unsigned_limit);
+        if (!builtin_table_check_passes(check->op, comparison)) {
+            /* Roll back the token, as the value was not actually correct */
+            parse_state->current_token -= 1;
+            LOG_ERROR(
+                CURRENT_TOKEN(parse_state).start,
+                "Integer %lu in '%s' out of range. It must be %s %s.",
+                value,
+                parse_state->current_key,
+                check->op,
+                check->text)
+            return true;
+        }
+    }
+    builtin_table_store_unsigned(out, desc->size, value);
+    return false;
+}
+
+JS2C_API bool builtin_table_parse_double(parse_state_t *parse_state, const js2c_type_desc_t *desc, double *out) {
+    if (builtin_parse_double(parse_state, out)) {
+        return true;
+    }
+    for (uint32_t i = 0; i < desc->check_count; ++i) {
+        const js2c_range_check_t *check = &desc->checks[i];
+        const int comparison = (*out > check->double_limit) - (*out < check->double_limit);
+        if (!builtin_table_check_passes(check->op, comparison)) {
+            /* Roll back the token, as the value was not actually correct */
+            parse_state->current_token -= 1;
+            LOG_ERROR(
+                CURRENT_TOKEN(parse_state).start,
+                "Floating point value %.15g in '%s' out of range. It must be %s %s.",
+                *out,
+                parse_state->current_key,
+                check->op,
+                check->text)
+            return true;
+        }
+    }
+    return false;
+}
+
+JS2C_API bool builtin_table_parse_enum(parse_state_t *parse_state, const js2c_type_desc_t *desc, void *out) {
+    if (check_type(parse_state, JSMN_STRING)) {
+        return true;
+    }
+    for (uint32_t i = 0; i < desc->label_count; ++i) {
+        if (current_string_is(parse_state, desc->labels[i])) {
+            builtin_table_store_unsigned(out, desc->size, i);
+            parse_state->current_token += 1;
+            return false;
+        }
+    }
+    LOG_ERROR(CURRENT_TOKEN(parse_state).start, "Unknown enum value in '%s': %.*s", parse_state->current_key, CURRENT_STRING_FOR_ERROR(parse_state))
+    return true;
+}
+
+JS2C_API bool builtin_table_parse_array(parse_state_t *parse_state, const js2c_type_desc_t *desc, void *out) {
+    if (check_type(parse_state, JSMN_ARRAY)) {
+        return true;
+    }
+    const int n = CURRENT_TOKEN(parse_state).size;
+    if (n > desc->max_items) {
+        LOG_ERROR(CURRENT_TOKEN(parse_state).start, "Array '%s' too large. Length: %i. Maximum length: %i.", parse_state->current_key, n, desc->max_items)
+        return true;
+    }
+    if (n < desc->min_items) {
+        LOG_ERROR(CURRENT_TOKEN(parse_state).start, "Array '%s' too small. Length: %i. Minimum length: %i.", parse_state->current_key, n, desc->min_items)
+        return true;
+    }
+    /* The element count is always the first member of generated array types */
+    *(uint64_t *)out = n;
+    parse_state->current_token += 1;
+    char *items = (char *)out + desc->items_offset;
+    for (int i = 0; i < n; ++i) {
+        if (builtin_table_parse(parse_state, desc->item, items + (size_t)i * desc->item->size)) {
+            return true;
+        }
+    }
+    return false;
+}
+
+JS2C_API bool builtin_table_key_is(const js2c_field_desc_t *field, const char *key, uint32_t length) {
+    return field->name_length == length && memcmp(field->name, key, length) == 0;
+}
+
+/* Like builtin_match_key: the field after the previous match is tried first. */
+JS2C_API const js2c_field_desc_t *builtin_table_find_field(const parse_state_t *parse_state, const js2c_type_desc_t *desc, uint32_t *expected_field) {
+    const jsmntok_t *token = &CURRENT_TOKEN(parse_state);
+    if (token->type != JSMN_STRING) {
+        return NULL;
+    }
+    const uint32_t length = token->end - token->start;
+    const char *key = parse_state->json_string + token->start;
+    uint32_t i = *expected_field;
+    if (i >= desc->field_count || !builtin_table_key_is(&desc->fields[i], key, length)) {
+        for (i = 0; i < desc->field_count && !builtin_table_key_is(&desc->fields[i], key, length); ++i) {}
+    }
+    if (i == desc->field_count) {
+        return NULL;
+    }
+    *expected_field = i + 1;
+    return &desc->fields[i];
+}
+
+JS2C_API bool builtin_table_parse_object(parse_state_t *parse_state, const js2c_type_desc_t *desc, void *out) {
+    if (check_type(parse_state, JSMN_OBJECT)) {
+        return true;
+    }
+    bool seen[desc->field_count + 1];
+    memset(seen, 0, sizeof(seen));
+
+    uint32_t expected_field = 0;
+    const uint64_t n = CURRENT_TOKEN(parse_state).size;
+    parse_state->current_token += 1;
+    for (uint64_t i = 0; i < n; ++i) {
+        if (CURRENT_TOKEN(parse_state).size > 1) {
+            LOG_ERROR(CURRENT_TOKEN(parse_state).start, "Missing separator between values in '%s', after key: %.*s", parse_state->current_key, CURRENT_STRING_FOR_ERROR(parse_state))
+            return true;
+        }
+        if (CURRENT_TOKEN(parse_state).size < 1) {
+            LOG_ERROR(CURRENT_TOKEN(parse_state).start, "Missing value in '%s', after key: %.*s", parse_state->current_key, CURRENT_STRING_FOR_ERROR(parse_state))
+            return true;
+        }
+        const js2c_field_desc_t *field = builtin_table_find_field(parse_state, desc, &expected_field);
+        if (field == NULL) {
+            if (!desc->allow_additional_properties) {
+                LOG_ERROR(CURRENT_TOKEN(parse_state).start, "Unknown field in '%s': %.*s", parse_state->current_key, CURRENT_STRING_FOR_ERROR(parse_state))
+                return true;
+            }
+            parse_state->current_token += 1;
+            builtin_skip(parse_state);
+            continue;
+        }
+        if (seen[field - desc->fields]) {
+            LOG_ERROR(CURRENT_TOKEN(parse_state).start, "Duplicate field definition in '%s': %s", parse_state->current_key, field->name)
+            return true;
+        }
+        seen[field - desc->fields] = true;
+        JS2C_STATS_FIELD_HIT(parse_state, field->stats_index);
+        parse_state->current_token += 1;
+        const char *saved_key = parse_state->current_key;
+        parse_state->current_key = field->name;
+        if (builtin_table_parse(parse_state, field->type, (char *)out + field->offset)) {
+            return true;
+        }
+        parse_state->current_key = saved_key;
+    }
+    for (uint32_t i = 0; i < desc->field_count; ++i) {
+        if (!seen[i] && desc->fields[i].set_default == NULL) {
+            LOG_ERROR(CURRENT_TOKEN(parse_state).start, "Missing required field in '%s': %s", parse_state->current_key, desc->fields[i].name)
+            return true;
+        }
+    }
+    for (uint32_t i = 0; i < desc->field_count; ++i) {
+        if (!seen[i] && desc->fields[i].set_default(parse_state, (char *)out + desc->fields[i].offset)) {
+            return true;
+        }
+    }
+    return false;
+}
+
+JS2C_API bool builtin_table_parse(parse_state_t *parse_state, const js2c_type_desc_t *desc, void *out) {
+    switch (desc->kind) {
+    case JS2C_KIND_OBJECT:
+        return builtin_table_parse_object(parse_state, desc, out);
+    case JS2C_KIND_ARRAY:
+        return builtin_table_parse_array(parse_state, desc, out);
+    case JS2C_KIND_SIGNED:
+        return builtin_table_parse_signed(parse_state, desc, out);
+    case JS2C_KIND_UNSIGNED:
+        return builtin_table_parse_unsigned(parse_state, desc, out);
+    case JS2C_KIND_DOUBLE:
+        return builtin_table_parse_double(parse_state, desc, out);
+    case JS2C_KIND_BOOL:
+        return builtin_parse_bool(parse_state, out);
+    case JS2C_KIND_STRING:
+        return builtin_parse_string(parse_state, out, desc->min_length, desc->max_length);
+    case JS2C_KIND_ENUM:
+        return builtin_table_parse_enum(parse_state, desc, out);
+    case JS2C_KIND_CUSTOM:
+        return desc->parse(parse_state, out);
+    }
+    return true;
+}
+
 #endif /* JS2C_BUILTINS_H */
@@ -24,10 +24,9 @@
 #
 
 import argparse
-import os
+import sys
 
-from js2c.schema import load_schema
-from js2c.codegen.root import RootGenerator
+from js2c.driver import generate_files, generate_builtins_library, read_manifest, expand_batch_patterns, run_batch
 from js2c.settings import Settings
 
 HELP = """
@@ -40,6 +39,10 @@ in either snake or camel case. E.g.:
 "js2cSettings": {"cPrefixFile": "my.inc"}
 
 The settings in the schema take precedence.
+
+Many schemas can be generated by a single, parallel invocation with --batch
+or --manifest. A Make-style .d depfile is written next to every generated
+.c file in that mode.
 """.strip()
 
 
@@ -51,30 +54,113 @@ def parse_args():
     )
     parser.add_argument(
         "schema_file",
-        type=argparse.FileType('r'),
+        nargs='?',
         help="Filename of the JSON schema to use. Schema version 7 is supported.",
     )
     parser.add_argument(
         "c_file",
-        type=argparse.FileType('w'),
-        help="Filename of the generated parser .c file",
+        nargs='?',
+        help="Filename of the generated parser .c file. It is only written if its contents changed.",
     )
     parser.add_argument(
         "h_file",
-        type=argparse.FileType('w'),
-        help="Filename of the generated parser .h file",
+        nargs='?',
+        help="Filename of the generated parser .h file. It is only written if its contents changed.",
+    )
+    parser.add_argument(
+        "--extra-schema",
+        metavar="file",
+        action="append",
+        help="Also generate the parser of this schema into the same files. Can be specified multiple times.\n"
+        "Identical definitions (same path and contents) of the schemas only get a single type and parser.",
+    )
+    parser.add_argument(
+        "--builtins-library",
+        metavar=("c_file", "h_file"),
+        nargs=2,
+        help="Generate the builtins and JSMN as a standalone library, to be compiled only once and linked with\n"
+        "parsers generated with --include-external-builtins-file pointing to the library's h_file.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        metavar="dir",
+        help="Cache generated files in this directory, keyed on a hash of the resolved schema, the settings, \n"
+        "the prefix and postfix files and the generator itself. Generation is skipped on a cache hit.",
+    )
+    parser.add_argument(
+        "--depfile",
+        action="store_true",
+        help="Write a Make-style dependency file next to the generated .c file (with a .d extension).",
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="pattern",
+        nargs='+',
+        help="Generate every <name>.schema.json matching these glob patterns into <name>.parser.c and <name>.parser.h",
+    )
+    parser.add_argument(
+        "--output-dir",
+        metavar="dir",
+        help="Output directory for --batch. Defaults to the directory of each schema.",
+    )
+    parser.add_argument(
+        "--manifest",
+        metavar="file",
+        help='Generate all schemas listed in this JSON file: [{"schema": ..., "c_file": ..., "h_file": ...}, ...]',
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        metavar="N",
+        type=int,
+        help="Number of parallel generator processes in batch mode. Defaults to the number of CPUs.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print the wall time and peak memory of every generation phase, generator instance counts,\n"
+        "emitted lines per generator type and the largest subschemas to stderr.",
+    )
+    parser.add_argument(
+        "--memory-report",
+        action="store_true",
+        help="Print the estimated size of every generated type, and the stack space of the token buffers to stderr.",
+    )
+    parser.add_argument(
+        "--profile-output",
+        metavar="file",
+        help="Also write cProfile statistics of the generation to this file (implies --profile).",
     )
     Settings.fill_argparse(parser)
-    return parser.parse_args()
+    args = parser.parse_args()
+    if not args.batch and not args.manifest and not args.builtins_library and args.h_file is None:
+        parser.error(
+            "schema_file, c_file and h_file are required, unless --batch, --manifest or --builtins-library is used"
+        )
+    if args.profile_output is not None:
+        if args.batch or args.manifest:
+            parser.error("--profile-output can not be used with --batch or --manifest")
+        args.profile = True
+    return args
 
 
 def main(args):
-    schema = load_schema(args.schema_file)
-    settings = Settings(vars(args), schema.get('js2cSettings', {}))
-    root_generator = RootGenerator(schema, settings)
-    root_generator.generate_parser_h(args.h_file)
-    root_generator.generate_parser_c(args.c_file, os.path.basename(args.h_file.name))
+    if args.builtins_library:
+        generate_builtins_library(args.builtins_library[0], args.builtins_library[1], vars(args))
+        if args.h_file is None and not args.batch and not args.manifest:
+            return 0
+
+    if args.batch or args.manifest:
+        jobs = []
+        if args.manifest:
+            jobs.extend(read_manifest(args.manifest))
+        if args.batch:
+            jobs.extend(expand_batch_patterns(args.batch, args.output_dir))
+        return 1 if run_batch(jobs, vars(args), args.jobs) else 0
+
+    generate_files(args.schema_file, args.c_file, args.h_file, vars(args))
+    return 0
 
 
 if __name__ == "__main__":
-    main(parse_args())
+    sys.exit(main(parse_args()))
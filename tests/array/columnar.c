@@ -0,0 +1,44 @@
+#include "columnar.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+const char* data =
+    "{\"samples\": ["
+    "{\"time\": 1, \"value\": 0.5, \"unit\": \"mV\", \"position\": [1, 2]},"
+    "{\"value\": 1.5, \"time\": 2},"
+    "{\"time\": 3, \"value\": 2.5, \"position\": [3]}"
+    "], \"last\": {\"time\": 4, \"value\": 3.5}}";
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = {};
+    assert(!json_parse_root(data, &root));
+    assert(root.samples.n == 3);
+
+    /* Every field is a contiguous column */
+    double sum = 0;
+    for (unsigned i = 0; i < root.samples.n; ++i) {
+        sum += root.samples.value[i];
+    }
+    assert(sum == 4.5);
+    assert(root.samples.time[0] == 1);
+    assert(root.samples.time[2] == 3);
+    assert(!strcmp(root.samples.unit[0], "mV"));
+    assert(!strcmp(root.samples.unit[1], "V"));
+    assert(root.samples.position[0].n == 2);
+    assert(root.samples.position[0].items[1] == 2);
+    assert(root.samples.position[1].n == 0);
+    assert(root.samples.position[2].items[0] == 3);
+
+    /* The same definition outside the columnar array is a normal struct */
+    assert(root.last.time == 4);
+    assert(root.last.value == 3.5);
+
+    assert(json_parse_root("{\"samples\": [{\"time\": 1}], \"last\": {\"time\": 4, \"value\": 3.5}}", &root));
+    assert(json_parse_root("{\"samples\": [{\"time\": -1, \"value\": 1}], \"last\": {\"time\": 4, \"value\": 3.5}}", &root));
+    assert(json_parse_root("{\"samples\": [1], \"last\": {\"time\": 4, \"value\": 3.5}}", &root));
+    return 0;
+}
@@ -0,0 +1,37 @@
+#include "pooled_strings.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = {};
+    assert(!json_parse_root("{\"tags\": [\"red\", \"green\", \"blue\"], \"aliases\": [\"\", \"x\"]}", &root));
+    assert(root.tags.n == 3);
+    assert(!strcmp(ROOT_TAGS_ITEM(root.tags, 0), "red"));
+    assert(!strcmp(ROOT_TAGS_ITEM(root.tags, 1), "green"));
+    assert(!strcmp(ROOT_TAGS_ITEM(root.tags, 2), "blue"));
+    assert(root.aliases.n == 2);
+    assert(!strcmp(ROOT_ALIASES_ITEM(root.aliases, 0), ""));
+    assert(!strcmp(ROOT_ALIASES_ITEM(root.aliases, 1), "x"));
+
+    /* Only the pool and the offsets are reserved, not maxItems * maxLength */
+    assert(sizeof(root.tags) < 256 * 3 + 32 + 8 + 8);
+    assert(sizeof(root.tags.offsets[0]) == 2);
+    assert(sizeof(root.aliases.offsets[0]) == 4);
+
+    assert(!json_parse_root("{\"tags\": []}", &root));
+    assert(root.tags.n == 0);
+    assert(root.aliases.n == 0);
+
+    /* 31 characters and 1 terminator fill the pool exactly */
+    assert(!json_parse_root("{\"tags\": [\"0123456789\", \"0123456789\", \"012345678\"]}", &root));
+    assert(!strcmp(ROOT_TAGS_ITEM(root.tags, 2), "012345678"));
+    assert(json_parse_root("{\"tags\": [\"0123456789\", \"0123456789\", \"0123456789\"]}", &root));
+    assert(json_parse_root("{\"tags\": [\"a\", \"\"]}", &root));
+    assert(json_parse_root("{\"tags\": [\"a\", 1]}", &root));
+    assert(json_parse_root("{\"tags\": [], \"aliases\": [\"123456789\"]}", &root));
+    return 0;
+}
@@ -0,0 +1,68 @@
+#include "primitives.parser.h"
+
+#include <stdio.h>
+#include <stdint.h>
+#include <string.h>
+#include <assert.h>
+
+static bool parse_with(const char *field, const char *value, root_t *root) {
+    char json[512];
+    const char *fields[] = {"ints", "uints", "small", "doubles", "flags"};
+    int pos = snprintf(json, sizeof(json), "{");
+    for (unsigned i = 0; i < sizeof(fields) / sizeof(fields[0]); ++i) {
+        pos += snprintf(
+            json + pos,
+            sizeof(json) - pos,
+            "%s\"%s\": %s",
+            i ? ", " : "",
+            fields[i],
+            strcmp(field, fields[i]) ? "[]" : value
+        );
+    }
+    snprintf(json + pos, sizeof(json) - pos, "}");
+    return json_parse_root(json, root);
+}
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = {};
+
+    assert(!parse_with("ints", "[0, -5, 123456789012345678, -123456789012345678, 9223372036854775807]", &root));
+    assert(root.ints.n == 5);
+    assert(root.ints.items[1] == -5);
+    assert(root.ints.items[2] == 123456789012345678LL);
+    assert(root.ints.items[3] == -123456789012345678LL);
+    assert(root.ints.items[4] == INT64_MAX);
+    assert(parse_with("ints", "[1, 2, -1000000000000000001]", &root));
+    assert(parse_with("ints", "[1, 2, 1.5]", &root));
+    assert(parse_with("ints", "[1, \"2\"]", &root));
+    assert(parse_with("ints", "[1, -]", &root));
+
+    assert(!parse_with("uints", "[0, 1234567890123456789, 18446744073709551615]", &root));
+    assert(root.uints.n == 3);
+    assert(root.uints.items[1] == 1234567890123456789ULL);
+    assert(root.uints.items[2] == UINT64_MAX);
+    assert(parse_with("uints", "[1, -1]", &root));
+
+    assert(!parse_with("small", "[-100, 0, 99]", &root));
+    assert(root.small.n == 3);
+    assert(root.small.items[0] == -100);
+    assert(root.small.items[2] == 99);
+    assert(parse_with("small", "[1, 100]", &root));
+    assert(parse_with("small", "[-101]", &root));
+
+    assert(!parse_with("doubles", "[1.5, -2e3, 10]", &root));
+    assert(root.doubles.n == 3);
+    assert(root.doubles.items[0] == 1.5);
+    assert(root.doubles.items[1] == -2000);
+    assert(parse_with("doubles", "[1, 10.5]", &root));
+    assert(parse_with("doubles", "[1, true]", &root));
+
+    assert(!parse_with("flags", "[true, false, true]", &root));
+    assert(root.flags.n == 3);
+    assert(root.flags.items[0] && !root.flags.items[1] && root.flags.items[2]);
+    assert(parse_with("flags", "[true, 1]", &root));
+    assert(parse_with("flags", "[true, [false]]", &root));
+    return 0;
+}
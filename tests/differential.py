@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+#
+# MIT License
+#
+# Copyright (c) 2020 Alex Badics
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import glob
+import os
+import re
+import shlex
+import subprocess
+import sys
+
+from js2c.codegen.generator_factory import schema_to_json
+from js2c.codegen.root import RootGenerator
+from js2c.schema import load_schema
+from js2c.settings import Settings
+from js2c.validator import compile_validator, validate_json
+
+HELP = """
+Run the JSON documents of the C tests through both the generated C parser and the Python validator (js2c.validator),
+and check that they accept and reject the same documents.
+
+The documents are the string literals passed to json_parse_<root>() in the test files, directly or through a
+const char * variable. The parsers must already be generated (see the Makefile).
+
+Run it from the tests directory, with the repository root in PYTHONPATH (see the Makefile).
+""".strip()
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+HARNESS_FILE_NAME = os.path.join(TESTS_DIR, "differential_harness.c")
+
+C_STRING_LITERALS = r'((?:"(?:[^"\\\n]|\\.)*"\s*)+)'
+C_STRING_LITERAL_RE = re.compile(r'"((?:[^"\\\n]|\\.)*)"')
+C_ESCAPE_RE = re.compile(r'\\(x[0-9A-Fa-f]+|[0-7]{1,3}|.)')
+C_SIMPLE_ESCAPES = {
+    'a': b'\a', 'b': b'\b', 'f': b'\f', 'n': b'\n', 'r': b'\r', 't': b'\t', 'v': b'\v',
+    '\\': b'\\', '"': b'"', "'": b"'", '?': b'?',
+}
+C_VARIABLE_RE = re.compile(r'const char\s*\*\s*(\w+)\s*=\s*' + C_STRING_LITERALS + ';')
+
+# Documents the C parser and the Python validator are known to disagree on (see the README)
+KNOWN_DIVERGENCES_RE = re.compile(
+    # \u0000 escapes are only rejected by the C parser
+    r'\\u0000'
+    # JSMN accepts a missing comma after an array or object, and a trailing comma
+    r'|[\]}]\s*"|,\s*[\]}]'
+)
+LONG_INTEGER_RE = re.compile(r'-?[0-9]{19,}')
+
+
+def is_known_divergence(document):
+    text = document.decode(errors="replace")
+    if KNOWN_DIVERGENCES_RE.search(text):
+        return True
+    # Integers out of the int64 range are clamped by the C parser, and rejected by the Python validator
+    return any(not -(1 << 63) <= int(number) < (1 << 63) for number in LONG_INTEGER_RE.findall(text))
+
+
+def decode_c_string_literals(literals):
+    """ The bytes of adjacent C string literals """
+    result = b""
+    for literal in C_STRING_LITERAL_RE.findall(literals):
+        position = 0
+        for escape in C_ESCAPE_RE.finditer(literal):
+            result += literal[position:escape.start()].encode()
+            sequence = escape.group(1)
+            if sequence[0] == 'x':
+                result += bytes([int(sequence[1:], 16) & 0xff])
+            elif sequence[0] in '01234567':
+                result += bytes([int(sequence, 8) & 0xff])
+            else:
+                result += C_SIMPLE_ESCAPES[sequence]
+            position = escape.end()
+        result += literal[position:].encode()
+    return result
+
+
+def test_documents(test_source, root_name):
+    """ The documents of the test, as (document, line number) pairs """
+    variables = {
+        match.group(1): decode_c_string_literals(match.group(2))
+        for match in C_VARIABLE_RE.finditer(test_source)
+    }
+    documents = []
+    call_re = re.compile(r'\bjson_parse_' + re.escape(root_name) + r'\(\s*(?:' + C_STRING_LITERALS + r'|(\w+)\s*),')
+    for match in call_re.finditer(test_source):
+        if match.group(1) is not None:
+            document = decode_c_string_literals(match.group(1))
+        elif match.group(2) in variables:
+            document = variables[match.group(2)]
+        else:
+            continue
+        documents.append((document, test_source.count("\n", 0, match.start()) + 1))
+    return documents
+
+
+def python_accepts(validator, document):
+    try:
+        validate_json(validator, document.decode())
+    except (ValueError, RecursionError):
+        return False
+    return True
+
+
+def c_parser_accepts(test_file_name, root_generator, documents, args):
+    """ Run the documents through the test's parser, compiled with differential_harness.c """
+    stem = test_file_name[:-len(".c")]
+    name = root_generator.name
+    executable = stem + ".differential.compiled"
+    command = shlex.split(args.cc) + shlex.split(args.cflags) + [
+        "-include", stem + ".parser.h",
+        "-DJSON_PARSE=json_parse_{}".format(name),
+        "-DROOT_TYPE={}_t".format(name),
+    ]
+    if root_generator.recursive_targets[name]:
+        command.append("-DNODE_POOL")
+    # Split parsers and parsers using a builtins library are compiled from several files
+    extra_sources = glob.glob(glob.escape(stem) + ".parser_*.c") + glob.glob(glob.escape(stem) + "_builtins.parser.c")
+    command += ["-o", executable, HARNESS_FILE_NAME, stem + ".parser.c"] + sorted(extra_sources)
+    subprocess.run(command, check=True)
+    output = subprocess.run(
+        [os.path.abspath(executable)],
+        input=b"".join(document + b"\0" for document in documents),
+        stdout=subprocess.PIPE,
+        check=True,
+    ).stdout
+    return [result == b"0" for result in output.split()]
+
+
+def check_test(test_file_name, args):
+    """ Returns the list of disagreements, as printable strings """
+    stem = test_file_name[:-len(".c")]
+    with open(stem + ".schema.json") as schema_file:
+        schema = load_schema(schema_file)
+    root_generator = RootGenerator(schema, Settings({}, schema.get('js2cSettings', {})))
+    with open(test_file_name) as test_file:
+        documents = [
+            (document, line)
+            for document, line in test_documents(test_file.read(), root_generator.name)
+            if not is_known_divergence(document)
+        ]
+    if not documents:
+        return []
+
+    c_results = c_parser_accepts(test_file_name, root_generator, [document for document, _ in documents], args)
+    validator = compile_validator(schema)
+    # The Python validator can not run the C functions of js2cParseFunction, only the checks of the schema
+    custom_parse_functions = "js2cParseFunction" in schema_to_json(schema)
+    disagreements = []
+    for (document, line), c_accepts in zip(documents, c_results):
+        if c_accepts != python_accepts(validator, document) and (c_accepts or not custom_parse_functions):
+            disagreements.append("{}:{}: the C parser {} {}, the Python validator does not".format(
+                test_file_name, line, "accepts" if c_accepts else "rejects", document.decode(errors="replace")
+            ))
+    return disagreements
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=HELP, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("test_files", nargs="+", help="C test files, next to their schemas and generated parsers")
+    parser.add_argument("--cc", default=os.environ.get("CC", "cc"), help="C compiler. Defaults to $CC or cc.")
+    parser.add_argument("--cflags", default=os.environ.get("CFLAGS", ""), help="C compiler flags. Defaults to $CFLAGS.")
+    return parser.parse_args()
+
+
+def main(args):
+    # Generated parsers and tests with no schema of their own are skipped
+    test_files = [test_file for test_file in args.test_files if os.path.exists(test_file[:-len(".c")] + ".schema.json")]
+    with ThreadPoolExecutor() as executor:
+        results = list(executor.map(lambda test_file: check_test(test_file, args), test_files))
+    disagreements = [disagreement for result in results for disagreement in result]
+    for disagreement in disagreements:
+        print(disagreement, file=sys.stderr)
+    return 1 if disagreements else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
@@ -0,0 +1,38 @@
+/* Runs JSON documents through a generated parser, for differential.py.
+ *
+ * The parser's header is included with -include, JSON_PARSE and ROOT_TYPE name its parse function and output type.
+ * NODE_POOL is defined for recursive schemas. Their node pool is large enough for any of the test documents, as the
+ * Python validator has no node pool.
+ * The documents are read from the standard input, each terminated by a NUL character. A line with 0 (accepted) or
+ * 1 (rejected) is printed for every one of them.
+ */
+#include <stdio.h>
+
+#ifdef NODE_POOL
+static char node_pool[1 << 20];
+#define NODE_POOL_ARGUMENTS , node_pool, sizeof(node_pool)
+#else
+#define NODE_POOL_ARGUMENTS
+#endif
+
+static char document[1 << 16];
+static ROOT_TYPE root;
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    size_t length = 0;
+    int c;
+    while ((c = getchar()) != EOF) {
+        if (length == sizeof(document)) {
+            fprintf(stderr, "Document too long\n");
+            return 1;
+        }
+        document[length++] = c;
+        if (c == '\0') {
+            printf("%d\n", JSON_PARSE(document, &root NODE_POOL_ARGUMENTS) ? 1 : 0);
+            length = 0;
+        }
+    }
+    return 0;
+}
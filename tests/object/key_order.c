@@ -0,0 +1,40 @@
+#include "key_order.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+static void check_root(const root_t *root, int64_t fourth) {
+    assert(root->first == 1);
+    assert(!strcmp(root->second, "two"));
+    assert(root->third);
+    assert(root->fourth == fourth);
+}
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = {};
+    /* Declaration order */
+    assert(!json_parse_root("{\"first\": 1, \"second\": \"two\", \"third\": true, \"fourth\": 5}", &root));
+    check_root(&root, 5);
+
+    /* Reversed, shuffled, and with skipped fields */
+    memset(&root, 0, sizeof(root));
+    assert(!json_parse_root("{\"fourth\": 6, \"third\": true, \"second\": \"two\", \"first\": 1}", &root));
+    check_root(&root, 6);
+    memset(&root, 0, sizeof(root));
+    assert(!json_parse_root("{\"second\": \"two\", \"fourth\": 7, \"first\": 1, \"third\": true}", &root));
+    check_root(&root, 7);
+    memset(&root, 0, sizeof(root));
+    assert(!json_parse_root("{\"first\": 1, \"third\": true, \"second\": \"two\"}", &root));
+    check_root(&root, 4);
+
+    /* Duplicates and unknown keys are still found after the expected key was missed */
+    assert(json_parse_root("{\"first\": 1, \"second\": \"two\", \"first\": 1, \"third\": true}", &root));
+    assert(json_parse_root("{\"first\": 1, \"second\": \"two\", \"third\": true, \"third\": true}", &root));
+    assert(json_parse_root("{\"first\": 1, \"secon\": \"two\", \"third\": true}", &root));
+    assert(json_parse_root("{\"first\": 1, \"second\": \"two\", \"third\": true, \"fifth\": 5}", &root));
+
+    return 0;
+}
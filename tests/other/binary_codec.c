@@ -0,0 +1,108 @@
+#include "binary_codec.parser.h"
+
+#include <string.h>
+#include <assert.h>
+
+static const char *const json =
+    "{\"name\": \"probe\", \"id\": 70000, \"offset\": -300, \"delta\": -9000000000, \"serial\": \"1f\", "
+    "\"ratio\": 0.5, \"active\": true, \"kind\": \"gateway\", \"readings\": [1.5, -2.25], "
+    "\"tags\": [\"a\", \"bc\", \"\"], \"samples\": [{\"time\": 1, \"value\": 2}, {\"time\": 3, \"value\": 4}], "
+    "\"shape\": {\"side\": 7, \"kind\": \"square\"}, \"location\": {\"time\": 5, \"value\": -6}}";
+
+static void check_record(const root_t *root) {
+    assert(!strcmp(root->name, "probe"));
+    assert(root->id == 70000);
+    assert(root->offset == -300);
+    assert(root->delta == -9000000000LL);
+    assert(root->serial == 0x1f);
+    assert(root->ratio == 0.5);
+    assert(root->active);
+    assert(root->kind == ROOT_KIND_GATEWAY);
+    assert(root->readings.n == 2);
+    assert(root->readings.items[1] == -2.25);
+    assert(root->tags.n == 3);
+    assert(!strcmp(ROOT_TAGS_ITEM(root->tags, 1), "bc"));
+    assert(!strcmp(ROOT_TAGS_ITEM(root->tags, 2), ""));
+    assert(root->samples.n == 2);
+    assert(root->samples.time[1] == 3);
+    assert(root->samples.value[1] == 4);
+    assert(root->shape.kind == ROOT_SHAPE_KIND_SQUARE);
+    assert(root->shape.square.side == 7);
+    assert(root->location.time == 5);
+    assert(root->location.value == -6);
+}
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = {};
+    root_t decoded = {};
+    uint8_t buffer[ROOT_ENCODED_MAX_SIZE];
+    uint8_t reencoded[ROOT_ENCODED_MAX_SIZE];
+    size_t size = 0;
+    size_t reencoded_size = 0;
+
+    assert(!json_parse_root(json, &root));
+    check_record(&root);
+    assert(!root_encode(&root, buffer, sizeof(buffer), &size));
+    assert(size < strlen(json) / 2);
+    assert(!root_decode(buffer, size, &decoded));
+    check_record(&decoded);
+    assert(!root_encode(&decoded, reencoded, sizeof(reencoded), &reencoded_size));
+    assert(reencoded_size == size);
+    assert(!memcmp(buffer, reencoded, size));
+
+    /* Buffer too small, truncated or trailing data */
+    assert(root_encode(&root, reencoded, size - 1, &reencoded_size));
+    assert(root_decode(buffer, size - 1, &decoded));
+    assert(root_decode(buffer, 3, &decoded));
+    memcpy(reencoded, buffer, size);
+    reencoded[size] = 0;
+    assert(root_decode(reencoded, size + 1, &decoded));
+
+    /* Records of other versions or schemas */
+    reencoded[3] += 1;
+    assert(root_decode(reencoded, size, &decoded));
+    reencoded[3] -= 1;
+    reencoded[4] ^= 1;
+    assert(root_decode(reencoded, size, &decoded));
+
+    /* The schema checks are applied when decoding */
+    decoded = root;
+    decoded.offset = -2000;
+    assert(!root_encode(&decoded, reencoded, sizeof(reencoded), &reencoded_size));
+    assert(root_decode(reencoded, reencoded_size, &decoded));
+    decoded = root;
+    decoded.kind = 3;
+    assert(!root_encode(&decoded, reencoded, sizeof(reencoded), &reencoded_size));
+    assert(root_decode(reencoded, reencoded_size, &decoded));
+    decoded = root;
+    decoded.shape.square.side = 0;
+    assert(!root_encode(&decoded, reencoded, sizeof(reencoded), &reencoded_size));
+    assert(root_decode(reencoded, reencoded_size, &decoded));
+    decoded = root;
+    decoded.readings.n = 9;
+    assert(root_encode(&decoded, reencoded, sizeof(reencoded), &reencoded_size));
+
+    /* The largest possible record fits into ROOT_ENCODED_MAX_SIZE */
+    memset(&root, 0xff, sizeof(root));
+    memset(root.name, 'x', sizeof(root.name) - 1);
+    root.name[sizeof(root.name) - 1] = 0;
+    root.ratio = 1;
+    root.active = true;
+    root.kind = ROOT_KIND_GATEWAY;
+    root.readings.n = 8;
+    root.samples.n = 4;
+    root.shape.kind = ROOT_SHAPE_KIND_SQUARE;
+    root.tags.n = 8;
+    memset(root.tags.pool, 'y', sizeof(root.tags.pool));
+    for (int i = 0; i < 8; ++i) {
+        root.tags.offsets[i] = 3 * i;
+        root.tags.pool[3 * i + 2] = 0;
+    }
+    assert(!root_encode(&root, buffer, sizeof(buffer), &size));
+    assert(!root_decode(buffer, size, &decoded));
+    assert(decoded.id == UINT64_MAX);
+    assert(!strcmp(ROOT_TAGS_ITEM(decoded.tags, 7), "yy"));
+    return 0;
+}
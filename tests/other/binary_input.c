@@ -0,0 +1,225 @@
+#include "binary_input.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+/* {"name": "probe", "id": 70000, "offset": -300, "ratio": 0.5, "active": true, "kind": "actuator",
+ *  "serial": "1f", "readings": [1.5, -2.25, 3], "location": {"x": -1, "y": 200}}, and variants of it */
+static const uint8_t cbor_document[] = {
+    0xa9, 0x64, 0x6e, 0x61, 0x6d, 0x65, 0x65, 0x70, 0x72, 0x6f, 0x62, 0x65,
+    0x62, 0x69, 0x64, 0x1a, 0x00, 0x01, 0x11, 0x70, 0x66, 0x6f, 0x66, 0x66,
+    0x73, 0x65, 0x74, 0x39, 0x01, 0x2b, 0x65, 0x72, 0x61, 0x74, 0x69, 0x6f,
+    0xfb, 0x3f, 0xe0, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x66, 0x61, 0x63,
+    0x74, 0x69, 0x76, 0x65, 0xf5, 0x64, 0x6b, 0x69, 0x6e, 0x64, 0x68, 0x61,
+    0x63, 0x74, 0x75, 0x61, 0x74, 0x6f, 0x72, 0x66, 0x73, 0x65, 0x72, 0x69,
+    0x61, 0x6c, 0x62, 0x31, 0x66, 0x68, 0x72, 0x65, 0x61, 0x64, 0x69, 0x6e,
+    0x67, 0x73, 0x83, 0xfb, 0x3f, 0xf8, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
+    0xfb, 0xc0, 0x02, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x03, 0x68, 0x6c,
+    0x6f, 0x63, 0x61, 0x74, 0x69, 0x6f, 0x6e, 0xa2, 0x61, 0x78, 0x20, 0x61,
+    0x79, 0x18, 0xc8,
+};
+static const uint8_t cbor_half_floats[] = {
+    0xa9, 0x64, 0x6e, 0x61, 0x6d, 0x65, 0x65, 0x70, 0x72, 0x6f, 0x62, 0x65,
+    0x62, 0x69, 0x64, 0x1a, 0x00, 0x01, 0x11, 0x70, 0x66, 0x6f, 0x66, 0x66,
+    0x73, 0x65, 0x74, 0x39, 0x01, 0x2b, 0x65, 0x72, 0x61, 0x74, 0x69, 0x6f,
+    0xf9, 0x38, 0x00, 0x66, 0x61, 0x63, 0x74, 0x69, 0x76, 0x65, 0xf5, 0x64,
+    0x6b, 0x69, 0x6e, 0x64, 0x68, 0x61, 0x63, 0x74, 0x75, 0x61, 0x74, 0x6f,
+    0x72, 0x66, 0x73, 0x65, 0x72, 0x69, 0x61, 0x6c, 0x62, 0x31, 0x66, 0x68,
+    0x72, 0x65, 0x61, 0x64, 0x69, 0x6e, 0x67, 0x73, 0x83, 0xf9, 0x3e, 0x00,
+    0xf9, 0xc0, 0x80, 0x03, 0x68, 0x6c, 0x6f, 0x63, 0x61, 0x74, 0x69, 0x6f,
+    0x6e, 0xa2, 0x61, 0x78, 0x20, 0x61, 0x79, 0x18, 0xc8,
+};
+static const uint8_t msgpack_document[] = {
+    0x89, 0xa4, 0x6e, 0x61, 0x6d, 0x65, 0xa5, 0x70, 0x72, 0x6f, 0x62, 0x65,
+    0xa2, 0x69, 0x64, 0xce, 0x00, 0x01, 0x11, 0x70, 0xa6, 0x6f, 0x66, 0x66,
+    0x73, 0x65, 0x74, 0xd1, 0xfe, 0xd4, 0xa5, 0x72, 0x61, 0x74, 0x69, 0x6f,
+    0xcb, 0x3f, 0xe0, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0xa6, 0x61, 0x63,
+    0x74, 0x69, 0x76, 0x65, 0xc3, 0xa4, 0x6b, 0x69, 0x6e, 0x64, 0xa8, 0x61,
+    0x63, 0x74, 0x75, 0x61, 0x74, 0x6f, 0x72, 0xa6, 0x73, 0x65, 0x72, 0x69,
+    0x61, 0x6c, 0xa2, 0x31, 0x66, 0xa8, 0x72, 0x65, 0x61, 0x64, 0x69, 0x6e,
+    0x67, 0x73, 0x93, 0xcb, 0x3f, 0xf8, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
+    0xcb, 0xc0, 0x02, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x03, 0xa8, 0x6c,
+    0x6f, 0x63, 0x61, 0x74, 0x69, 0x6f, 0x6e, 0x82, 0xa1, 0x78, 0xff, 0xa1,
+    0x79, 0xcc, 0xc8,
+};
+static const uint8_t msgpack_floats[] = {
+    0x89, 0xa4, 0x6e, 0x61, 0x6d, 0x65, 0xa5, 0x70, 0x72, 0x6f, 0x62, 0x65,
+    0xa2, 0x69, 0x64, 0xce, 0x00, 0x01, 0x11, 0x70, 0xa6, 0x6f, 0x66, 0x66,
+    0x73, 0x65, 0x74, 0xd1, 0xfe, 0xd4, 0xa5, 0x72, 0x61, 0x74, 0x69, 0x6f,
+    0xca, 0x3f, 0x00, 0x00, 0x00, 0xa6, 0x61, 0x63, 0x74, 0x69, 0x76, 0x65,
+    0xc3, 0xa4, 0x6b, 0x69, 0x6e, 0x64, 0xa8, 0x61, 0x63, 0x74, 0x75, 0x61,
+    0x74, 0x6f, 0x72, 0xa6, 0x73, 0x65, 0x72, 0x69, 0x61, 0x6c, 0xa2, 0x31,
+    0x66, 0xa8, 0x72, 0x65, 0x61, 0x64, 0x69, 0x6e, 0x67, 0x73, 0x93, 0xca,
+    0x3f, 0xc0, 0x00, 0x00, 0xca, 0xc0, 0x10, 0x00, 0x00, 0x03, 0xa8, 0x6c,
+    0x6f, 0x63, 0x61, 0x74, 0x69, 0x6f, 0x6e, 0x82, 0xa1, 0x78, 0xff, 0xa1,
+    0x79, 0xcc, 0xc8,
+};
+static const uint8_t cbor_out_of_range[] = {
+    0xa9, 0x64, 0x6e, 0x61, 0x6d, 0x65, 0x65, 0x70, 0x72, 0x6f, 0x62, 0x65,
+    0x62, 0x69, 0x64, 0x1a, 0x00, 0x01, 0x86, 0xa1, 0x66, 0x6f, 0x66, 0x66,
+    0x73, 0x65, 0x74, 0x39, 0x01, 0x2b, 0x65, 0x72, 0x61, 0x74, 0x69, 0x6f,
+    0xfb, 0x3f, 0xe0, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x66, 0x61, 0x63,
+    0x74, 0x69, 0x76, 0x65, 0xf5, 0x64, 0x6b, 0x69, 0x6e, 0x64, 0x68, 0x61,
+    0x63, 0x74, 0x75, 0x61, 0x74, 0x6f, 0x72, 0x66, 0x73, 0x65, 0x72, 0x69,
+    0x61, 0x6c, 0x62, 0x31, 0x66, 0x68, 0x72, 0x65, 0x61, 0x64, 0x69, 0x6e,
+    0x67, 0x73, 0x83, 0xfb, 0x3f, 0xf8, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
+    0xfb, 0xc0, 0x02, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x03, 0x68, 0x6c,
+    0x6f, 0x63, 0x61, 0x74, 0x69, 0x6f, 0x6e, 0xa2, 0x61, 0x78, 0x20, 0x61,
+    0x79, 0x18, 0xc8,
+};
+static const uint8_t msgpack_out_of_range[] = {
+    0x89, 0xa4, 0x6e, 0x61, 0x6d, 0x65, 0xa5, 0x70, 0x72, 0x6f, 0x62, 0x65,
+    0xa2, 0x69, 0x64, 0xce, 0x00, 0x01, 0x86, 0xa1, 0xa6, 0x6f, 0x66, 0x66,
+    0x73, 0x65, 0x74, 0xd1, 0xfe, 0xd4, 0xa5, 0x72, 0x61, 0x74, 0x69, 0x6f,
+    0xcb, 0x3f, 0xe0, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0xa6, 0x61, 0x63,
+    0x74, 0x69, 0x76, 0x65, 0xc3, 0xa4, 0x6b, 0x69, 0x6e, 0x64, 0xa8, 0x61,
+    0x63, 0x74, 0x75, 0x61, 0x74, 0x6f, 0x72, 0xa6, 0x73, 0x65, 0x72, 0x69,
+    0x61, 0x6c, 0xa2, 0x31, 0x66, 0xa8, 0x72, 0x65, 0x61, 0x64, 0x69, 0x6e,
+    0x67, 0x73, 0x93, 0xcb, 0x3f, 0xf8, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
+    0xcb, 0xc0, 0x02, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x03, 0xa8, 0x6c,
+    0x6f, 0x63, 0x61, 0x74, 0x69, 0x6f, 0x6e, 0x82, 0xa1, 0x78, 0xff, 0xa1,
+    0x79, 0xcc, 0xc8,
+};
+static const uint8_t cbor_negative_id[] = {
+    0xa9, 0x64, 0x6e, 0x61, 0x6d, 0x65, 0x65, 0x70, 0x72, 0x6f, 0x62, 0x65,
+    0x62, 0x69, 0x64, 0x20, 0x66, 0x6f, 0x66, 0x66, 0x73, 0x65, 0x74, 0x39,
+    0x01, 0x2b, 0x65, 0x72, 0x61, 0x74, 0x69, 0x6f, 0xfb, 0x3f, 0xe0, 0x00,
+    0x00, 0x00, 0x00, 0x00, 0x00, 0x66, 0x61, 0x63, 0x74, 0x69, 0x76, 0x65,
+    0xf5, 0x64, 0x6b, 0x69, 0x6e, 0x64, 0x68, 0x61, 0x63, 0x74, 0x75, 0x61,
+    0x74, 0x6f, 0x72, 0x66, 0x73, 0x65, 0x72, 0x69, 0x61, 0x6c, 0x62, 0x31,
+    0x66, 0x68, 0x72, 0x65, 0x61, 0x64, 0x69, 0x6e, 0x67, 0x73, 0x83, 0xfb,
+    0x3f, 0xf8, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0xfb, 0xc0, 0x02, 0x00,
+    0x00, 0x00, 0x00, 0x00, 0x00, 0x03, 0x68, 0x6c, 0x6f, 0x63, 0x61, 0x74,
+    0x69, 0x6f, 0x6e, 0xa2, 0x61, 0x78, 0x20, 0x61, 0x79, 0x18, 0xc8,
+};
+static const uint8_t msgpack_wrong_type[] = {
+    0x89, 0xa4, 0x6e, 0x61, 0x6d, 0x65, 0xa5, 0x70, 0x72, 0x6f, 0x62, 0x65,
+    0xa2, 0x69, 0x64, 0xce, 0x00, 0x01, 0x11, 0x70, 0xa6, 0x6f, 0x66, 0x66,
+    0x73, 0x65, 0x74, 0xd1, 0xfe, 0xd4, 0xa5, 0x72, 0x61, 0x74, 0x69, 0x6f,
+    0xcb, 0x3f, 0xe0, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0xa6, 0x61, 0x63,
+    0x74, 0x69, 0x76, 0x65, 0x01, 0xa4, 0x6b, 0x69, 0x6e, 0x64, 0xa8, 0x61,
+    0x63, 0x74, 0x75, 0x61, 0x74, 0x6f, 0x72, 0xa6, 0x73, 0x65, 0x72, 0x69,
+    0x61, 0x6c, 0xa2, 0x31, 0x66, 0xa8, 0x72, 0x65, 0x61, 0x64, 0x69, 0x6e,
+    0x67, 0x73, 0x93, 0xcb, 0x3f, 0xf8, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
+    0xcb, 0xc0, 0x02, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x03, 0xa8, 0x6c,
+    0x6f, 0x63, 0x61, 0x74, 0x69, 0x6f, 0x6e, 0x82, 0xa1, 0x78, 0xff, 0xa1,
+    0x79, 0xcc, 0xc8,
+};
+static const uint8_t cbor_integer_key[] = {
+    0xa1, 0x01, 0x02,
+};
+static const uint8_t cbor_byte_string[] = {
+    0xa9, 0x64, 0x6e, 0x61, 0x6d, 0x65, 0x45, 0x70, 0x72, 0x6f, 0x62, 0x65,
+    0x62, 0x69, 0x64, 0x1a, 0x00, 0x01, 0x11, 0x70, 0x66, 0x6f, 0x66, 0x66,
+    0x73, 0x65, 0x74, 0x39, 0x01, 0x2b, 0x65, 0x72, 0x61, 0x74, 0x69, 0x6f,
+    0xfb, 0x3f, 0xe0, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x66, 0x61, 0x63,
+    0x74, 0x69, 0x76, 0x65, 0xf5, 0x64, 0x6b, 0x69, 0x6e, 0x64, 0x68, 0x61,
+    0x63, 0x74, 0x75, 0x61, 0x74, 0x6f, 0x72, 0x66, 0x73, 0x65, 0x72, 0x69,
+    0x61, 0x6c, 0x62, 0x31, 0x66, 0x68, 0x72, 0x65, 0x61, 0x64, 0x69, 0x6e,
+    0x67, 0x73, 0x83, 0xfb, 0x3f, 0xf8, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
+    0xfb, 0xc0, 0x02, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x03, 0x68, 0x6c,
+    0x6f, 0x63, 0x61, 0x74, 0x69, 0x6f, 0x6e, 0xa2, 0x61, 0x78, 0x20, 0x61,
+    0x79, 0x18, 0xc8,
+};
+static const uint8_t msgpack_missing_field[] = {
+    0x88, 0xa4, 0x6e, 0x61, 0x6d, 0x65, 0xa5, 0x70, 0x72, 0x6f, 0x62, 0x65,
+    0xa2, 0x69, 0x64, 0xce, 0x00, 0x01, 0x11, 0x70, 0xa6, 0x6f, 0x66, 0x66,
+    0x73, 0x65, 0x74, 0xd1, 0xfe, 0xd4, 0xa5, 0x72, 0x61, 0x74, 0x69, 0x6f,
+    0xcb, 0x3f, 0xe0, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0xa6, 0x61, 0x63,
+    0x74, 0x69, 0x76, 0x65, 0xc3, 0xa6, 0x73, 0x65, 0x72, 0x69, 0x61, 0x6c,
+    0xa2, 0x31, 0x66, 0xa8, 0x72, 0x65, 0x61, 0x64, 0x69, 0x6e, 0x67, 0x73,
+    0x93, 0xcb, 0x3f, 0xf8, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0xcb, 0xc0,
+    0x02, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x03, 0xa8, 0x6c, 0x6f, 0x63,
+    0x61, 0x74, 0x69, 0x6f, 0x6e, 0x82, 0xa1, 0x78, 0xff, 0xa1, 0x79, 0xcc,
+    0xc8,
+};
+static const uint8_t msgpack_unknown_enum[] = {
+    0x89, 0xa4, 0x6e, 0x61, 0x6d, 0x65, 0xa5, 0x70, 0x72, 0x6f, 0x62, 0x65,
+    0xa2, 0x69, 0x64, 0xce, 0x00, 0x01, 0x11, 0x70, 0xa6, 0x6f, 0x66, 0x66,
+    0x73, 0x65, 0x74, 0xd1, 0xfe, 0xd4, 0xa5, 0x72, 0x61, 0x74, 0x69, 0x6f,
+    0xcb, 0x3f, 0xe0, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0xa6, 0x61, 0x63,
+    0x74, 0x69, 0x76, 0x65, 0xc3, 0xa4, 0x6b, 0x69, 0x6e, 0x64, 0xa5, 0x6d,
+    0x6f, 0x74, 0x6f, 0x72, 0xa6, 0x73, 0x65, 0x72, 0x69, 0x61, 0x6c, 0xa2,
+    0x31, 0x66, 0xa8, 0x72, 0x65, 0x61, 0x64, 0x69, 0x6e, 0x67, 0x73, 0x93,
+    0xcb, 0x3f, 0xf8, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0xcb, 0xc0, 0x02,
+    0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x03, 0xa8, 0x6c, 0x6f, 0x63, 0x61,
+    0x74, 0x69, 0x6f, 0x6e, 0x82, 0xa1, 0x78, 0xff, 0xa1, 0x79, 0xcc, 0xc8,
+};
+static const uint8_t cbor_long_name[] = {
+    0xa9, 0x64, 0x6e, 0x61, 0x6d, 0x65, 0x70, 0x30, 0x31, 0x32, 0x33, 0x34,
+    0x35, 0x36, 0x37, 0x38, 0x39, 0x61, 0x62, 0x63, 0x64, 0x65, 0x66, 0x62,
+    0x69, 0x64, 0x1a, 0x00, 0x01, 0x11, 0x70, 0x66, 0x6f, 0x66, 0x66, 0x73,
+    0x65, 0x74, 0x39, 0x01, 0x2b, 0x65, 0x72, 0x61, 0x74, 0x69, 0x6f, 0xfb,
+    0x3f, 0xe0, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x66, 0x61, 0x63, 0x74,
+    0x69, 0x76, 0x65, 0xf5, 0x64, 0x6b, 0x69, 0x6e, 0x64, 0x68, 0x61, 0x63,
+    0x74, 0x75, 0x61, 0x74, 0x6f, 0x72, 0x66, 0x73, 0x65, 0x72, 0x69, 0x61,
+    0x6c, 0x62, 0x31, 0x66, 0x68, 0x72, 0x65, 0x61, 0x64, 0x69, 0x6e, 0x67,
+    0x73, 0x83, 0xfb, 0x3f, 0xf8, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0xfb,
+    0xc0, 0x02, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x03, 0x68, 0x6c, 0x6f,
+    0x63, 0x61, 0x74, 0x69, 0x6f, 0x6e, 0xa2, 0x61, 0x78, 0x20, 0x61, 0x79,
+    0x18, 0xc8,
+};
+
+static void check_document(const root_t *root) {
+    assert(!strcmp(root->name, "probe"));
+    assert(root->id == 70000);
+    assert(root->offset == -300);
+    assert(root->ratio == 0.5);
+    assert(root->active);
+    assert(root->kind == ROOT_KIND_ACTUATOR);
+    assert(root->serial == 0x1f);
+    assert(root->readings.n == 3);
+    assert(root->readings.items[0] == 1.5);
+    assert(root->readings.items[1] == -2.25);
+    assert(root->readings.items[2] == 3);
+    assert(root->location.x == -1);
+    assert(root->location.y == 200);
+}
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = {};
+
+    /* The same document in every format fills the same struct */
+    assert(!json_parse_root(
+        "{\"name\": \"probe\", \"id\": 70000, \"offset\": -300, \"ratio\": 0.5, \"active\": true, \"kind\": \"actuator\", "
+        "\"serial\": \"1f\", \"readings\": [1.5, -2.25, 3], \"location\": {\"x\": -1, \"y\": 200}}",
+        &root
+    ));
+    check_document(&root);
+    memset(&root, 0, sizeof(root));
+    assert(!cbor_parse_root(cbor_document, sizeof(cbor_document), &root));
+    check_document(&root);
+    memset(&root, 0, sizeof(root));
+    assert(!cbor_parse_root(cbor_half_floats, sizeof(cbor_half_floats), &root));
+    check_document(&root);
+    memset(&root, 0, sizeof(root));
+    assert(!msgpack_parse_root(msgpack_document, sizeof(msgpack_document), &root));
+    check_document(&root);
+    memset(&root, 0, sizeof(root));
+    assert(!msgpack_parse_root(msgpack_floats, sizeof(msgpack_floats), &root));
+    check_document(&root);
+
+    /* The checks of the JSON parser apply */
+    assert(cbor_parse_root(cbor_out_of_range, sizeof(cbor_out_of_range), &root));
+    assert(msgpack_parse_root(msgpack_out_of_range, sizeof(msgpack_out_of_range), &root));
+    assert(cbor_parse_root(cbor_negative_id, sizeof(cbor_negative_id), &root));
+    assert(msgpack_parse_root(msgpack_wrong_type, sizeof(msgpack_wrong_type), &root));
+    assert(msgpack_parse_root(msgpack_missing_field, sizeof(msgpack_missing_field), &root));
+    assert(msgpack_parse_root(msgpack_unknown_enum, sizeof(msgpack_unknown_enum), &root));
+    assert(cbor_parse_root(cbor_long_name, sizeof(cbor_long_name), &root));
+
+    /* Malformed or unsupported data */
+    assert(cbor_parse_root(cbor_integer_key, sizeof(cbor_integer_key), &root));
+    assert(cbor_parse_root(cbor_byte_string, sizeof(cbor_byte_string), &root));
+    assert(cbor_parse_root(cbor_document, sizeof(cbor_document) - 1, &root));
+    assert(msgpack_parse_root(msgpack_document, sizeof(msgpack_document) - 1, &root));
+    assert(cbor_parse_root(cbor_document, 0, &root));
+    uint8_t trailing[sizeof(cbor_document) + 1];
+    memcpy(trailing, cbor_document, sizeof(cbor_document));
+    trailing[sizeof(cbor_document)] = 0;
+    assert(cbor_parse_root(trailing, sizeof(trailing), &root));
+    return 0;
+}
@@ -0,0 +1,13 @@
+#include "cache.parser.h"
+
+#include <string.h>
+#include <assert.h>
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = {};
+    assert(!json_parse_root("{\"name\": \"potato\"}", &root));
+    assert(!strcmp(root.name, "potato"));
+    return 0;
+}
@@ -0,0 +1,26 @@
+#include "memory_budget.parser.h"
+
+#include <string.h>
+#include <assert.h>
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    /* The estimate of --memory-report is exact for plain types on 64 bit targets */
+    assert(sizeof(inventory_t) == 28848);
+    assert(sizeof(inventory_items_item_t) == 288);
+
+    static inventory_t inventory;
+    assert(!json_parse_inventory(
+        "{\"warehouse\": \"north\", \"open\": true, \"items\": ["
+        "{\"sku\": \"A-1\", \"count\": 12, \"tags\": [\"fragile\"]},"
+        "{\"sku\": \"B-2\", \"count\": 0, \"tags\": []}"
+        "]}",
+        &inventory
+    ));
+    assert(!strcmp(inventory.warehouse, "north"));
+    assert(inventory.items.n == 2);
+    assert(inventory.items.items[0].count == 12);
+    assert(!strcmp(inventory.items.items[0].tags.items[0], "fragile"));
+    return 0;
+}
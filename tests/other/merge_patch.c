@@ -0,0 +1,71 @@
+#include "merge_patch.parser.h"
+
+#include <string.h>
+#include <assert.h>
+
+static bool merge_patch(config_t *config, const char *patch) {
+    return json_merge_patch_config(config, patch, strlen(patch));
+}
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    config_t config = {};
+    assert(!json_parse_config(
+        "{\"name\": \"main\", \"port\": 80, \"log_level\": \"debug\","
+        " \"limits\": {\"connections\": 5, \"burst\": 10}, \"peers\": [\"a\", \"b\"]}",
+        &config
+    ));
+
+    /* Only the fields in the patch are changed */
+    assert(!merge_patch(&config, "{\"port\": 443}"));
+    assert(config.port == 443);
+    assert(!strcmp(config.name, "main"));
+    assert(config.log_level == CONFIG_LOG_LEVEL_DEBUG);
+
+    /* Objects are merged recursively */
+    assert(!merge_patch(&config, "{\"limits\": {\"timeout\": 3.0}}"));
+    assert(config.limits.timeout == 3.0);
+    assert(config.limits.connections == 5);
+    assert(config.limits.burst == 10);
+
+    /* Arrays are replaced */
+    assert(!merge_patch(&config, "{\"peers\": [\"c\"]}"));
+    assert(config.peers.n == 1);
+    assert(!strcmp(config.peers.items[0], "c"));
+
+    /* null resets to the default value */
+    assert(!merge_patch(&config, "{\"log_level\": null, \"limits\": {\"connections\": null}, \"port\": null}"));
+    assert(config.log_level == CONFIG_LOG_LEVEL_INFO);
+    assert(config.limits.connections == 100);
+    assert(config.port == 8080);
+
+    /* The length of the patch is given, it does not need to be NUL-terminated */
+    const char *patches = "{\"name\": \"second\"}{\"name\": \"third\"}";
+    assert(!json_merge_patch_config(&config, patches, 18));
+    assert(!strcmp(config.name, "second"));
+    assert(!json_merge_patch_config(&config, patches + 18, strlen(patches + 18)));
+    assert(!strcmp(config.name, "third"));
+
+    /* An empty patch changes nothing */
+    assert(!merge_patch(&config, "{}"));
+    assert(!strcmp(config.name, "third"));
+
+    /* Validation still applies */
+    assert(merge_patch(&config, "{\"port\": 0}"));
+    assert(merge_patch(&config, "{\"log_level\": \"verbose\"}"));
+    assert(merge_patch(&config, "{\"limits\": {\"burst\": -1}}"));
+    assert(merge_patch(&config, "{\"peers\": [\"a\", \"b\", \"c\", \"d\", \"e\"]}"));
+    assert(merge_patch(&config, "{\"unknown\": 1}"));
+    assert(merge_patch(&config, "{\"port\": 1, \"port\": 2}"));
+    assert(merge_patch(&config, "[]"));
+    assert(merge_patch(&config, "{\"port\": "));
+    /* Fields without a default value can not be removed */
+    assert(merge_patch(&config, "{\"name\": null}"));
+    assert(merge_patch(&config, "{\"limits\": {\"burst\": null}}"));
+    assert(merge_patch(&config, "{\"limits\": null}"));
+
+    assert(!strcmp(config.name, "third"));
+    assert(config.limits.burst == 10);
+    return 0;
+}
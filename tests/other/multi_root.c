@@ -0,0 +1,28 @@
+#include "multi_root.parser.h"
+
+#include <string.h>
+#include <assert.h>
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    shape_t shape = {};
+    path_t path = {};
+    assert(!json_parse_shape("{\"origin\": {\"x\": 1, \"y\": -2}, \"sides\": 5}", &shape));
+    assert(shape.origin.x == 1);
+    assert(shape.origin.y == -2);
+    assert(shape.sides == 5);
+    assert(json_parse_shape("{\"origin\": {\"x\": 1, \"y\": -2}, \"sides\": 2}", &shape));
+
+    assert(!json_parse_path("{\"name\": \"zigzag\", \"points\": [{\"x\": 3, \"y\": 4}, {\"x\": 5, \"y\": 6}]}", &path));
+    assert(!strcmp(path.name, "zigzag"));
+    assert(path.points.n == 2);
+    assert(path.points.items[1].x == 5);
+    assert(json_parse_path("{\"name\": \"zigzag\", \"points\": [{\"x\": 3}]}", &path));
+
+    /* The definitions are identical in both schemas, so they share a single type. */
+    shape.origin = path.points.items[0];
+    assert(shape.origin.x == 3);
+    assert(shape.origin.y == 4);
+    return 0;
+}
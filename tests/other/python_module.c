@@ -0,0 +1,53 @@
+/* The parser is compiled as a Python module, and imported by an embedded interpreter */
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+#include <assert.h>
+
+PyMODINIT_FUNC PyInit_python_module(void);
+
+static const char *const test_script =
+    "import python_module\n"
+    "import threading\n"
+    "document = (\n"
+    "    b'{\"name\": \"probe\", \"id\": 70000, \"offset\": -300, \"ratio\": 0.5, \"kind\": \"actuator\",'\n"
+    "    b' \"readings\": [1.5, -2.25], \"tags\": [\"a\", \"bc\"], \"samples\": [{\"time\": 1, \"value\": 2}],'\n"
+    "    b' \"shape\": {\"side\": 7, \"kind\": \"square\"}, \"location\": {\"time\": 5, \"value\": -6}}'\n"
+    ")\n"
+    "expected = {\n"
+    "    'name': 'probe', 'id': 70000, 'offset': -300, 'ratio': 0.5, 'active': False, 'kind': 'actuator',\n"
+    "    'readings': [1.5, -2.25], 'tags': ['a', 'bc'], 'samples': [{'time': 1, 'value': 2.0}],\n"
+    "    'shape': {'side': 7, 'kind': 'square'}, 'location': {'time': 5, 'value': -6.0},\n"
+    "}\n"
+    "assert python_module.parse(document) == expected, python_module.parse(document)\n"
+    "assert python_module.parse_root(document) == expected\n"
+    "assert python_module.validate(document) is True\n"
+    "invalid = document.replace(b'0.5', b'500')\n"
+    "assert python_module.validate(invalid) is False\n"
+    "try:\n"
+    "    python_module.parse(invalid)\n"
+    "    assert False, 'ValueError expected'\n"
+    "except ValueError:\n"
+    "    pass\n"
+    "try:\n"
+    "    python_module.parse(document.decode())\n"
+    "    assert False, 'TypeError expected'\n"
+    "except TypeError:\n"
+    "    pass\n"
+    "results = []\n"
+    "threads = [threading.Thread(target=lambda: results.append(python_module.parse(document))) for _ in range(4)]\n"
+    "for thread in threads:\n"
+    "    thread.start()\n"
+    "for thread in threads:\n"
+    "    thread.join()\n"
+    "assert results == [expected] * 4\n";
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    assert(PyImport_AppendInittab("python_module", PyInit_python_module) == 0);
+    Py_Initialize();
+    const int result = PyRun_SimpleString(test_script);
+    assert(Py_FinalizeEx() == 0);
+    return result;
+}
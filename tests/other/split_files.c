@@ -0,0 +1,51 @@
+#include "split_files.parser.h"
+
+#include <string.h>
+#include <assert.h>
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    fleet_t fleet = {};
+    assert(!json_parse_fleet(
+        "{"
+        "\"depot\": {\"lat\": 47.5, \"lon\": 19.0},"
+        "\"vehicles\": ["
+        "    {\"kind\": \"truck\", \"position\": {\"lat\": 1, \"lon\": 2}, \"plates\": [\"ABC-123\", \"XY-99\"]},"
+        "    {\"kind\": \"bike\", \"position\": {\"lat\": 3, \"lon\": 4}, \"plates\": []}"
+        "],"
+        "\"route\": [{\"lat\": 5, \"lon\": 6}, {\"lat\": 7, \"lon\": 8}],"
+        "\"status\": {\"target\": {\"lat\": 9, \"lon\": 10}, \"state\": \"moving\"}"
+        "}",
+        &fleet
+    ));
+    assert(fleet.depot.lat == 47.5);
+    assert(fleet.vehicles.n == 2);
+    assert(fleet.vehicles.items[0].kind == FLEET_VEHICLES_ITEM_KIND_TRUCK);
+    assert(!strcmp(fleet.vehicles.items[0].plates.items[1], "XY-99"));
+    assert(fleet.vehicles.items[1].position.lon == 4);
+    assert(fleet.route.n == 2);
+    assert(fleet.route.lat[1] == 7);
+    assert(fleet.status.state == FLEET_STATUS_STATE_MOVING);
+    assert(fleet.status.moving.target.lon == 10);
+
+    /* Errors are detected in every file of the parser */
+    assert(json_parse_fleet(
+        "{\"depot\": {\"lat\": 1}, \"vehicles\": [], \"route\": [], \"status\": {\"state\": \"idle\"}}",
+        &fleet
+    ));
+    assert(json_parse_fleet(
+        "{\"depot\": {\"lat\": 1, \"lon\": 2}, \"vehicles\": [{\"kind\": \"boat\", \"position\": {\"lat\": 1, \"lon\": 2}, \"plates\": []}],"
+        " \"route\": [], \"status\": {\"state\": \"idle\"}}",
+        &fleet
+    ));
+    assert(json_parse_fleet(
+        "{\"depot\": {\"lat\": 1, \"lon\": 2}, \"vehicles\": [], \"route\": [{\"lat\": 1}], \"status\": {\"state\": \"idle\"}}",
+        &fleet
+    ));
+    assert(json_parse_fleet(
+        "{\"depot\": {\"lat\": 1, \"lon\": 2}, \"vehicles\": [], \"route\": [], \"status\": {\"state\": \"parked\"}}",
+        &fleet
+    ));
+    return 0;
+}
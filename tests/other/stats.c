@@ -0,0 +1,37 @@
+#include "stats.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = {};
+    root_stats_t stats = {};
+    assert(!json_parse_root_with_stats("{\"name\": \"potato\", \"count\": 3}", &root, &stats));
+    assert(!json_parse_root_with_stats("{\"name\": \"tomato\"}", &root, &stats));
+    assert(json_parse_root_with_stats("{\"name\": \"potato\", \"count\": 11}", &root, &stats));
+    assert(json_parse_root_with_stats("{\"name\": ", &root, &stats));
+    /* Parsing without stats still works */
+    assert(!json_parse_root("{\"name\": \"carrot\"}", &root));
+
+    assert(stats.parse_calls == 4);
+    assert(stats.failed_parses == 2);
+    assert(stats.syntax_errors == 1);
+    assert(stats.tokens == 5 + 3 + 5);
+    assert(stats.bytes == strlen("{\"name\": \"potato\", \"count\": 3}") + strlen("{\"name\": \"tomato\"}") +
+        strlen("{\"name\": \"potato\", \"count\": 11}") + strlen("{\"name\": "));
+
+    char dump[4096] = {};
+    FILE *dump_file = tmpfile();
+    json_print_stats_root(&stats, dump_file);
+    rewind(dump_file);
+    assert(fread(dump, 1, sizeof(dump) - 1, dump_file) > 0);
+    fclose(dump_file);
+    assert(strstr(dump, "root.name: 3\n"));
+    assert(strstr(dump, "root.count: 2\n"));
+    assert(strstr(dump, "root: Integer %li in '%s' out of range. It must be <= 10.: 1\n"));
+    assert(strstr(dump, "Errors detected by builtin parsers: 0\n"));
+    return 0;
+}
@@ -0,0 +1,19 @@
+#include "used_builtins.parser.h"
+
+#include <stdio.h>
+#include <assert.h>
+
+bool parse_double_with_builtins(const char *json_string, double *out);
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = false;
+    assert(!json_parse_root("true ", &root));
+    assert(root);
+    double number = 0;
+    assert(!parse_double_with_builtins("1.5 ", &number));
+    assert(number == 1.5);
+    assert(parse_double_with_builtins("true ", &number));
+    return 0;
+}
@@ -0,0 +1,23 @@
+#include "chained_refs.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+
+const char* data = "{\"fruit\": {\"name\": \"apple\"}, \"alias\": {\"name\": \"pear\"}, \"name\": \"plum\"}";
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = {};
+    assert(!json_parse_root(data, &root));
+    assert(!strcmp(root.fruit.name, "apple"));
+    assert(!strcmp(root.name, "plum"));
+    assert(root.weight == 100);
+
+    /* A reference to a reference resolves to the same definition */
+    root_fruit_type_t fruit = root.alias;
+    assert(!strcmp(fruit.name, "pear"));
+    return 0;
+}
@@ -0,0 +1,25 @@
+#include "name_clash.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+
+const char* data = "{\"a\": {\"x\": \"ab\"}, \"thing\": {\"y\": 5}}";
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = {};
+    assert(!json_parse_root(data, &root));
+    assert(!strcmp(root.a.x, "ab"));
+    assert(root.thing.y == 5);
+
+    /* The definition and the property named the same get different types */
+    root_thing_t a = root.a;
+    root_thing_2_t thing = root.thing;
+    assert(!strcmp(a.x, "ab"));
+    assert(thing.y == 5);
+    assert(json_parse_root("{\"a\": {\"y\": 5}, \"thing\": {\"y\": 5}}", &root));
+    return 0;
+}
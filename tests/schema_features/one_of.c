@@ -0,0 +1,50 @@
+#include "one_of.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+
+const char* data =
+    "{\"shapes\": ["
+    "{\"kind\": \"circle\", \"radius\": 1.5},"
+    "{\"side\": 2, \"kind\": \"square\"},"
+    "{\"corners\": [1, 2, 3], \"kind\": \"polygon\"}"
+    "], \"message\": {\"delay\": 5, \"type\": \"pong\"}}";
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = {};
+    assert(!json_parse_root(data, &root));
+    assert(root.shapes.n == 3);
+    assert(root.shapes.items[0].kind == ROOT_SHAPE_KIND_CIRCLE);
+    assert(root.shapes.items[0].circle.radius == 1.5);
+    /* The discriminator does not have to be the first key */
+    assert(root.shapes.items[1].kind == ROOT_SHAPE_KIND_SQUARE);
+    assert(root.shapes.items[1].square.side == 2);
+    assert(root.shapes.items[2].kind == ROOT_SHAPE_KIND_POLYGON);
+    assert(root.shapes.items[2].polygon.corners.n == 3);
+    assert(root.shapes.items[2].polygon.corners.items[2] == 3);
+    assert(root.message.type == ROOT_MESSAGE_TYPE_PONG);
+    assert(root.message.pong.delay == 5);
+
+    /* The variants share the memory */
+    assert(sizeof(root_shape_t) < sizeof(root_shape_kind_t) + sizeof(root_shape_circle_t) + sizeof(root_shape_polygon_t));
+
+    assert(!json_parse_root("{\"shapes\": [], \"message\": {\"type\": \"ping\"}}", &root));
+    assert(root.message.type == ROOT_MESSAGE_TYPE_PING);
+
+    /* Fields of other variants are not accepted */
+    assert(json_parse_root("{\"shapes\": [{\"kind\": \"circle\", \"side\": 1}], \"message\": {\"type\": \"ping\"}}", &root));
+    assert(json_parse_root("{\"shapes\": [{\"radius\": 1}], \"message\": {\"type\": \"ping\"}}", &root));
+    assert(json_parse_root("{\"shapes\": [{\"kind\": \"circles\", \"radius\": 1}], \"message\": {\"type\": \"ping\"}}", &root));
+    assert(json_parse_root("{\"shapes\": [{\"kind\": \"cube\", \"radius\": 1}], \"message\": {\"type\": \"ping\"}}", &root));
+    assert(json_parse_root("{\"shapes\": [{\"kind\": 1, \"radius\": 1}], \"message\": {\"type\": \"ping\"}}", &root));
+    assert(json_parse_root(
+        "{\"shapes\": [{\"kind\": \"circle\", \"radius\": 1, \"kind\": \"circle\"}], \"message\": {\"type\": \"ping\"}}",
+        &root
+    ));
+    assert(json_parse_root("{\"shapes\": [], \"message\": {\"type\": \"ping\", \"delay\": 1}}", &root));
+    return 0;
+}
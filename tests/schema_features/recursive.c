@@ -0,0 +1,55 @@
+#include "recursive.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+
+const char* data =
+    "{\"root\": {\"name\": \"a\", \"children\": ["
+    "    {\"name\": \"b\", \"children\": [], \"next\": {\"name\": \"c\", \"children\": []}},"
+    "    {\"name\": \"d\", \"children\": [{\"name\": \"e\", \"children\": [{\"name\": \"f\", \"children\": []}]}]}"
+    "]}}";
+
+const char* too_deep =
+    "{\"root\": {\"name\": \"a\", \"children\": [{\"name\": \"b\", \"children\": [{\"name\": \"c\", \"children\": ["
+    "    {\"name\": \"d\", \"children\": [{\"name\": \"e\", \"children\": [{\"name\": \"f\", \"children\": []}]}]}"
+    "]}]}]}}";
+
+const char* too_many =
+    "{\"root\": {\"name\": \"a\", \"children\": ["
+    "    {\"name\": \"b\", \"children\": [{\"name\": \"c\", \"children\": []}, {\"name\": \"d\", \"children\": []}]},"
+    "    {\"name\": \"e\", \"children\": [{\"name\": \"f\", \"children\": []}, {\"name\": \"g\", \"children\": []}]},"
+    "    {\"name\": \"h\", \"children\": [{\"name\": \"i\", \"children\": []}, {\"name\": \"j\", \"children\": []}]}"
+    "]}}";
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    tree_t tree = {};
+    static char node_pool[TREE_NODE_POOL_SIZE];
+    assert(!json_parse_tree(data, &tree, node_pool, sizeof(node_pool)));
+    assert(!strcmp(tree.root.name, "a"));
+    assert(tree.root.next == NULL);
+    assert(tree.root.children.n == 2);
+    const tree_node_t *b = tree.root.children.items[0];
+    assert(!strcmp(b->name, "b"));
+    assert(b->children.n == 0);
+    assert(!strcmp(b->next->name, "c"));
+    assert(b->next->next == NULL);
+    const tree_node_t *d = tree.root.children.items[1];
+    assert(!strcmp(d->name, "d"));
+    assert(d->next == NULL);
+    assert(!strcmp(d->children.items[0]->name, "e"));
+    assert(!strcmp(d->children.items[0]->children.items[0]->name, "f"));
+    assert(d->children.items[0]->children.items[0]->children.n == 0);
+
+    /* The root node is stored in tree_t, so 'f' is at depth 5 */
+    assert(json_parse_tree(too_deep, &tree, node_pool, sizeof(node_pool)));
+    assert(json_parse_tree(too_many, &tree, node_pool, sizeof(node_pool)));
+    assert(json_parse_tree(data, &tree, node_pool, sizeof(tree_node_t)));
+
+    assert(json_parse_tree("{\"root\": {\"name\": \"a\", \"children\": [{\"children\": []}]}}", &tree, node_pool, sizeof(node_pool)));
+    assert(json_parse_tree("{\"root\": {\"name\": \"a\", \"children\": [], \"next\": null}}", &tree, node_pool, sizeof(node_pool)));
+    return 0;
+}
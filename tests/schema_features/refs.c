@@ -14,5 +14,11 @@ int main(int argc, char** argv){
     assert(!json_parse_root(data, &root));
     assert(!strcmp(root.veggie1.name, "potato"));
     assert(!strcmp(root.veggie2.name, "tomato"));
+
+    /* Both fields use the single type generated for the shared definition */
+    root_object_type_t veggie = root.veggie1;
+    assert(!strcmp(veggie.name, "potato"));
+    veggie = root.veggie2;
+    assert(!strcmp(veggie.name, "tomato"));
     return 0;
 }
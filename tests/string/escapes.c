@@ -0,0 +1,70 @@
+#include "escapes.parser.h"
+
+#include <stdio.h>
+#include <string.h>
+#include <assert.h>
+
+static bool parse_text(const char *text, root_t *root) {
+    char json[256];
+    snprintf(json, sizeof(json), "{\"text\": \"%s\", \"tags\": []}", text);
+    return json_parse_root(json, root);
+}
+
+int main(int argc, char** argv){
+    (void)argc;
+    (void)argv;
+    root_t root = {};
+
+    /* No escapes: copied as-is */
+    assert(!parse_text("abcd", &root));
+    assert(!strcmp(root.text, "abcd"));
+
+    /* Simple escapes */
+    assert(!parse_text("a\\\"\\\\b", &root));
+    assert(!strcmp(root.text, "a\"\\b"));
+    assert(!parse_text("\\n\\t\\r\\/", &root));
+    assert(!strcmp(root.text, "\n\t\r/"));
+    assert(!parse_text("\\b\\f", &root));
+    assert(!strcmp(root.text, "\b\f"));
+
+    /* \u escapes are encoded as UTF-8, surrogate pairs included */
+    assert(!parse_text("\\u0041\\u00e9", &root));
+    assert(!strcmp(root.text, "A\xc3\xa9"));
+    assert(!parse_text("\\u20AC", &root));
+    assert(!strcmp(root.text, "\xe2\x82\xac"));
+    assert(!parse_text("\\ud83d\\ude00", &root));
+    assert(!strcmp(root.text, "\xf0\x9f\x98\x80"));
+
+    /* The limits apply to the decoded length */
+    assert(!parse_text("\\u0041\\u0042\\u0043\\u0044", &root));
+    assert(!strcmp(root.text, "ABCD"));
+    assert(parse_text("\\u0041\\u0042\\u0043\\u0044\\u0045", &root));
+    assert(parse_text("\\u0041", &root));
+    assert(parse_text("\\ud83d\\ude00!", &root));
+
+    /* Invalid escapes */
+    assert(parse_text("\\ud83d", &root));
+    assert(parse_text("\\ude00\\ud83d", &root));
+    assert(parse_text("\\ud83dab", &root));
+    assert(parse_text("a\\u0000", &root));
+
+    /* Pooled strings take their decoded length from the pool */
+    assert(!json_parse_root("{\"text\": \"ab\", \"tags\": [\"\\u00e9\\u00e9\", \"x\\ny\", \"\\\"\"]}", &root));
+    assert(root.tags.n == 3);
+    assert(!strcmp(ROOT_TAGS_ITEM(root.tags, 0), "\xc3\xa9\xc3\xa9"));
+    assert(!strcmp(ROOT_TAGS_ITEM(root.tags, 1), "x\ny"));
+    assert(!strcmp(ROOT_TAGS_ITEM(root.tags, 2), "\""));
+    assert(json_parse_root("{\"text\": \"ab\", \"tags\": [\"\\u00e9\\u00e9\", \"\\u00e9\\u00e9\", \"\\u00e9\\u00e9\"]}", &root));
+
+    /* Strings of binary input are never unescaped */
+    const uint8_t msgpack_document[] = {
+        0x82,
+        0xa4, 't', 'e', 'x', 't', 0xa3, 'a', '\\', 'n',
+        0xa4, 't', 'a', 'g', 's', 0x91, 0xa2, '\\', 'u',
+    };
+    assert(!msgpack_parse_root(msgpack_document, sizeof(msgpack_document), &root));
+    assert(!strcmp(root.text, "a\\n"));
+    assert(!strcmp(ROOT_TAGS_ITEM(root.tags, 0), "\\u"));
+
+    return 0;
+}